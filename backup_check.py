@@ -0,0 +1,89 @@
+"""Проверка бэкапа пробным восстановлением в отдельную схему.
+
+digests() считает для каждой таблицы — у денежных по месяцам — число строк
+и md5 от отсортированных md5 строк. services.backup.send_backup читает таблицы и считает
+digests() живых данных в одной транзакции REPEATABLE READ, поэтому
+расхождение означает ошибку в самом бэкапе, а не новые записи.
+
+verify_json() загружает файл бэкапа в схему backup_check_<pid>_<n>
+(таблицы LIKE public — без ключей и триггеров, рабочие таблицы не
+затрагиваются) json_backup.load_parallel() — тем же приведением типов и
+COPY, что и настоящее восстановление, но таблицы параллельно. Считает те
+же digests() и сравнивает. Схема удаляется в любом случае.
+"""
+import asyncio
+import itertools
+import os
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import database
+import json_backup
+from snapshots import create_scratch, table_columns
+
+# Колонка даты, по месяцам которой делятся суммы таблицы
+MONTH_COLUMNS = {
+    'work_log': 'work_date', 'work_log_archive': 'work_date',
+    'advances': 'advance_date', 'advances_archive': 'advance_date',
+    'penalties': 'penalty_date', 'penalties_archive': 'penalty_date',
+}
+# Сколько расхождений показывать в отчёте
+MAX_DIFFS = 10
+
+_runs = itertools.count(1)
+
+Digests = Dict[Tuple[str, Optional[date]], Tuple[int, str]]
+
+
+async def digests(conn, tables, schema: str = 'public') -> Digests:
+    """(таблица, месяц или None) -> (строк, md5)"""
+    result = {}
+    for table in tables:
+        column = MONTH_COLUMNS.get(table)
+        month = f"date_trunc('month', t.{column})::date" if column else "NULL::date"
+        rows = await conn.fetch(f"""
+            SELECT m, COUNT(*), md5(string_agg(h, '' ORDER BY h))
+            FROM (SELECT {month} AS m, md5(t::text) AS h FROM "{schema}".{table} t) x
+            GROUP BY m
+        """)
+        for m, count, digest in rows:
+            result[(table, m)] = (count, digest)
+    return result
+
+
+def compare(expected: Digests, actual: Digests) -> List[str]:
+    """Расхождения: строки отчёта, пустой список — всё совпало"""
+    diffs = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1] or date.min)):
+        if expected.get(key) == actual.get(key):
+            continue
+        table, month = key
+        where = f"{table} {month:%m.%Y}" if month else table
+        live, restored = expected.get(key, (0, None)), actual.get(key, (0, None))
+        if live[0] != restored[0]:
+            diffs.append(f"{where}: в БД {live[0]} строк, в бэкапе {restored[0]}")
+        else:
+            diffs.append(f"{where}: {live[0]} строк, содержимое отличается")
+    return diffs
+
+
+# ==================== JSON ====================
+
+async def verify_json(path: str, expected: Digests) -> List[str]:
+    """Восстанавливает JSON-бэкап в отдельную схему и сравнивает с expected
+    (digests() живых таблиц, снятые вместе с бэкапом). Возвращает расхождения"""
+    data = await asyncio.to_thread(json_backup.read, path)
+    tables = sorted({table for table, _ in expected} | set(json_backup.TABLES))
+    schema = f"backup_check_{os.getpid()}_{next(_runs)}"
+    async with database.pool.acquire() as conn:
+        columns = await table_columns(conn, tables)
+        tables = [t for t in tables if t in columns]
+        await create_scratch(conn, schema, tables)
+    try:
+        await json_backup.load_parallel(data, schema)
+        async with database.pool.acquire() as conn:
+            actual = await digests(conn, tables, schema)
+    finally:
+        async with database.pool.acquire() as conn:
+            await conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+    return compare(expected, actual)
@@ -0,0 +1,5 @@
+"""Бенчмарки и проверки производительности.
+
+Работают ТОЛЬКО с отдельной БД из BENCH_DATABASE_URL — данные в ней
+перезаписываются синтетикой.
+"""
@@ -0,0 +1,232 @@
+"""Сквозной бенчмарк обработчиков.
+
+Гоняет реальные роутеры из handlers/ через Dispatcher с фейковой сессией Bot
+(в Telegram ничего не уходит) на данных из BENCH_DATABASE_URL и печатает по
+каждому сценарию: пропускную способность, p50/p95/p99 и число SQL-запросов.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.harness --users 20 --rounds 10
+
+Запросы reports.py через его отдельное соединение в счётчик не попадают
+(итоги из work_daily он берёт через пул и учитываются).
+"""
+import os
+
+# Конфиг читается при импорте — админом назначается первый синтетический работник
+BENCH_ADMIN_ID = 700000000
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+os.environ["ADMIN_ID"] = str(BENCH_ADMIN_ID)
+
+import argparse
+import asyncio
+import contextvars
+import itertools
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+import database
+import reports
+from benchmarks.seed import get_bench_dsn, seed
+from handlers import setup_routers
+from middlewares import RoleMiddleware
+
+# Сценарий, к которому относится текущий запрос (для подсчёта SQL и API-вызовов)
+_current_flow = contextvars.ContextVar("current_flow", default=None)
+
+
+class FakeSession(BaseSession):
+    """Сессия Bot без сети: на любой метод отвечает правдоподобным объектом"""
+
+    def __init__(self):
+        super().__init__()
+        self._ids = itertools.count(1)
+        self.calls = defaultdict(int)
+
+    async def make_request(self, bot, method, timeout=None):
+        flow = _current_flow.get()
+        if flow:
+            self.calls[flow] += 1
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="bench")
+        if method.__returning__ is bool:
+            return True
+        chat_id = getattr(method, "chat_id", None) or 0
+        return Message(
+            message_id=next(self._ids), date=datetime.now(),
+            chat=Chat(id=int(chat_id), type="private"),
+            text=getattr(method, "text", None),
+        )
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536,
+                             raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class VirtualUser:
+    """Синтетические апдейты от одного пользователя"""
+
+    def __init__(self, tid: int, name: str):
+        self.user = User(id=tid, is_bot=False, first_name=name)
+        self.chat = Chat(id=tid, type="private")
+        self._ids = itertools.count(1)
+
+    def message(self, text: str) -> Update:
+        uid = next(self._ids)
+        return Update(update_id=uid, message=Message(
+            message_id=uid, date=datetime.now(), chat=self.chat, from_user=self.user, text=text))
+
+    def callback(self, data: str) -> Update:
+        uid = next(self._ids)
+        msg = Message(message_id=uid, date=datetime.now(), chat=self.chat, text="…")
+        return Update(update_id=uid, callback_query=CallbackQuery(
+            id=str(uid), from_user=self.user, chat_instance=str(self.chat.id),
+            message=msg, data=data))
+
+
+# ==================== СЦЕНАРИИ ====================
+
+async def flow_work_entry(feed, vu: VirtualUser):
+    items = await database.get_price_list_for_worker(vu.user.id)
+    cats = await database.get_worker_categories(vu.user.id)
+    if not items:
+        return
+    code, _, _, cat, price_type = random.choice(items)
+    await feed(vu.message("📝 Записать работу"))
+    await feed(vu.callback(f"wdate:{date.today().isoformat()}"))
+    if len(cats) > 1:
+        await feed(vu.callback(f"wcat:{cat}"))
+    await feed(vu.callback(f"work:{code}"))
+    await feed(vu.message("2.5" if price_type == "square" else "3"))
+
+
+async def flow_balance(feed, vu: VirtualUser):
+    await feed(vu.message("💳 Мой баланс"))
+
+
+async def flow_monthly_summary(feed, vu: VirtualUser, admin: VirtualUser):
+    await feed(admin.message("📁 Сводка месяц"))
+    await feed(admin.callback(f"msw:{vu.user.id}"))
+
+
+async def flow_report_export(feed, vu: VirtualUser, admin: VirtualUser):
+    await feed(admin.message("📥 Отчёт месяц"))
+
+
+FLOWS = {
+    "work_entry": flow_work_entry,
+    "balance": flow_balance,
+    "monthly_summary": flow_monthly_summary,
+    "report_export": flow_report_export,
+}
+# Сценарии, которые выполняет администратор (а не сам работник)
+STAFF_FLOWS = {"monthly_summary", "report_export"}
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+async def run(args):
+    dsn = get_bench_dsn()
+    database.DATABASE_URL = dsn
+    reports.DATABASE_URL = dsn
+
+    queries = defaultdict(int)
+
+    def count_query(record):
+        flow = _current_flow.get()
+        if flow:
+            queries[flow] += 1
+
+    database.query_loggers.append(count_query)
+    await database.init_db()
+
+    if not args.no_seed:
+        async with database.pool.acquire() as conn:
+            stats = await seed(conn, workers=args.workers, categories=args.categories,
+                               items_per_category=args.items, years=args.years)
+        print("🌱 " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+    session = FakeSession()
+    bot = Bot(token=os.environ["BOT_TOKEN"], session=session)
+    # Модули с собственным экземпляром Bot тоже переводим на фейковую сессию
+    import handlers.worker
+    import handlers.money
+    handlers.worker.bot.session = session
+    handlers.money.bot.session = session
+
+    dp = Dispatcher()
+    dp.message.middleware(RoleMiddleware())
+    dp.callback_query.middleware(RoleMiddleware())
+    dp.include_router(setup_routers())
+
+    async def feed(update):
+        await dp.feed_update(bot, update)
+
+    workers = [w for w in await database.get_all_workers() if w[0] != BENCH_ADMIN_ID]
+    users = [VirtualUser(tid, name) for tid, name in workers[:args.users]]
+
+    flows = [f for f in args.flows.split(",") if f] if args.flows else list(FLOWS)
+    print(f"\n{'flow':<16} {'runs':>5} {'flows/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'SQL/run':>8} {'API/run':>8}")
+
+    try:
+        for flow_name in flows:
+            flow = FLOWS[flow_name]
+            latencies = []
+
+            async def one_user(vu: VirtualUser):
+                # У каждого администратора-двойника свой чат, чтобы FSM не пересекались
+                admin = VirtualUser(BENCH_ADMIN_ID, "admin")
+                admin.chat = Chat(id=vu.user.id + 10 ** 12, type="private")
+                _current_flow.set(flow_name)
+                for _ in range(args.rounds):
+                    started = time.perf_counter()
+                    if flow_name in STAFF_FLOWS:
+                        await flow(feed, vu, admin)
+                    else:
+                        await flow(feed, vu)
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one_user(vu) for vu in users))
+            wall = time.perf_counter() - started
+            await asyncio.sleep(0)  # дождаться логгеров asyncpg (call_soon)
+
+            runs = len(latencies) or 1
+            print(f"{flow_name:<16} {len(latencies):>5} {len(latencies) / wall:>8.1f} "
+                  f"{_percentile(latencies, 50):>8.1f} {_percentile(latencies, 95):>8.1f} "
+                  f"{_percentile(latencies, 99):>8.1f} {queries[flow_name] / runs:>8.1f} "
+                  f"{session.calls[flow_name] / runs:>8.1f}")
+    finally:
+        await database.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк обработчиков")
+    parser.add_argument("--users", type=int, default=20, help="одновременных пользователей")
+    parser.add_argument("--rounds", type=int, default=10, help="повторов сценария на пользователя")
+    parser.add_argument("--flows", default="", help=f"через запятую из: {', '.join(FLOWS)}")
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=8)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--no-seed", action="store_true", help="использовать уже заполненную БД")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Регрессия планов запросов.
+
+Заполняет BENCH_DATABASE_URL синтетикой, вызывает функции database.py,
+перехватывает их SQL и через EXPLAIN ANALYZE проверяет, что большие таблицы
+читаются по индексу, а сама функция укладывается в бюджет времени.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.query_plans
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+import asyncpg
+
+import database
+from benchmarks.seed import get_bench_dsn, seed
+
+# Таблицы, по которым последовательное чтение считается регрессией
+LARGE_TABLES = {'work_log', 'work_daily', 'advances', 'penalties'}
+INDEX_NODES = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+def _checks(ctx):
+    """(имя, lambda -> корутина, бюджет мс) — по одной проверке на функцию
+    репозитория. Корутина создаётся только перед своей проверкой"""
+    wid, y, m, day, code = ctx['worker_id'], ctx['year'], ctx['month'], ctx['date'], ctx['work_code']
+    return [
+        ("get_daily_total", lambda: database.get_daily_total(wid, day), 30),
+        ("get_monthly_total", lambda: database.get_monthly_total(wid, y, m), 30),
+        ("get_monthly_by_days", lambda: database.get_monthly_by_days(wid, y, m), 40),
+        ("get_all_workers_daily_summary", lambda: database.get_all_workers_daily_summary(day), 40),
+        ("get_all_workers_monthly_summary", lambda: database.get_all_workers_monthly_summary(y, m), 80),
+        ("get_workers_without_records", lambda: database.get_workers_without_records(day), 40),
+        ("get_worker_entries_by_custom_date", lambda: database.get_worker_entries_by_custom_date(wid, day), 30),
+        ("get_worker_recent_entries", lambda: database.get_worker_recent_entries(wid), 40),
+        ("get_worker_entries_by_month", lambda: database.get_worker_entries_by_month(wid, y, m), 40),
+        ("get_worker_monthly_details", lambda: database.get_worker_monthly_details(wid, y, m), 40),
+        ("get_all_workers_monthly_details", lambda: database.get_all_workers_monthly_details(y, m), 150),
+        ("get_admin_monthly_detailed_all", lambda: database.get_admin_monthly_detailed_all(y, m), 200),
+        ("get_rollup by worker (year)", lambda: database.get_rollup(
+            date(y, 1, 1), date(y + 1, 1, 1), by=('worker',)), 150),
+        ("get_rollup by day/category", lambda: database.get_rollup(
+            *database.month_bounds(y, m), by=('day', 'category')), 60),
+        ("get_rollup worker by month", lambda: database.get_rollup(
+            date(y - 1, 1, 1), date(y + 1, 1, 1), by=('month',), worker_id=wid), 40),
+        ("get_all_workers_balance", lambda: database.get_all_workers_balance(y, m), 80),
+        ("get_worker_full_stats", lambda: database.get_worker_full_stats(wid, y, m), 30),
+        ("get_worker_advances", lambda: database.get_worker_advances(wid, y, m), 20),
+        ("get_worker_advances_total", lambda: database.get_worker_advances_total(wid, y, m), 20),
+        ("get_all_advances_monthly", lambda: database.get_all_advances_monthly(y, m), 40),
+        ("get_worker_penalties", lambda: database.get_worker_penalties(wid, y, m), 20),
+        ("get_worker_penalties_total", lambda: database.get_worker_penalties_total(wid, y, m), 20),
+        ("get_worker_deletion_info", lambda: database.get_worker_deletion_info(wid), 60),
+        # Та же цена — пересчёт ничего не меняет, но проходит по work_code
+        ("recalculate_entries_from_march", lambda: database.recalculate_entries_from_march(code, ctx['price']), 300),
+        ("delete_price_item_permanently", lambda: database.delete_price_item_permanently(ctx['fresh_code']), 30),
+    ]
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def _check_plan(plan) -> list:
+    """Возвращает список проблем плана (пустой — всё хорошо)"""
+    problems = []
+    nodes = list(_plan_nodes(plan))
+    touched = {n.get('Relation Name') for n in nodes} & LARGE_TABLES
+    for n in nodes:
+        if n['Node Type'] == 'Seq Scan' and n.get('Relation Name') in LARGE_TABLES:
+            problems.append(f"Seq Scan on {n['Relation Name']}")
+    if touched and not any(n['Node Type'] in INDEX_NODES for n in nodes):
+        problems.append("no index used")
+    return problems
+
+
+async def _explain(conn, query, args):
+    """EXPLAIN ANALYZE в транзакции, которая всегда откатывается"""
+    tr = conn.transaction()
+    await tr.start()
+    try:
+        raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}", *args)
+    finally:
+        await tr.rollback()
+    result = json.loads(raw) if isinstance(raw, str) else raw
+    return result[0]['Plan'], result[0]['Execution Time']
+
+
+async def _context(conn) -> dict:
+    # Самый «тяжёлый» работник и прошлый (полный) месяц
+    wid = await conn.fetchval("""
+        SELECT worker_id FROM work_log GROUP BY worker_id ORDER BY COUNT(*) DESC LIMIT 1
+    """)
+    code, price = await conn.fetchrow("""
+        SELECT wl.work_code, pl.price FROM work_log wl
+        JOIN price_list pl ON pl.code = wl.work_code
+        GROUP BY wl.work_code, pl.price ORDER BY COUNT(*) DESC LIMIT 1
+    """)
+    await conn.execute("""
+        INSERT INTO price_list (code, name, price, price_type, category_code, is_active)
+        SELECT 'plan_check_item', 'Plan check', 1, 'unit', code, TRUE FROM categories LIMIT 1
+        ON CONFLICT (code) DO NOTHING
+    """)
+    prev = date.today().replace(day=1) - timedelta(days=1)
+    return {
+        'worker_id': wid, 'year': prev.year, 'month': prev.month,
+        'date': prev.replace(day=15), 'work_code': code, 'price': price,
+        'fresh_code': 'plan_check_item',
+    }
+
+
+async def run(args) -> int:
+    dsn = get_bench_dsn()
+    database.DATABASE_URL = dsn
+    captured = []
+    database.query_loggers.append(captured.append)
+    await database.init_db()
+
+    explain_conn = await asyncpg.connect(dsn)
+    failures = 0
+    try:
+        if not args.no_seed:
+            stats = await seed(explain_conn, workers=args.workers, years=args.years)
+            print("🌱 " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+        ctx = await _context(explain_conn)
+
+        for name, call, budget in _checks(ctx):
+            budget *= args.budget_scale
+            captured.clear()
+            started = time.perf_counter()
+            await call()
+            elapsed = (time.perf_counter() - started) * 1000
+            await asyncio.sleep(0)  # логгеры asyncpg вызываются через call_soon
+
+            problems = []
+            exec_ms = 0.0
+            for q in captured:
+                if q.exception is not None:
+                    problems.append(f"error: {q.exception}")
+                    continue
+                plan, ms = await _explain(explain_conn, q.query, q.args or ())
+                exec_ms += ms
+                problems.extend(_check_plan(plan))
+            if elapsed > budget:
+                problems.append(f"{elapsed:.1f} ms > budget {budget:.0f} ms")
+
+            status = "✅" if not problems else "❌"
+            failures += bool(problems)
+            print(f"{status} {name:<36} {elapsed:8.1f} ms  (plan {exec_ms:7.1f} ms, "
+                  f"{len(captured)} q)  {'; '.join(problems)}")
+    finally:
+        await explain_conn.close()
+        await database.close_db()
+
+    print(f"\n{'❌' if failures else '✅'} Проблем: {failures}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="множитель бюджетов (для медленных машин)")
+    parser.add_argument("--no-seed", action="store_true", help="не пересоздавать данные")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import asyncpg
+
+# Порядок важен: очистка и загрузка идут с учётом внешних ключей
+SEED_TABLES = ['categories', 'workers', 'price_list', 'worker_categories',
+               'work_log', 'advances', 'penalties']
+
+EMOJIS = ['🤖', '🎨', '🪵', '📦', '🚪', '🛏', '🪚', '🔩']
+
+
+def get_bench_dsn() -> str:
+    """DSN тестовой БД. Боевой DATABASE_URL сюда специально не подставляется"""
+    dsn = os.getenv("BENCH_DATABASE_URL", "")
+    if not dsn:
+        raise SystemExit("❌ Укажите BENCH_DATABASE_URL (отдельная БД — данные будут удалены)")
+    return dsn
+
+
+async def seed(conn: asyncpg.Connection, workers: int = 60, categories: int = 10,
+               items_per_category: int = 8, years: int = 3, entries_per_day: int = 3,
+               random_seed: int = 42) -> dict:
+    """Заполняет БД синтетикой по образцу backup_*.json, возвращает статистику"""
+    rnd = random.Random(random_seed)
+    today = date.today()
+    start = today - timedelta(days=365 * years)
+
+    await conn.execute(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY CASCADE")
+
+    cats = [(f"cat{i}", f"Категория {i}", EMOJIS[i % len(EMOJIS)]) for i in range(categories)]
+    await conn.copy_records_to_table('categories', records=cats, columns=['code', 'name', 'emoji'])
+
+    registered = datetime.combine(start, datetime.min.time())
+    staff = [(700000000 + i, f"Работник {i:03d}", registered) for i in range(workers)]
+    await conn.copy_records_to_table('workers', records=staff,
+                                     columns=['telegram_id', 'name', 'registered_at'])
+
+    items = []
+    for code, _, _ in cats:
+        for j in range(items_per_category):
+            price_type = 'square' if rnd.random() < 0.2 else 'unit'
+            price = float(rnd.choice([25, 33, 50, 80, 120, 200, 350, 600]))
+            # ~10% позиций скрыты, как в реальном прайсе
+            items.append((f"{code}_w{j}", f"Работа {code}-{j}", price, price_type, code,
+                          rnd.random() > 0.1))
+    await conn.copy_records_to_table(
+        'price_list', records=items,
+        columns=['code', 'name', 'price', 'price_type', 'category_code', 'is_active'])
+
+    # У большинства работников одна категория, у части — две
+    links = set()
+    for tid, _, _ in staff:
+        links.add((tid, rnd.choice(cats)[0]))
+        if rnd.random() < 0.25:
+            links.add((tid, rnd.choice(cats)[0]))
+    await conn.copy_records_to_table('worker_categories', records=sorted(links),
+                                     columns=['worker_id', 'category_code'])
+
+    items_by_cat = {}
+    for code, name, price, price_type, cat, active in items:
+        items_by_cat.setdefault(cat, []).append((code, price, price_type))
+    worker_items = {}
+    for tid, cat in links:
+        worker_items.setdefault(tid, []).extend(items_by_cat[cat])
+
+    work_log, advances, penalties = [], [], []
+    day = start
+    while day <= today:
+        if day.weekday() != 6:
+            for tid, _, _ in staff:
+                if rnd.random() > 0.85:
+                    continue
+                for _ in range(rnd.randint(1, entries_per_day * 2 - 1)):
+                    code, price, price_type = rnd.choice(worker_items[tid])
+                    qty = round(rnd.uniform(0.5, 12), 2) if price_type == 'square' else float(rnd.randint(1, 20))
+                    created = datetime.combine(day, datetime.min.time()) + timedelta(
+                        hours=rnd.randint(8, 19), minutes=rnd.randint(0, 59))
+                    work_log.append((tid, code, qty, price, qty * price, day, created))
+                if rnd.random() < 0.03:
+                    advances.append((tid, float(rnd.randint(10, 100) * 100), "", day, created))
+                if rnd.random() < 0.005:
+                    penalties.append((tid, float(rnd.randint(1, 10) * 100), "", day, created))
+        day += timedelta(days=1)
+
+    await conn.copy_records_to_table(
+        'work_log', records=work_log,
+        columns=['worker_id', 'work_code', 'quantity', 'price_per_unit', 'total', 'work_date', 'created_at'])
+    await conn.copy_records_to_table(
+        'advances', records=advances,
+        columns=['worker_id', 'amount', 'comment', 'advance_date', 'created_at'])
+    await conn.copy_records_to_table(
+        'penalties', records=penalties,
+        columns=['worker_id', 'amount', 'reason', 'penalty_date', 'created_at'])
+
+    await conn.execute("ANALYZE")
+
+    return {
+        'workers': len(staff), 'categories': len(cats), 'price_list': len(items),
+        'worker_categories': len(links), 'work_log': len(work_log),
+        'advances': len(advances), 'penalties': len(penalties),
+    }
+
+
+async def _main(args):
+    import database
+
+    dsn = get_bench_dsn()
+    database.DATABASE_URL = dsn
+    await database.init_db()  # создаёт схему, если БД пустая
+    await database.close_db()
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        stats = await seed(conn, workers=args.workers, categories=args.categories,
+                           items_per_category=args.items, years=args.years,
+                           entries_per_day=args.entries_per_day, random_seed=args.seed)
+    finally:
+        await conn.close()
+    print("🌱 " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Заполнить BENCH_DATABASE_URL синтетикой")
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=8, help="позиций прайса на категорию")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--entries-per-day", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(_main(parser.parse_args()))
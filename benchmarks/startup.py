@@ -0,0 +1,83 @@
+"""Время импорта bot.py (до запуска polling).
+
+Запускает `python -X importtime -c "import bot"` в отдельном процессе
+несколько раз, печатает медиану общего времени и самые тяжёлые пакеты
+(собственное время модулей, сложенное по верхнему пакету). Падает, если
+при старте загрузился модуль из utils.lazy.DEFERRED или общее время
+больше --budget. БД не нужна.
+
+    python -m benchmarks.startup --runs 5 --budget 2500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from utils.lazy import DEFERRED
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _profile():
+    """{модуль: (self мкс, cumulative мкс)} одного запуска"""
+    env = dict(os.environ)
+    env.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"import bot упал:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(own), int(total))
+    return modules
+
+
+def run(args) -> int:
+    _profile()  # прогрев: .pyc и кэш файловой системы
+    runs = [_profile() for _ in range(args.runs)]
+    totals = [r["bot"][1] / 1000 for r in runs]
+    total = statistics.median(totals)
+
+    packages = defaultdict(list)
+    for r in runs:
+        per_run = defaultdict(int)
+        for name, (own, _) in r.items():
+            per_run[name.split(".")[0]] += own
+        for package, us in per_run.items():
+            packages[package].append(us / 1000)
+    heavy = sorted(((statistics.median(v), p) for p, v in packages.items()), reverse=True)
+
+    print(f"⏱ import bot: {total:.0f} ms (медиана {args.runs}, "
+          f"{min(totals):.0f}–{max(totals):.0f} ms)\n")
+    for ms, package in heavy[:args.top]:
+        print(f"  {ms:8.1f} ms  {package}")
+
+    problems = []
+    loaded = sorted({n.split(".")[0] for n in runs[0]} & set(DEFERRED))
+    if loaded:
+        problems.append(f"при старте загружены отложенные модули: {', '.join(loaded)}")
+    if args.budget and total > args.budget:
+        problems.append(f"{total:.0f} ms > budget {args.budget:.0f} ms")
+    for problem in problems:
+        print(f"\n❌ {problem}")
+    if not problems:
+        print("\n✅ Отложенные модули при старте не загружаются")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="сколько пакетов показать")
+    parser.add_argument("--budget", type=float, default=0, help="бюджет, мс (0 — без проверки)")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,4 +14,23 @@ for m in _managers.split(","):
         MANAGER_IDS.append(int(m))
 
 # PostgreSQL
-DATABASE_URL = os.getenv("DATABASE_URL", "")
\ No newline at end of file
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+# Часовой пояс напоминаний по умолчанию (IANA, например Europe/Moscow).
+# Пусто — часовой пояс сервера
+TIMEZONE = os.getenv("TIMEZONE", "").strip().strip('"')
+
+# Отложенная запись работ (services/write_behind.py): ответ сразу, в БД —
+# пачками в фоне. Журнал — локальный файл, переживающий падение процесса
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "").strip().lower() in ("1", "true", "yes")
+WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", "work_log.journal").strip()
+# Записи, которые БД не примет никогда (нарушение ключей, неверные данные)
+WRITE_BEHIND_DEAD_LETTER = os.getenv("WRITE_BEHIND_DEAD_LETTER", WRITE_BEHIND_JOURNAL + ".dead").strip()
+
+# Сколько секунд при остановке (SIGTERM) ждать обработчики и задачи
+# планировщика, прежде чем закрывать пул
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20").strip() or 20)
+
+# Сколько апдейтов одного чата может ждать обработки (middlewares/serialize.py);
+# лишние — двойные нажатия и флуд — отбрасываются
+CHAT_QUEUE_LIMIT = int(os.getenv("CHAT_QUEUE_LIMIT", "5").strip() or 5)
@@ -1,13 +1,55 @@
 import asyncpg
+import json
 import os
-from datetime import date, datetime
-from typing import Optional, List, Any
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time
+from typing import Optional, List, Any, Dict
+
+import events
+from config import ADMIN_ID, MANAGER_IDS
+from models import (
+    Category, WorkerRef, Worker, StaffRole, Identity, PriceItem, WorkerPriceItem,
+    WorkTotal, WorkSaved, WorkerAmount, DayLine, Entry, DeletedEntry, EntryUpdate,
+    TodayEntry, DateEntry, WorkerEntry, CategoryEntry,
+    MonthlyDetail, WorkerMonthlyDetail, AdminEntry, WorkerBalance, DailySummaryRow, RollupRow,
+    Advance, DeletedAdvance, Penalty, DeletedPenalty, ReminderSettings, ReminderJob,
+    WorkerReminderPrefs, AuditRecord,
+)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
 # Пул соединений (глобальный)
 pool: Optional[asyncpg.Pool] = None
 
+# Логгеры запросов (callback(LoggedQuery)) — вешаются на каждое соединение пула.
+# Используются бенчмарками и проверкой планов запросов.
+query_loggers: List[Any] = []
+
+# Индексы: (имя, определение). INCLUDE-колонки покрывают агрегаты баланса
+# (SUM/COUNT по работнику и месяцу считаются index-only scan'ом).
+INDEXES = [
+    ("idx_worklog_worker_date_cov",
+     "work_log (worker_id, work_date) INCLUDE (total, quantity, work_code, price_per_unit)"),
+    ("idx_worklog_date_cov", "work_log (work_date) INCLUDE (worker_id, total)"),
+    ("idx_worklog_code_date", "work_log (work_code, work_date)"),
+    ("idx_advances_worker_date_cov", "advances (worker_id, advance_date) INCLUDE (amount)"),
+    ("idx_advances_date_cov", "advances (advance_date) INCLUDE (worker_id, amount)"),
+    ("idx_penalties_worker_date_cov", "penalties (worker_id, penalty_date) INCLUDE (amount)"),
+    ("idx_penalties_date_cov", "penalties (penalty_date) INCLUDE (worker_id, amount)"),
+    ("idx_worker_categories_category", "worker_categories (category_code, worker_id)"),
+    ("idx_price_list_category_active", "price_list (category_code, name) WHERE is_active"),
+    ("idx_workers_active", "workers (name) INCLUDE (telegram_id) WHERE is_active"),
+]
+
+# Старые индексы, которые перекрыты покрывающими версиями выше
+OBSOLETE_INDEXES = [
+    "idx_worklog_worker_date", "idx_worklog_date",
+    "idx_advances_worker_date", "idx_penalties_worker_date",
+    "idx_worker_categories",  # дублирует PRIMARY KEY (worker_id, category_code)
+]
+
 
 def parse_date(value):
     """Преобразует строку в date"""
@@ -22,6 +64,73 @@ def parse_date(value):
     return date.today()
 
 
+def month_bounds(year: int, month: int):
+    """(2025, 3) -> (date(2025, 3, 1), date(2025, 4, 1)) — полуинтервал для индекса"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+# ==================== ЗАПРОСЫ И КЭШ ЗАПРОСОВ ====================
+
+# Запросы выполняются прямо через conn.fetch/fetchval/execute; готовит их
+# встроенный кэш asyncpg: каждое соединение пула держит до
+# STATEMENT_CACHE_SIZE подготовленных запросов (LRU) и после смены схемы
+# готовит их заново. Размер с запасом на все запросы модуля.
+# _fetch/_fetchrow добавляют к conn.fetch/fetchrow только строки-модели.
+STATEMENT_CACHE_SIZE = 256
+
+
+async def _fetch(conn, model, query: str, *args) -> list:
+    """Строки запроса в виде model (NamedTuple); model=None — исходные Record"""
+    rows = await conn.fetch(query, *args)
+    if model is None:
+        return rows
+    make = model._make
+    return [make(r) for r in rows]
+
+
+async def _fetchrow(conn, model, query: str, *args):
+    row = await conn.fetchrow(query, *args)
+    if row is None or model is None:
+        return row
+    return model._make(row)
+
+
+async def _init_connection(conn):
+    """Вызывается пулом для каждого нового соединения"""
+    for logger in query_loggers:
+        conn.add_query_logger(logger)
+
+
+# Горячие запросы и аргументы для прогрева: {запрос: args}. prepare_pool
+# выполняет их заранее, ещё до первого вызова (lifecycle.warmup)
+HOT_STATEMENTS: Dict[str, tuple] = {}
+
+
+async def prepare_pool():
+    """Прогревает кэш запросов asyncpg на всех min_size соединениях пула:
+    каждый горячий запрос выполняется тем же conn.fetch, что и в работе,
+    в транзакции, которая откатывается. Запрос попадает в кэш при
+    подготовке, поэтому ошибка выполнения (например, FK на несуществующего
+    работника в аргументах прогрева) не мешает"""
+    conns = [await pool.acquire() for _ in range(pool.get_min_size())]
+    try:
+        for conn in conns:
+            for query, args in HOT_STATEMENTS.items():
+                tr = conn.transaction()
+                await tr.start()
+                try:
+                    await conn.fetch(query, *args)
+                except asyncpg.PostgresError:
+                    pass
+                finally:
+                    await tr.rollback()
+    finally:
+        for conn in conns:
+            await pool.release(conn)
+
+
 async def init_db():
     """Инициализация пула соединений и создание таблиц"""
     global pool
@@ -31,7 +140,9 @@ async def init_db():
         max_size=18,          # Максимум (из 22 доступных на Railway)
         max_inactive_connection_lifetime=300,  # Закрывать неактивные через 5 мин
         command_timeout=60,   # Таймаут команды 60 сек
-        timeout=30            # Таймаут получения соединения из пула
+        timeout=30,           # Таймаут получения соединения из пула
+        statement_cache_size=STATEMENT_CACHE_SIZE,
+        init=_init_connection
     )
 
     async with pool.acquire() as conn:
@@ -122,6 +233,31 @@ async def init_db():
             ALTER TABLE work_log
             ALTER COLUMN quantity TYPE REAL
         """)
+        # Мягкое удаление: неактивные работники и позиции уходят из рабочего
+        # набора, их история переносится в архив (archive_inactive)
+        await conn.execute("""
+            ALTER TABLE workers
+            ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE,
+            ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP
+        """)
+        await conn.execute("""
+            ALTER TABLE price_list
+            ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP
+        """)
+        # Категория остаётся в таблице: на неё ссылаются позиции прайса,
+        # в том числе неактивные, и история в отчётах
+        await conn.execute("""
+            ALTER TABLE categories
+            ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE,
+            ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP
+        """)
+        # Личное расписание напоминаний: NULL — как в reminder_settings
+        await conn.execute("""
+            ALTER TABLE workers
+            ADD COLUMN IF NOT EXISTS reminder_tz TEXT,
+            ADD COLUMN IF NOT EXISTS evening_time TIME,
+            ADD COLUMN IF NOT EXISTS late_time TIME
+        """)
 
         count = await conn.fetchval("SELECT COUNT(*) FROM reminder_settings")
         if count == 0:
@@ -132,11 +268,270 @@ async def init_db():
                 VALUES (1, 18, 0, 20, 0, 21, 0, TRUE, TRUE, TRUE)
             """)
 
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_worklog_worker_date ON work_log(worker_id, work_date)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_worklog_date ON work_log(work_date)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_advances_worker_date ON advances(worker_id, advance_date)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_penalties_worker_date ON penalties(worker_id, penalty_date)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_worker_categories ON worker_categories(worker_id, category_code)")
+        # Последний выполненный запуск каждой задачи напоминаний: по нему
+        # после рестарта видно пропущенные срабатывания
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS reminder_job_state (
+                job_id TEXT PRIMARY KEY,
+                last_run_at TIMESTAMP NOT NULL
+            )
+        """)
+
+        # Последняя записанная в work_log запись журнала write-behind
+        # (services/write_behind.py) — повтор журнала её пропустит
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS write_behind_state (
+                journal TEXT PRIMARY KEY,
+                last_seq BIGINT NOT NULL
+            )
+        """)
+
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS staff_roles (
+                telegram_id BIGINT PRIMARY KEY,
+                role TEXT NOT NULL CHECK (role IN ('admin', 'manager')),
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Менеджеры из .env переносятся один раз, дальше правятся из бота.
+        # Администратор всегда один — тот, что указан в ADMIN_ID.
+        if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM staff_roles)"):
+            await conn.executemany("""
+                INSERT INTO staff_roles (telegram_id, role) VALUES ($1, 'manager')
+                ON CONFLICT DO NOTHING
+            """, [(m,) for m in MANAGER_IDS if m != ADMIN_ID])
+        await conn.execute(
+            "DELETE FROM staff_roles WHERE role = 'admin' AND telegram_id <> $1", ADMIN_ID)
+        if ADMIN_ID:
+            await conn.execute("""
+                INSERT INTO staff_roles (telegram_id, role) VALUES ($1, 'admin')
+                ON CONFLICT (telegram_id) DO UPDATE SET role = 'admin', updated_at = CURRENT_TIMESTAMP
+            """, ADMIN_ID)
+
+        for name, definition in INDEXES:
+            await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+        for name in OBSOLETE_INDEXES:
+            await conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        await _ensure_rollup(conn)
+        await conn.execute(AUDIT_DDL)
+        await conn.execute(ARCHIVE_DDL)
+
+
+# Дневные итоги work_log: дата × работник × работа × расценка. Ведутся
+# триггерами уровня оператора по таблицам переходов — одно обновление на
+# оператор, а не на строку, поэтому COPY и массовый пересчёт цен не
+# замедляются. Строка удаляется, когда в ней не остаётся записей.
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS work_daily (
+    work_date DATE NOT NULL,
+    worker_id BIGINT NOT NULL,
+    work_code TEXT NOT NULL,
+    price_per_unit REAL NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    total DOUBLE PRECISION NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (work_date, worker_id, work_code, price_per_unit)
+);
+CREATE INDEX IF NOT EXISTS idx_work_daily_worker_date ON work_daily (worker_id, work_date);
+
+CREATE OR REPLACE FUNCTION work_daily_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO work_daily AS d
+            (work_date, worker_id, work_code, price_per_unit, quantity, total, entries)
+        SELECT work_date, worker_id, work_code, price_per_unit,
+               -SUM(quantity), -SUM(total), -COUNT(*)
+        FROM old_rows
+        GROUP BY work_date, worker_id, work_code, price_per_unit
+        ON CONFLICT (work_date, worker_id, work_code, price_per_unit) DO UPDATE
+        SET quantity = d.quantity + EXCLUDED.quantity,
+            total = d.total + EXCLUDED.total,
+            entries = d.entries + EXCLUDED.entries;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO work_daily AS d
+            (work_date, worker_id, work_code, price_per_unit, quantity, total, entries)
+        SELECT work_date, worker_id, work_code, price_per_unit,
+               SUM(quantity), SUM(total), COUNT(*)
+        FROM new_rows
+        GROUP BY work_date, worker_id, work_code, price_per_unit
+        ON CONFLICT (work_date, worker_id, work_code, price_per_unit) DO UPDATE
+        SET quantity = d.quantity + EXCLUDED.quantity,
+            total = d.total + EXCLUDED.total,
+            entries = d.entries + EXCLUDED.entries;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM work_daily d
+        USING (SELECT DISTINCT work_date, worker_id, work_code, price_per_unit FROM old_rows) o
+        WHERE d.work_date = o.work_date AND d.worker_id = o.worker_id
+          AND d.work_code = o.work_code AND d.price_per_unit = o.price_per_unit
+          AND d.entries <= 0;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION work_daily_truncate() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE work_daily;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS work_daily_ins ON work_log;
+DROP TRIGGER IF EXISTS work_daily_upd ON work_log;
+DROP TRIGGER IF EXISTS work_daily_del ON work_log;
+DROP TRIGGER IF EXISTS work_daily_trunc ON work_log;
+CREATE TRIGGER work_daily_ins AFTER INSERT ON work_log
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION work_daily_apply();
+CREATE TRIGGER work_daily_upd AFTER UPDATE ON work_log
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION work_daily_apply();
+CREATE TRIGGER work_daily_del AFTER DELETE ON work_log
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION work_daily_apply();
+CREATE TRIGGER work_daily_trunc AFTER TRUNCATE ON work_log
+    FOR EACH STATEMENT EXECUTE FUNCTION work_daily_truncate();
+"""
+
+
+# Журнал изменений денежных таблиц: образы строки до и после правки.
+# Пишется триггерами уровня оператора — одна вставка на оператор, без
+# лишних запросов из бота; вставки (добавление работ) не журналируются,
+# поэтому горячий путь записи не замедляется. Кто менял — настройка
+# сеанса cabinet.actor (set_actor). Строки журнала не меняются и не
+# удаляются.
+AUDIT_DDL = """
+CREATE TABLE IF NOT EXISTS audit_log (
+    id BIGSERIAL PRIMARY KEY,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    actor BIGINT,
+    table_name TEXT NOT NULL,
+    op TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    worker_id BIGINT,
+    before JSONB,
+    after JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_audit_row ON audit_log (table_name, row_id, id);
+CREATE INDEX IF NOT EXISTS idx_audit_worker_time ON audit_log (worker_id, changed_at);
+
+CREATE OR REPLACE FUNCTION audit_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    who BIGINT := NULLIF(current_setting('cabinet.actor', true), '')::BIGINT;
+BEGIN
+    -- Перенос истории в архив — не правка: строки целиком лежат в *_archive
+    IF current_setting('cabinet.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO audit_log (actor, table_name, op, row_id, worker_id, before, after)
+        SELECT who, TG_TABLE_NAME, 'update', n.id, n.worker_id, to_jsonb(o), to_jsonb(n)
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        WHERE to_jsonb(o) IS DISTINCT FROM to_jsonb(n);
+    ELSE
+        INSERT INTO audit_log (actor, table_name, op, row_id, worker_id, before)
+        SELECT who, TG_TABLE_NAME, 'delete', o.id, o.worker_id, to_jsonb(o)
+        FROM old_rows o;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION audit_readonly() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- Восстановление снимка (snapshots.restore_snapshot) заменяет журнал целиком
+    IF TG_OP = 'TRUNCATE' AND current_setting('cabinet.restoring', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    RAISE EXCEPTION 'audit_log: журнал только для добавления';
+END $$;
+
+DROP TRIGGER IF EXISTS audit_log_readonly ON audit_log;
+CREATE TRIGGER audit_log_readonly BEFORE UPDATE OR DELETE OR TRUNCATE ON audit_log
+    FOR EACH STATEMENT EXECUTE FUNCTION audit_readonly();
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['work_log', 'advances', 'penalties'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS audit_upd ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS audit_del ON %I', t);
+        EXECUTE format('CREATE TRIGGER audit_upd AFTER UPDATE ON %I
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION audit_apply()', t);
+        EXECUTE format('CREATE TRIGGER audit_del AFTER DELETE ON %I
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION audit_apply()', t);
+    END LOOP;
+END $$;
+"""
+
+
+# Архив: история неактивных работников и убранные позиции прайса.
+# Те же колонки, что у рабочих таблиц, плюс время переноса; без внешних
+# ключей — архив не мешает ни удалению, ни повторному добавлению. id не
+# уникален: импорт из JSON начинает нумерацию заново.
+ARCHIVE_DDL = """
+CREATE TABLE IF NOT EXISTS work_log_archive (
+    archive_id BIGSERIAL PRIMARY KEY,
+    LIKE work_log,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_work_log_archive_worker_date ON work_log_archive (worker_id, work_date);
+CREATE TABLE IF NOT EXISTS advances_archive (
+    archive_id BIGSERIAL PRIMARY KEY,
+    LIKE advances,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_advances_archive_worker_date ON advances_archive (worker_id, advance_date);
+CREATE TABLE IF NOT EXISTS penalties_archive (
+    archive_id BIGSERIAL PRIMARY KEY,
+    LIKE penalties,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_penalties_archive_worker_date ON penalties_archive (worker_id, penalty_date);
+CREATE TABLE IF NOT EXISTS price_list_archive (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    price_type TEXT NOT NULL,
+    category_code TEXT NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+ARCHIVE_TABLES = ('work_log_archive', 'advances_archive', 'penalties_archive', 'price_list_archive')
+
+
+async def _ensure_rollup(conn):
+    """Создаёт work_daily с триггерами и при первом запуске заполняет её"""
+    async with conn.transaction():
+        # Блокировка: записи в work_log ждут, пока итоги не будут заполнены
+        await conn.execute("LOCK TABLE work_log IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(ROLLUP_DDL)
+        if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM work_daily)"):
+            await _fill_rollup(conn)
+
+
+async def _fill_rollup(conn):
+    await conn.execute("""
+        INSERT INTO work_daily
+            (work_date, worker_id, work_code, price_per_unit, quantity, total, entries)
+        SELECT work_date, worker_id, work_code, price_per_unit,
+               SUM(quantity), SUM(total), COUNT(*)
+        FROM work_log
+        GROUP BY work_date, worker_id, work_code, price_per_unit
+    """)
+
+
+async def rebuild_rollup():
+    """Пересобирает work_daily из work_log (сверка после ручных правок БД)"""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("LOCK TABLE work_log IN SHARE ROW EXCLUSIVE MODE")
+            await conn.execute("TRUNCATE work_daily")
+            await _fill_rollup(conn)
 
 
 async def close_db():
@@ -146,316 +541,650 @@ async def close_db():
         await pool.close()
 
 
-# ==================== КАТЕГОРИИ ====================
+# ==================== ТРАНЗАКЦИИ ====================
+
+# События, отложенные до коммита текущего unit_of_work
+_pending_events: ContextVar[Optional[list]] = ContextVar('pending_events', default=None)
+
+
+async def _publish(conn, topic: str, **data):
+    """Сообщает об изменении другим процессам (NOTIFY уходит с коммитом
+    транзакции conn) и своим подписчикам — сразу или после коммита
+    объемлющего unit_of_work"""
+    await conn.execute("SELECT pg_notify($1, $2)", events.CHANNEL, events.encode(topic, data))
+    _publish_local(topic, data)
+
+
+def _publish_local(topic: str, data: dict):
+    """Своим подписчикам — сразу или после коммита объемлющего unit_of_work.
+    Для запросов, которые сами делают pg_notify"""
+    pending = _pending_events.get()
+    if pending is not None:
+        pending.append((topic, data))
+    else:
+        events.publish(topic, **data)
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """Одно соединение и одна транзакция на группу изменений:
 
-async def add_category(code: str, name: str, emoji: str = "📦"):
+        async with unit_of_work() as conn:
+            await update_price(code, price, conn=conn)
+            await recalculate_entries_from_march(code, price, conn=conn)
+
+    Функции записи принимают conn и тогда работают внутри этой транзакции.
+    События об изменениях уходят только после успешного коммита.
+    """
+    pending = []
+    token = _pending_events.set(pending)
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+    finally:
+        _pending_events.reset(token)
+    for topic, data in pending:
+        events.publish(topic, **data)
+
+
+# Кто выполняет текущий апдейт (telegram_id); ставит RoleMiddleware
+current_actor: ContextVar[Optional[int]] = ContextVar('current_actor', default=None)
+
+
+async def set_actor(conn):
+    """Передаёт current_actor триггерам журнала изменений. Настройка живёт
+    до возврата соединения в пул (сброс пула делает RESET ALL)"""
+    actor = current_actor.get()
+    await conn.execute("SELECT set_config('cabinet.actor', $1, false)",
+                       '' if actor is None else str(actor))
+
+
+@asynccontextmanager
+async def _connection(conn=None):
+    """Соединение из unit_of_work, если передано, иначе — из пула"""
+    if conn is not None:
+        yield conn
+        return
     async with pool.acquire() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def _transaction(conn=None):
+    """Как _connection, но всегда внутри транзакции: без conn — свой
+    unit_of_work (события — после коммита)"""
+    if conn is None:
+        async with unit_of_work() as conn:
+            yield conn
+    elif conn.is_in_transaction():
+        yield conn
+    else:
+        async with conn.transaction():
+            yield conn
+
+
+# ==================== БЛОКИРОВКИ РАБОТНИКОВ ====================
+
+# Класс рекомендательных блокировок (первый ключ pg_advisory_xact_lock)
+LOCK_WORKER = 1
+
+_LOCK_WORKERS = """
+    SELECT pg_advisory_xact_lock($1, h)
+    FROM (SELECT DISTINCT hashint8(w) AS h FROM unnest($2::BIGINT[]) w ORDER BY h) x
+"""
+HOT_STATEMENTS[_LOCK_WORKERS] = (LOCK_WORKER, [])
+
+
+async def _lock_workers(conn, worker_ids):
+    """Денежные изменения работника (работы, авансы, штрафы) идут по очереди:
+    блокировка держится до конца транзакции, следующий оператор уже видит
+    всё закоммиченное до неё. Другие работники не ждут. Порядок взятия
+    общий, поэтому блокировки нескольких работников не дают взаимоблокировки"""
+    await conn.execute(_LOCK_WORKERS, LOCK_WORKER, list(worker_ids))
+
+
+async def _lock_row_worker(conn, table: str, row_id: int):
+    """Блокирует работника строки table (work_log, advances, penalties)"""
+    worker_id = await conn.fetchval(f"SELECT worker_id FROM {table} WHERE id = $1", row_id)
+    if worker_id is not None:
+        await _lock_workers(conn, [worker_id])
+
+
+# ==================== КЭШ СПРАВОЧНИКОВ ====================
+
+# Справочники читаются на каждом экране, а меняются редко. Ключ — кортеж
+# (справочник, параметр); события удаляют только затронутые ключи, и
+# следующее чтение загружает их заново.
+_ref_cache: dict = {}
+# Счётчик сбросов: загрузка, пересёкшаяся с событием, в кэш не попадает
+_ref_epoch = 0
+
+
+async def _cached(key: tuple, load):
+    value = _ref_cache.get(key)
+    if value is None:
+        epoch = _ref_epoch
+        value = await load()
+        if epoch == _ref_epoch:
+            _ref_cache[key] = value
+    return value
+
+
+def _drop(*keys, kind: str = None):
+    """Удаляет ключи и (если задан kind) все ключи этого справочника"""
+    global _ref_epoch
+    _ref_epoch += 1
+    for key in keys:
+        _ref_cache.pop(key, None)
+    if kind is not None:
+        for key in [k for k in _ref_cache if k[0] == kind]:
+            del _ref_cache[key]
+
+
+def _on_categories(**_):
+    # В прайсе — названия категорий, удаление категории скрывает её позиции
+    _drop(('categories',), ('price_list',), kind='worker_price_list')
+
+
+def _on_price_list(**_):
+    _drop(('price_list',), kind='worker_price_list')
+
+
+def _on_worker(worker_id=None, **_):
+    if worker_id is None:
+        _drop(('workers',), kind='worker_price_list')
+    else:
+        _drop(('workers',), ('worker_price_list', worker_id))
+
+
+def _on_worker_categories(worker_id=None, **_):
+    if worker_id is None:
+        _drop(kind='worker_price_list')
+    else:
+        _drop(('worker_price_list', worker_id))
+
+
+def _on_reminder_settings(**_):
+    _drop(('reminder_settings',))
+
+
+def _on_resync(**_):
+    global _ref_epoch
+    _ref_epoch += 1
+    _ref_cache.clear()
+
+
+events.subscribe('categories', _on_categories)
+events.subscribe('price_list', _on_price_list)
+events.subscribe('workers', _on_worker)
+events.subscribe('worker_categories', _on_worker_categories)
+events.subscribe('reminder_settings', _on_reminder_settings)
+events.subscribe(events.RESYNC, _on_resync)
+
+
+# ==================== КАТЕГОРИИ ====================
+
+async def add_category(code: str, name: str, emoji: str = "📦", conn=None):
+    async with _connection(conn) as conn:
         await conn.execute("""
             INSERT INTO categories (code, name, emoji) VALUES ($1, $2, $3)
-            ON CONFLICT (code) DO UPDATE SET name = $2, emoji = $3
+            ON CONFLICT (code) DO UPDATE
+            SET name = $2, emoji = $3, is_active = TRUE, archived_at = NULL
         """, code, name, emoji)
+        await _publish(conn, 'categories', code=code)
 
 
 async def get_categories():
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("SELECT code, name, emoji FROM categories ORDER BY name")
-        return [tuple(row) for row in rows]
+    return list(await _cached(('categories',), _load_categories))
 
 
-async def delete_category(code: str):
+async def _load_categories():
     async with pool.acquire() as conn:
+        return await _fetch(conn, Category,
+                            "SELECT code, name, emoji FROM categories WHERE is_active ORDER BY name")
+
+
+async def delete_category(code: str, conn=None):
+    """Убирает категорию (is_active = FALSE) вместе с её позициями прайса.
+    Строки остаются: на позиции ссылаются записи работ, на категорию — позиции"""
+    async with _transaction(conn) as conn:
         await conn.execute("DELETE FROM worker_categories WHERE category_code = $1", code)
-        await conn.execute("UPDATE price_list SET is_active = FALSE WHERE category_code = $1", code)
-        await conn.execute("DELETE FROM categories WHERE code = $1", code)
+        await conn.execute("""
+            UPDATE price_list SET is_active = FALSE, archived_at = CURRENT_TIMESTAMP
+            WHERE category_code = $1 AND is_active
+        """, code)
+        await conn.execute("""
+            UPDATE categories SET is_active = FALSE, archived_at = CURRENT_TIMESTAMP
+            WHERE code = $1
+        """, code)
+        await _publish(conn, 'categories', code=code)
 
 
-async def update_category(code: str, new_name: str = None, new_emoji: str = None):
-    async with pool.acquire() as conn:
-        if new_name and new_emoji:
-            await conn.execute(
-                "UPDATE categories SET name = $1, emoji = $2 WHERE code = $3",
-                new_name, new_emoji, code)
-        elif new_name:
-            await conn.execute(
-                "UPDATE categories SET name = $1 WHERE code = $2",
-                new_name, code)
-        elif new_emoji:
-            await conn.execute(
-                "UPDATE categories SET emoji = $1 WHERE code = $2",
-                new_emoji, code)
+async def update_category(code: str, new_name: str = None, new_emoji: str = None, conn=None):
+    async with _connection(conn) as conn:
+        await conn.execute("""
+            UPDATE categories
+            SET name = COALESCE($1, name), emoji = COALESCE($2, emoji)
+            WHERE code = $3
+        """, new_name or None, new_emoji or None, code)
+        await _publish(conn, 'categories', code=code)
 
 
 # ==================== РАБОТНИКИ ====================
 
-async def add_worker(telegram_id: int, name: str):
-    async with pool.acquire() as conn:
+async def add_worker(telegram_id: int, name: str, conn=None):
+    async with _connection(conn) as conn:
         await conn.execute("""
             INSERT INTO workers (telegram_id, name) VALUES ($1, $2)
-            ON CONFLICT (telegram_id) DO UPDATE SET name = $2
+            ON CONFLICT (telegram_id) DO UPDATE
+            SET name = $2, is_active = TRUE, archived_at = NULL
         """, telegram_id, name)
+        await _publish(conn, 'workers', worker_id=telegram_id)
 
 
 async def worker_exists(telegram_id: int) -> bool:
     async with pool.acquire() as conn:
         result = await conn.fetchval(
-            "SELECT 1 FROM workers WHERE telegram_id = $1", telegram_id)
+            "SELECT 1 FROM workers WHERE telegram_id = $1 AND is_active", telegram_id)
         return result is not None
 
 
 async def get_all_workers():
+    return list(await _cached(('workers',), _load_all_workers))
+
+
+async def _load_all_workers():
     async with pool.acquire() as conn:
-        rows = await conn.fetch("SELECT telegram_id, name FROM workers ORDER BY name")
-        return [tuple(row) for row in rows]
+        return await _fetch(conn, WorkerRef,
+            "SELECT telegram_id, name FROM workers WHERE is_active ORDER BY name")
 
 
 async def get_worker(telegram_id: int):
     """Получает информацию о работнике по telegram_id"""
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
+        return await _fetchrow(
+            conn, Worker,
             "SELECT telegram_id, name, registered_at FROM workers WHERE telegram_id = $1",
             telegram_id
         )
-        if row:
-            return {
-                'telegram_id': row['telegram_id'],
-                'name': row['name'],
-                'registered_at': row['registered_at']
-            }
-        return None
 
 
-async def delete_worker(telegram_id: int):
-    """Удаляет работника и ВСЕ его связанные данные"""
-    async with pool.acquire() as conn:
-        async with conn.transaction():
-            # 1. Удаляем записи о работе
-            await conn.execute(
-                'DELETE FROM work_log WHERE worker_id = $1',
-                telegram_id
-            )
-
-            # 2. Удаляем авансы
-            await conn.execute(
-                'DELETE FROM advances WHERE worker_id = $1',
-                telegram_id
-            )
-
-            # 3. Удаляем штрафы
-            await conn.execute(
-                'DELETE FROM penalties WHERE worker_id = $1',
-                telegram_id
-            )
-
-            # 4. Удаляем привязки к категориям
-            await conn.execute(
-                'DELETE FROM worker_categories WHERE worker_id = $1',
-                telegram_id
-            )
-
-            # 5. Удаляем самого работника
-            await conn.execute(
-                'DELETE FROM workers WHERE telegram_id = $1',
-                telegram_id
-            )
+async def delete_worker(telegram_id: int, conn=None) -> bool:
+    """Убирает работника из рабочего набора. Время не зависит от объёма
+    истории: она остаётся на месте и переносится в архив позже
+    (archive_inactive)"""
+    async with _connection(conn) as conn:
+        deleted = await conn.fetchval("""
+            WITH wc AS (DELETE FROM worker_categories WHERE worker_id = $1)
+            UPDATE workers SET is_active = FALSE, archived_at = CURRENT_TIMESTAMP
+            WHERE telegram_id = $1 AND is_active
+            RETURNING telegram_id
+        """, telegram_id)
+        if deleted is not None:
+            await _publish(conn, 'workers', worker_id=telegram_id)
+    return deleted is not None
 
 
 async def get_worker_deletion_info(telegram_id: int) -> dict:
     """Получает информацию о данных работника перед удалением"""
     async with pool.acquire() as conn:
-        work_count = await conn.fetchval(
-            'SELECT COUNT(*) FROM work_log WHERE worker_id = $1',
-            telegram_id
-        )
-
-        advances_count = await conn.fetchval(
-            'SELECT COUNT(*) FROM advances WHERE worker_id = $1',
-            telegram_id
-        )
-
-        penalties_count = await conn.fetchval(
-            'SELECT COUNT(*) FROM penalties WHERE worker_id = $1',
-            telegram_id
-        )
+        row = await _fetchrow(conn, None, """
+            SELECT wl.cnt AS work_count, wl.total AS total_earned,
+                   adv.cnt AS advances_count, adv.total AS total_advances,
+                   pen.cnt AS penalties_count, pen.total AS total_penalties
+            FROM (SELECT COUNT(*) AS cnt, COALESCE(SUM(total), 0) AS total
+                  FROM work_log WHERE worker_id = $1) wl,
+                 (SELECT COUNT(*) AS cnt, COALESCE(SUM(amount), 0) AS total
+                  FROM advances WHERE worker_id = $1) adv,
+                 (SELECT COUNT(*) AS cnt, COALESCE(SUM(amount), 0) AS total
+                  FROM penalties WHERE worker_id = $1) pen
+        """, telegram_id)
+        return dict(row)
+
+
+async def rename_worker(telegram_id: int, new_name: str, conn=None):
+    async with _connection(conn) as conn:
+        await conn.execute(
+            "UPDATE workers SET name = $1 WHERE telegram_id = $2", new_name, telegram_id)
+        await _publish(conn, 'workers', worker_id=telegram_id)
 
-        total_earned = await conn.fetchval(
-            'SELECT COALESCE(SUM(total), 0) FROM work_log WHERE worker_id = $1',
-            telegram_id
-        )
 
-        total_advances = await conn.fetchval(
-            'SELECT COALESCE(SUM(amount), 0) FROM advances WHERE worker_id = $1',
-            telegram_id
-        )
-
-        total_penalties = await conn.fetchval(
-            'SELECT COALESCE(SUM(amount), 0) FROM penalties WHERE worker_id = $1',
-            telegram_id
-        )
+# ==================== РОЛИ ====================
 
-        return {
-            'work_count': work_count,
-            'advances_count': advances_count,
-            'penalties_count': penalties_count,
-            'total_earned': total_earned,
-            'total_advances': total_advances,
-            'total_penalties': total_penalties
-        }
+async def get_staff_roles():
+    async with pool.acquire() as conn:
+        return await _fetch(conn, StaffRole, "SELECT telegram_id, role FROM staff_roles")
 
 
-async def rename_worker(telegram_id: int, new_name: str):
+async def get_identities(telegram_ids: List[int]):
+    """Имя и роль для каждого из telegram_ids — точечное обновление кэша ролей"""
     async with pool.acquire() as conn:
-        await conn.execute(
-            "UPDATE workers SET name = $1 WHERE telegram_id = $2", new_name, telegram_id)
+        return await _fetch(conn, Identity, """
+            SELECT t.id, w.name, r.role
+            FROM unnest($1::bigint[]) AS t(id)
+            LEFT JOIN workers w ON w.telegram_id = t.id AND w.is_active
+            LEFT JOIN staff_roles r ON r.telegram_id = t.id
+        """, telegram_ids)
+
+
+async def set_manager(telegram_id: int, is_manager: bool, conn=None):
+    """Назначает или снимает менеджера (роль администратора не трогает)"""
+    async with _connection(conn) as conn:
+        if is_manager:
+            await conn.execute("""
+                INSERT INTO staff_roles (telegram_id, role) VALUES ($1, 'manager')
+                ON CONFLICT (telegram_id) DO NOTHING
+            """, telegram_id)
+        else:
+            await conn.execute(
+                "DELETE FROM staff_roles WHERE telegram_id = $1 AND role = 'manager'",
+                telegram_id)
+        await _publish(conn, 'staff_roles', worker_id=telegram_id)
 
 
 # ==================== СВЯЗЬ РАБОТНИК-КАТЕГОРИЯ ====================
 
-async def assign_category_to_worker(worker_id: int, category_code: str):
-    async with pool.acquire() as conn:
+async def assign_category_to_worker(worker_id: int, category_code: str, conn=None):
+    async with _connection(conn) as conn:
         await conn.execute("""
             INSERT INTO worker_categories (worker_id, category_code) VALUES ($1, $2)
             ON CONFLICT DO NOTHING
         """, worker_id, category_code)
+        await _publish(conn, 'worker_categories', worker_id=worker_id)
 
 
-async def remove_category_from_worker(worker_id: int, category_code: str):
-    async with pool.acquire() as conn:
+async def remove_category_from_worker(worker_id: int, category_code: str, conn=None):
+    async with _connection(conn) as conn:
         await conn.execute(
             "DELETE FROM worker_categories WHERE worker_id = $1 AND category_code = $2",
             worker_id, category_code)
+        await _publish(conn, 'worker_categories', worker_id=worker_id)
 
 
 async def get_worker_categories(worker_id: int):
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, Category, """
             SELECT c.code, c.name, c.emoji
             FROM worker_categories wc
             JOIN categories c ON wc.category_code = c.code
             WHERE wc.worker_id = $1
             ORDER BY c.name
         """, worker_id)
-        return [tuple(row) for row in rows]
+
+
+async def get_worker_category_emojis() -> dict:
+    """Эмодзи категорий всех работников одним запросом: telegram_id -> строка"""
+    async with pool.acquire() as conn:
+        rows = await _fetch(conn, None, """
+            SELECT wc.worker_id, string_agg(c.emoji, '' ORDER BY c.name) AS emojis
+            FROM worker_categories wc
+            JOIN categories c ON wc.category_code = c.code
+            GROUP BY wc.worker_id
+        """)
+    return {row['worker_id']: row['emojis'] for row in rows}
+
+
+async def get_worker_category_codes() -> dict:
+    """Категории всех работников одним запросом: telegram_id -> {code, ...}"""
+    async with pool.acquire() as conn:
+        rows = await _fetch(conn, None, """
+            SELECT worker_id, array_agg(category_code) AS codes
+            FROM worker_categories
+            GROUP BY worker_id
+        """)
+    return {row['worker_id']: set(row['codes']) for row in rows}
+
+
+async def get_category_workers() -> dict:
+    """Имена работников по всем категориям одним запросом: code -> [имя, ...]"""
+    async with pool.acquire() as conn:
+        rows = await _fetch(conn, None, """
+            SELECT wc.category_code, array_agg(w.name ORDER BY w.name) AS names
+            FROM worker_categories wc
+            JOIN workers w ON wc.worker_id = w.telegram_id
+            GROUP BY wc.category_code
+        """)
+    return {row['category_code']: list(row['names']) for row in rows}
 
 
 async def get_workers_in_category(category_code: str):
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerRef, """
             SELECT w.telegram_id, w.name
             FROM worker_categories wc
             JOIN workers w ON wc.worker_id = w.telegram_id
             WHERE wc.category_code = $1
             ORDER BY w.name
         """, category_code)
-        return [tuple(row) for row in rows]
 
 
 # ==================== ПРАЙС-ЛИСТ ====================
 
-async def add_price_item(code: str, name: str, price: float, category_code: str, price_type: str = 'unit'):
-    async with pool.acquire() as conn:
+async def add_price_item(code: str, name: str, price: float, category_code: str, price_type: str = 'unit', conn=None):
+    async with _connection(conn) as conn:
         await conn.execute("""
             INSERT INTO price_list (code, name, price, price_type, category_code, is_active)
             VALUES ($1, $2, $3, $4, $5, TRUE)
-            ON CONFLICT (code) DO UPDATE SET name = $2, price = $3, price_type = $4, category_code = $5, is_active = TRUE
+            ON CONFLICT (code) DO UPDATE SET name = $2, price = $3, price_type = $4, category_code = $5,
+                                             is_active = TRUE, archived_at = NULL
         """, code, name, price, price_type, category_code)
+        await _publish(conn, 'price_list', code=code)
 
 
 async def get_price_list():
+    return list(await _cached(('price_list',), _load_price_list))
+
+
+async def _load_price_list():
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, PriceItem, """
             SELECT pl.code, pl.name, pl.price, pl.price_type, pl.category_code, c.name, c.emoji
             FROM price_list pl
             JOIN categories c ON pl.category_code = c.code
             WHERE pl.is_active = TRUE
             ORDER BY c.name, pl.name
         """)
-        return [tuple(row) for row in rows]
 
 
 async def get_price_list_for_worker(worker_id: int):
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT pl.code, pl.name, pl.price, pl.category_code, pl.price_type
-            FROM price_list pl
-            JOIN worker_categories wc ON pl.category_code = wc.category_code
-            WHERE wc.worker_id = $1 AND pl.is_active = TRUE
-            ORDER BY pl.category_code, pl.name
-        """, worker_id)
-        return [tuple(row) for row in rows]
-
-
-async def update_price(code: str, new_price: float):
-    async with pool.acquire() as conn:
+    async def load():
+        async with pool.acquire() as conn:
+            return await _fetch(conn, WorkerPriceItem, """
+                SELECT pl.code, pl.name, pl.price, pl.category_code, pl.price_type
+                FROM price_list pl
+                JOIN worker_categories wc ON pl.category_code = wc.category_code
+                WHERE wc.worker_id = $1 AND pl.is_active = TRUE
+                ORDER BY pl.category_code, pl.name
+            """, worker_id)
+    return list(await _cached(('worker_price_list', worker_id), load))
+
+
+async def update_price(code: str, new_price: float, conn=None):
+    async with _connection(conn) as conn:
         await conn.execute("UPDATE price_list SET price = $1 WHERE code = $2", new_price, code)
-
-
-async def delete_price_item_permanently(code: str) -> bool:
-    async with pool.acquire() as conn:
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM work_log WHERE work_code = $1", code)
-        if count > 0:
-            await conn.execute("UPDATE price_list SET is_active = FALSE WHERE code = $1", code)
-            return False
-        else:
-            await conn.execute("DELETE FROM price_list WHERE code = $1", code)
-            return True
+        await _publish(conn, 'price_list', code=code)
+
+
+async def delete_price_item_permanently(code: str, conn=None) -> bool:
+    """Убирает позицию из прайса (is_active = FALSE). Строка удаляется из
+    price_list в archive_inactive, когда на неё не останется записей.
+    Возвращает False, если активной позиции не было"""
+    async with _connection(conn) as conn:
+        found = await conn.fetchval("""
+            UPDATE price_list SET is_active = FALSE, archived_at = CURRENT_TIMESTAMP
+            WHERE code = $1 AND is_active
+            RETURNING code
+        """, code)
+        if found is not None:
+            await _publish(conn, 'price_list', code=code)
+        return found is not None
 
 
 async def update_work_item(code: str, new_name: str = None, new_price: float = None,
-                          new_price_type: str = None):
-    async with pool.acquire() as conn:
-        if new_name:
-            await conn.execute(
-                "UPDATE price_list SET name = $1 WHERE code = $2",
-                new_name, code)
-        if new_price is not None:
-            await conn.execute(
-                "UPDATE price_list SET price = $1 WHERE code = $2",
-                new_price, code)
-        if new_price_type:
-            await conn.execute(
-                "UPDATE price_list SET price_type = $1 WHERE code = $2",
-                new_price_type, code)
+                          new_price_type: str = None, conn=None):
+    async with _connection(conn) as conn:
+        await conn.execute("""
+            UPDATE price_list
+            SET name = COALESCE($1, name),
+                price = COALESCE($2, price),
+                price_type = COALESCE($3, price_type)
+            WHERE code = $4
+        """, new_name or None, new_price, new_price_type or None, code)
+        await _publish(conn, 'price_list', code=code)
 
 
 async def get_work_by_code(code: str):
     async with pool.acquire() as conn:
-        row = await conn.fetchrow("""
+        return await _fetchrow(conn, PriceItem, """
             SELECT pl.code, pl.name, pl.price, pl.price_type,
                    pl.category_code, c.name, c.emoji
             FROM price_list pl
             JOIN categories c ON pl.category_code = c.code
             WHERE pl.code = $1
         """, code)
-        return tuple(row) if row else None
 
 
 # ==================== ЗАПИСИ О РАБОТЕ ====================
 
-async def add_work(worker_id: int, work_code: str, quantity: float, price: float, work_date=None) -> float:
+# Горячий путь записи работы (add_work) — один оператор, то есть одна
+# (неявная) транзакция: блокировка работника, вставка, итоги и NOTIFY.
+# lock и notify — члены CTE, на которые ссылаются: иначе PostgreSQL
+# их не выполнит
+_ADD_WORK = f"""
+    WITH lock AS (
+        SELECT pg_advisory_xact_lock({LOCK_WORKER}, hashint8($1::BIGINT))
+    ), ins AS (
+        INSERT INTO work_log (worker_id, work_code, quantity, price_per_unit, total, work_date)
+        SELECT $1, $2::TEXT, $3::REAL, $4::REAL, $5::REAL, $6::DATE FROM lock
+        RETURNING total
+    ), mtd AS (
+        SELECT COALESCE(SUM(total) FILTER (WHERE work_date = $6), 0) AS day,
+               COALESCE(SUM(total), 0) AS earned
+        FROM work_daily
+        WHERE worker_id = $1 AND work_date >= $7 AND work_date < $8
+    ), notify AS (
+        SELECT pg_notify($9, $10) FROM ins
+    )
+    SELECT ins.total,
+           mtd.day + ins.total,
+           mtd.earned + ins.total,
+           mtd.earned + ins.total
+           - (SELECT COALESCE(SUM(amount), 0) FROM advances
+              WHERE worker_id = $1 AND advance_date >= $7 AND advance_date < $8)
+           - (SELECT COALESCE(SUM(amount), 0) FROM penalties
+              WHERE worker_id = $1 AND penalty_date >= $7 AND penalty_date < $8)
+    FROM ins, mtd, notify
+"""
+HOT_STATEMENTS[_ADD_WORK] = (0, '', 0.0, 0.0, 0.0, date.min, date.min, date.min,
+                             events.CHANNEL, '')
+
+
+async def add_work(worker_id: int, work_code: str, quantity: float, price: float, work_date=None,
+                   conn=None) -> WorkSaved:
+    """Добавляет запись и тем же запросом считает итог дня и баланс месяца.
+    Запрос видит work_daily без новой строки (триггер сработает после
+    оператора), поэтому её сумма прибавляется явно. Блокировка работника
+    ставит запись в очередь за его авансами, штрафами и правками; итоги
+    считаются по снимку начала оператора"""
     work_date = parse_date(work_date)
     total = quantity * price
+    month_start, month_end = month_bounds(work_date.year, work_date.month)
+    event = {'worker_id': worker_id, 'work_date': work_date, 'delta': total}
+    async with _connection(conn) as conn:
+        saved = await _fetchrow(conn, WorkSaved, _ADD_WORK,
+                                worker_id, work_code, quantity, price, total, work_date,
+                                month_start, month_end,
+                                events.CHANNEL, events.encode('work_log', event))
+    _publish_local('work_log', event)
+    return saved
+
+
+# Пачка write-behind одним оператором: блокировки работников (initplan
+# до вставки), вставка, last_seq журнала и NOTIFY на каждую пару
+# (работник, день)
+_ADD_WORK_BATCH = f"""
+    WITH lock AS (
+        SELECT pg_advisory_xact_lock({LOCK_WORKER}, h)
+        FROM (SELECT DISTINCT hashint8(w) AS h FROM unnest($1::BIGINT[]) w ORDER BY h) x
+    ), ins AS (
+        INSERT INTO work_log (worker_id, work_code, quantity, price_per_unit, total, work_date)
+        SELECT * FROM unnest($1::BIGINT[], $2::TEXT[], $3::REAL[], $4::REAL[], $5::REAL[], $6::DATE[])
+        WHERE (SELECT COUNT(*) FROM lock) >= 0
+        RETURNING 1
+    ), seq AS (
+        INSERT INTO write_behind_state (journal, last_seq) VALUES ($7, $8)
+        ON CONFLICT (journal) DO UPDATE
+        SET last_seq = GREATEST(write_behind_state.last_seq, EXCLUDED.last_seq)
+    ), notify AS (
+        SELECT pg_notify($9, payload) FROM unnest($10::TEXT[]) payload
+        WHERE (SELECT COUNT(*) FROM ins) >= 0
+    )
+    SELECT COUNT(*) FROM notify
+"""
+
+
+async def add_work_batch(entries, journal: str, last_seq: int):
+    """Пачка записей (worker_id, work_code, quantity, price, work_date) одним
+    оператором. last_seq журнала фиксируется в той же транзакции, поэтому
+    повтор журнала после сбоя не задвоит записи"""
+    columns = list(zip(*entries))
+    totals = [q * p for q, p in zip(columns[2], columns[3])]
+    dates = [parse_date(d) for d in columns[4]]
+    deltas = defaultdict(float)
+    for worker_id, work_date, total in zip(columns[0], dates, totals):
+        deltas[(worker_id, work_date)] += total
+    changes = [{'worker_id': worker_id, 'work_date': work_date, 'delta': delta}
+               for (worker_id, work_date), delta in deltas.items()]
     async with pool.acquire() as conn:
-        await conn.execute("""
-            INSERT INTO work_log (worker_id, work_code, quantity, price_per_unit, total, work_date)
-            VALUES ($1, $2, $3, $4, $5, $6)
-        """, worker_id, work_code, quantity, price, total, work_date)
-    return total
+        await conn.fetchval(_ADD_WORK_BATCH,
+                            columns[0], columns[1], columns[2], columns[3], totals, dates,
+                            journal, last_seq,
+                            events.CHANNEL, [events.encode('work_log', c) for c in changes])
+    for change in changes:
+        _publish_local('work_log', change)
+
 
+_SET_WRITE_BEHIND_SEQ = """
+    INSERT INTO write_behind_state (journal, last_seq) VALUES ($1, $2)
+    ON CONFLICT (journal) DO UPDATE
+    SET last_seq = GREATEST(write_behind_state.last_seq, EXCLUDED.last_seq)
+"""
 
-async def delete_last_entry(worker_id: int):
+
+async def set_write_behind_seq(journal: str, last_seq: int):
+    """Отмечает записи журнала до last_seq обработанными без вставки
+    (ушли в dead-letter)"""
     async with pool.acquire() as conn:
-        await conn.execute("""
+        await conn.execute(_SET_WRITE_BEHIND_SEQ, journal, last_seq)
+
+
+async def get_write_behind_seq(journal: str) -> int:
+    async with pool.acquire() as conn:
+        seq = await conn.fetchval(
+            "SELECT last_seq FROM write_behind_state WHERE journal = $1", journal)
+        return seq or 0
+
+
+async def delete_last_entry(worker_id: int, conn=None):
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        await _lock_workers(conn, [worker_id])
+        row = await _fetchrow(conn, None, """
             DELETE FROM work_log WHERE id = (
                 SELECT id FROM work_log WHERE worker_id = $1
                 ORDER BY created_at DESC LIMIT 1
             )
+            RETURNING work_date, total
         """, worker_id)
+        if row:
+            await _publish(conn, 'work_log', worker_id=worker_id, work_date=row['work_date'],
+                           delta=-row['total'])
 
 
 async def get_entry_by_id(entry_id: int):
     async with pool.acquire() as conn:
-        row = await conn.fetchrow("""
+        return await _fetchrow(conn, Entry, """
             SELECT wl.id, pl.name, wl.quantity, wl.price_per_unit, wl.total,
                    wl.work_date::TEXT, wl.worker_id, w.name, pl.price_type
             FROM work_log wl
@@ -463,35 +1192,48 @@ async def get_entry_by_id(entry_id: int):
             JOIN workers w ON wl.worker_id = w.telegram_id
             WHERE wl.id = $1
         """, entry_id)
-        return tuple(row) if row else None
 
 
-async def delete_entry_by_id(entry_id: int):
-    async with pool.acquire() as conn:
-        entry = await conn.fetchrow("""
-            SELECT wl.id, pl.name, wl.quantity, wl.total, wl.work_date::TEXT, w.name
-            FROM work_log wl
-            JOIN price_list pl ON wl.work_code = pl.code
-            JOIN workers w ON wl.worker_id = w.telegram_id
-            WHERE wl.id = $1
+async def delete_entry_by_id(entry_id: int, conn=None):
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        await _lock_row_worker(conn, 'work_log', entry_id)
+        entry = await _fetchrow(conn, DeletedEntry, """
+            WITH d AS (
+                DELETE FROM work_log WHERE id = $1
+                RETURNING id, worker_id, work_code, quantity, total, work_date
+            )
+            SELECT d.id, pl.name, d.quantity, d.total, d.work_date::TEXT, w.name, d.worker_id
+            FROM d
+            JOIN price_list pl ON d.work_code = pl.code
+            JOIN workers w ON d.worker_id = w.telegram_id
         """, entry_id)
         if entry:
-            await conn.execute("DELETE FROM work_log WHERE id = $1", entry_id)
-            return tuple(entry)
-        return None
-
-
-async def update_entry_quantity(entry_id: int, new_quantity: float) -> bool:
-    async with pool.acquire() as conn:
-        entry = await conn.fetchrow(
-            "SELECT price_per_unit FROM work_log WHERE id = $1", entry_id)
-        if entry:
-            new_total = new_quantity * entry['price_per_unit']
-            await conn.execute(
-                "UPDATE work_log SET quantity = $1, total = $2 WHERE id = $3",
-                new_quantity, new_total, entry_id)
-            return True
-        return False
+            await _publish(conn, 'work_log', worker_id=entry.worker_id,
+                           work_date=parse_date(entry.work_date), delta=-entry.total)
+    return entry
+
+
+async def update_entry_quantity(entry_id: int, new_quantity: float, conn=None):
+    """Меняет количество и сумму записи. Возвращает EntryUpdate (было/стало) или None"""
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        await _lock_row_worker(conn, 'work_log', entry_id)
+        changed = await _fetchrow(conn, EntryUpdate, """
+            WITH old AS (
+                SELECT id, quantity, total FROM work_log WHERE id = $2 FOR UPDATE
+            )
+            UPDATE work_log wl
+            SET quantity = $1, total = $1 * wl.price_per_unit
+            FROM old
+            WHERE wl.id = old.id
+            RETURNING wl.id, wl.worker_id, wl.work_date,
+                      old.quantity, old.total, wl.quantity, wl.total
+        """, new_quantity, entry_id)
+        if changed:
+            await _publish(conn, 'work_log', worker_id=changed.worker_id, work_date=changed.work_date,
+                           delta=changed.new_total - changed.old_total)
+    return changed
 
 
 # ==================== ОТЧЁТЫ ====================
@@ -499,13 +1241,12 @@ async def update_entry_quantity(entry_id: int, new_quantity: float) -> bool:
 async def get_daily_total(worker_id: int, target_date=None):
     target_date = parse_date(target_date)
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkTotal, """
             SELECT work_code, SUM(quantity), price_per_unit, SUM(total)
             FROM work_log
             WHERE worker_id = $1 AND work_date = $2
             GROUP BY work_code, price_per_unit
         """, worker_id, target_date)
-        return [tuple(row) for row in rows]
 
 
 async def get_monthly_total(worker_id: int, year: int = None, month: int = None):
@@ -514,28 +1255,52 @@ async def get_monthly_total(worker_id: int, year: int = None, month: int = None)
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkTotal, """
             SELECT work_code, SUM(quantity), price_per_unit, SUM(total)
             FROM work_log
             WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM work_date) = $2
-              AND EXTRACT(MONTH FROM work_date) = $3
+              AND work_date >= $2
+              AND work_date < $3
             GROUP BY work_code, price_per_unit
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
+        """, worker_id, *month_bounds(year, month))
 
 
 async def get_all_workers_daily_summary(target_date=None):
     target_date = parse_date(target_date)
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerAmount, """
             SELECT w.telegram_id, w.name, COALESCE(SUM(wl.total), 0)
             FROM workers w
             LEFT JOIN work_log wl ON w.telegram_id = wl.worker_id AND wl.work_date = $1
             GROUP BY w.telegram_id, w.name
+            HAVING w.is_active OR COUNT(wl.id) > 0
+            ORDER BY w.name
+        """, target_date)
+
+
+async def get_daily_summary_with_categories(target_date=None):
+    """Сумма за день по каждому работнику вместе с эмодзи его категорий"""
+    target_date = parse_date(target_date)
+    async with pool.acquire() as conn:
+        return await _fetch(conn, DailySummaryRow, """
+            SELECT w.telegram_id, w.name,
+                   COALESCE((
+                       SELECT string_agg(c.emoji, '' ORDER BY c.name)
+                       FROM worker_categories wc
+                       JOIN categories c ON wc.category_code = c.code
+                       WHERE wc.worker_id = w.telegram_id
+                   ), ''),
+                   COALESCE(d.total, 0)
+            FROM workers w
+            LEFT JOIN (
+                SELECT worker_id, SUM(total) AS total
+                FROM work_log
+                WHERE work_date = $1
+                GROUP BY worker_id
+            ) d ON w.telegram_id = d.worker_id
+            WHERE w.is_active OR d.worker_id IS NOT NULL
             ORDER BY w.name
         """, target_date)
-        return [tuple(row) for row in rows]
 
 
 async def get_all_workers_monthly_summary(year: int = None, month: int = None):
@@ -544,27 +1309,29 @@ async def get_all_workers_monthly_summary(year: int = None, month: int = None):
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerAmount, """
             SELECT w.telegram_id, w.name, COALESCE(SUM(wl.total), 0)
             FROM workers w
             LEFT JOIN work_log wl ON w.telegram_id = wl.worker_id
-                AND EXTRACT(YEAR FROM wl.work_date) = $2
-                AND EXTRACT(MONTH FROM wl.work_date) = $3
+                AND wl.work_date >= $1
+                AND wl.work_date < $2
             GROUP BY w.telegram_id, w.name
+            HAVING w.is_active OR COUNT(wl.id) > 0
             ORDER BY w.name
-        """, year, month)
-        return [tuple(row) for row in rows]
+        """, *month_bounds(year, month))
 
 
 async def get_workers_without_records(target_date=None):
     target_date = parse_date(target_date)
     async with pool.acquire() as conn:
-        all_workers = await conn.fetch("SELECT telegram_id, name FROM workers")
-        with_records = await conn.fetch(
-            "SELECT DISTINCT worker_id FROM work_log WHERE work_date = $1", target_date)
-        with_records_set = {r['worker_id'] for r in with_records}
-        return [(r['telegram_id'], r['name']) for r in all_workers
-                if r['telegram_id'] not in with_records_set]
+        return await _fetch(conn, WorkerRef, """
+            SELECT w.telegram_id, w.name
+            FROM workers w
+            WHERE w.is_active AND NOT EXISTS (
+                SELECT 1 FROM work_log wl
+                WHERE wl.worker_id = w.telegram_id AND wl.work_date = $1
+            )
+        """, target_date)
 
 
 async def get_monthly_by_days(worker_id: int, year: int = None, month: int = None):
@@ -573,23 +1340,22 @@ async def get_monthly_by_days(worker_id: int, year: int = None, month: int = Non
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, DayLine, """
             SELECT wl.work_date::TEXT, pl.name, SUM(wl.quantity),
                    wl.price_per_unit, SUM(wl.total)
             FROM work_log wl
             JOIN price_list pl ON wl.work_code = pl.code
             WHERE wl.worker_id = $1
-              AND EXTRACT(YEAR FROM wl.work_date) = $2
-              AND EXTRACT(MONTH FROM wl.work_date) = $3
+              AND wl.work_date >= $2
+              AND wl.work_date < $3
             GROUP BY wl.work_date, pl.name, wl.price_per_unit
             ORDER BY wl.work_date, pl.name
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
+        """, worker_id, *month_bounds(year, month))
 
 
 async def get_today_entries(worker_id: int):
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, TodayEntry, """
             SELECT wl.id, pl.name, wl.quantity, wl.price_per_unit, wl.total,
                    wl.created_at::TEXT, pl.price_type
             FROM work_log wl
@@ -597,13 +1363,12 @@ async def get_today_entries(worker_id: int):
             WHERE wl.worker_id = $1 AND wl.work_date = $2
             ORDER BY wl.created_at
         """, worker_id, date.today())
-        return [tuple(row) for row in rows]
 
 
 async def get_worker_entries_by_date(worker_id: int, target_date):
     target_date = parse_date(target_date)
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, DateEntry, """
             SELECT wl.id, pl.name, wl.quantity, wl.price_per_unit, wl.total,
                    wl.work_date::TEXT, wl.created_at::TEXT, pl.price_type
             FROM work_log wl
@@ -611,12 +1376,11 @@ async def get_worker_entries_by_date(worker_id: int, target_date):
             WHERE wl.worker_id = $1 AND wl.work_date = $2
             ORDER BY wl.created_at
         """, worker_id, target_date)
-        return [tuple(row) for row in rows]
 
 
 async def get_worker_recent_entries(worker_id: int, limit: int = 20):
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerEntry, """
             SELECT wl.id, pl.name, wl.quantity, wl.price_per_unit, wl.total,
                    wl.work_date::TEXT, wl.created_at::TEXT, w.name, pl.price_type
             FROM work_log wl
@@ -626,13 +1390,12 @@ async def get_worker_recent_entries(worker_id: int, limit: int = 20):
             ORDER BY wl.work_date DESC, wl.created_at DESC
             LIMIT $2
         """, worker_id, limit)
-        return [tuple(row) for row in rows]
 
 
 async def get_worker_entries_by_custom_date(worker_id: int, target_date):
     target_date = parse_date(target_date)
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, CategoryEntry, """
             SELECT wl.id, pl.name, c.name, c.emoji, wl.quantity,
                    wl.price_per_unit, wl.total, wl.created_at::TEXT, pl.price_type
             FROM work_log wl
@@ -641,7 +1404,6 @@ async def get_worker_entries_by_custom_date(worker_id: int, target_date):
             WHERE wl.worker_id = $1 AND wl.work_date = $2
             ORDER BY wl.created_at
         """, worker_id, target_date)
-        return [tuple(row) for row in rows]
 
 
 async def get_worker_monthly_details(worker_id: int, year: int = None, month: int = None):
@@ -649,43 +1411,34 @@ async def get_worker_monthly_details(worker_id: int, year: int = None, month: in
         year = date.today().year
     if month is None:
         month = date.today().month
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT pl.name, c.emoji, c.name, SUM(wl.quantity),
-                   wl.price_per_unit, SUM(wl.total), pl.price_type
-            FROM work_log wl
-            JOIN price_list pl ON wl.work_code = pl.code
-            JOIN categories c ON pl.category_code = c.code
-            WHERE wl.worker_id = $1
-              AND EXTRACT(YEAR FROM wl.work_date) = $2
-              AND EXTRACT(MONTH FROM wl.work_date) = $3
-            GROUP BY pl.name, c.emoji, c.name, wl.price_per_unit, pl.price_type
-            ORDER BY c.name, pl.name
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
+    rows = await get_rollup(*month_bounds(year, month), by=('category', 'work', 'price'),
+                            worker_id=worker_id)
+    return [MonthlyDetail(r.work_name, r.category_emoji, r.category_name, r.quantity,
+                          r.price_per_unit, r.total, r.price_type) for r in rows]
 
 
 async def get_all_workers_monthly_details(year: int = None, month: int = None):
+    """Строки по каждой работе каждого работника; у работника без записей —
+    одна строка с пустыми полями работы. Удалённые работники — только если
+    у них есть записи за месяц"""
     if year is None:
         year = date.today().year
     if month is None:
         month = date.today().month
-    async with pool.acquire() as conn:
-        rows = await conn.fetch("""
-            SELECT w.telegram_id, w.name,
-                   pl.name, c.emoji, c.name,
-                   SUM(wl.quantity), wl.price_per_unit, SUM(wl.total),
-                   COUNT(DISTINCT wl.work_date), pl.price_type
-            FROM workers w
-            LEFT JOIN work_log wl ON w.telegram_id = wl.worker_id
-                AND EXTRACT(YEAR FROM wl.work_date) = $1
-                AND EXTRACT(MONTH FROM wl.work_date) = $2
-            LEFT JOIN price_list pl ON wl.work_code = pl.code
-            LEFT JOIN categories c ON pl.category_code = c.code
-            GROUP BY w.telegram_id, w.name, pl.name, c.emoji, c.name, wl.price_per_unit, pl.price_type
-            ORDER BY w.name, c.name, pl.name
-        """, year, month)
-        return [tuple(row) for row in rows]
+    rows = await get_rollup(*month_bounds(year, month), by=('worker', 'category', 'work', 'price'))
+    by_worker = {}
+    for r in rows:
+        by_worker.setdefault(r.worker_id, []).append(WorkerMonthlyDetail(
+            r.worker_id, r.worker_name, r.work_name, r.category_emoji, r.category_name,
+            r.quantity, r.price_per_unit, r.total, r.days, r.price_type))
+    names = {w.telegram_id: w.name for w in await get_all_workers()}
+    for worker_id, details in by_worker.items():
+        names.setdefault(worker_id, details[0].worker_name)
+    result = []
+    for worker_id, name in sorted(names.items(), key=lambda item: item[1]):
+        result.extend(by_worker.get(worker_id) or [WorkerMonthlyDetail(
+            worker_id, name, None, None, None, None, None, None, 0, None)])
+    return result
 
 
 async def get_admin_monthly_detailed_all(year: int = None, month: int = None):
@@ -694,7 +1447,7 @@ async def get_admin_monthly_detailed_all(year: int = None, month: int = None):
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, AdminEntry, """
             SELECT
                 w.telegram_id,
                 w.name AS worker_name,
@@ -710,11 +1463,77 @@ async def get_admin_monthly_detailed_all(year: int = None, month: int = None):
             JOIN workers w ON wl.worker_id = w.telegram_id
             JOIN price_list pl ON wl.work_code = pl.code
             JOIN categories c ON pl.category_code = c.code
-            WHERE EXTRACT(YEAR FROM wl.work_date) = $1
-              AND EXTRACT(MONTH FROM wl.work_date) = $2
+            WHERE wl.work_date >= $1
+              AND wl.work_date < $2
             ORDER BY w.name, c.name, wl.work_date, wl.id
-        """, year, month)
-        return [tuple(row) for row in rows]
+        """, *month_bounds(year, month))
+
+
+# ==================== ДНЕВНЫЕ ИТОГИ (work_daily) ====================
+
+# Измерения среза: имя -> {поле RollupRow: выражение}, ключ сортировки, JOIN'ы
+ROLLUP_DIMENSIONS = {
+    'day': ({'work_date': 'd.work_date'}, 'd.work_date', ()),
+    'month': ({'month': "date_trunc('month', d.work_date)::date"},
+              "date_trunc('month', d.work_date)::date", ()),
+    'worker': ({'worker_id': 'd.worker_id', 'worker_name': 'w.name'}, 'w.name, d.worker_id', ('w',)),
+    'category': ({'category_code': 'pl.category_code', 'category_name': 'c.name',
+                  'category_emoji': 'c.emoji'}, 'c.name', ('pl', 'c')),
+    'work': ({'work_code': 'd.work_code', 'work_name': 'pl.name', 'price_type': 'pl.price_type'},
+             'pl.name, d.work_code', ('pl',)),
+    'price': ({'price_per_unit': 'd.price_per_unit'}, 'd.price_per_unit', ()),
+}
+_ROLLUP_JOINS = {
+    'w': "JOIN workers w ON w.telegram_id = d.worker_id",
+    'pl': "JOIN price_list pl ON pl.code = d.work_code",
+    'c': "JOIN categories c ON c.code = pl.category_code",
+}
+_ROLLUP_MEASURES = {
+    'quantity': 'COALESCE(SUM(d.quantity), 0)',
+    'total': 'COALESCE(SUM(d.total), 0)',
+    'entries': 'COALESCE(SUM(d.entries), 0)::int',
+    'days': 'COUNT(DISTINCT d.work_date)::int',
+}
+
+
+def _rollup_query(by, filters) -> str:
+    fields, order, joins, group = {}, [], [], []
+    for dim in by:
+        exprs, sort, needs = ROLLUP_DIMENSIONS[dim]
+        fields.update(exprs)
+        group.extend(exprs.values())
+        order.append(sort)
+        joins.extend(j for j in needs if j not in joins)
+    if 'category_code' in filters and 'pl' not in joins:
+        joins.append('pl')
+    select = [fields.get(f) or _ROLLUP_MEASURES.get(f) or 'NULL' for f in RollupRow._fields]
+    where = ["d.work_date >= $1", "d.work_date < $2"]
+    column = {'worker_id': 'd.worker_id', 'work_code': 'd.work_code',
+              'category_code': 'pl.category_code'}
+    for i, name in enumerate(filters, 3):
+        where.append(f"{column[name]} = ${i}")
+    query = (f"SELECT {', '.join(select)} FROM work_daily d "
+             f"{' '.join(_ROLLUP_JOINS[j] for j in sorted(joins, key='wplc'.find))} "
+             f"WHERE {' AND '.join(where)}")
+    if group:
+        query += f" GROUP BY {', '.join(group)} ORDER BY {', '.join(order)}"
+    return query
+
+
+async def get_rollup(start, end, by=(), worker_id: int = None, category_code: str = None,
+                     work_code: str = None) -> List[RollupRow]:
+    """Итоги за [start, end) в разрезе by — любой набор из ROLLUP_DIMENSIONS:
+
+        await get_rollup(start, end, by=('worker', 'category'))
+        await get_rollup(start, end, by=('day',), worker_id=tid)
+
+    Без by — одна строка с общими итогами периода.
+    """
+    filters = {k: v for k, v in (('worker_id', worker_id), ('category_code', category_code),
+                                 ('work_code', work_code)) if v is not None}
+    async with pool.acquire() as conn:
+        return await _fetch(conn, RollupRow, _rollup_query(by, filters),
+                            parse_date(start), parse_date(end), *filters.values())
 
 
 # ==================== ОПТИМИЗИРОВАННЫЕ ЗАПРОСЫ ====================
@@ -724,8 +1543,13 @@ async def get_all_workers_balance(year: int = None, month: int = None):
         year = date.today().year
     if month is None:
         month = date.today().month
+    return await get_balances(*month_bounds(year, month))
+
+
+async def get_balances(start, end):
+    """Заработок (из work_daily), авансы и штрафы всех работников за [start, end)"""
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerBalance, """
             SELECT
                 w.telegram_id, w.name,
                 COALESCE(earn.total_earned, 0) as earned,
@@ -737,25 +1561,26 @@ async def get_all_workers_balance(year: int = None, month: int = None):
                 SELECT worker_id,
                        SUM(total) as total_earned,
                        COUNT(DISTINCT work_date) as work_days
-                FROM work_log
-                WHERE EXTRACT(YEAR FROM work_date) = $1 AND EXTRACT(MONTH FROM work_date) = $2
+                FROM work_daily
+                WHERE work_date >= $1 AND work_date < $2
                 GROUP BY worker_id
             ) earn ON w.telegram_id = earn.worker_id
             LEFT JOIN (
                 SELECT worker_id, SUM(amount) as total_advance
                 FROM advances
-                WHERE EXTRACT(YEAR FROM advance_date) = $1 AND EXTRACT(MONTH FROM advance_date) = $2
+                WHERE advance_date >= $1 AND advance_date < $2
                 GROUP BY worker_id
             ) adv ON w.telegram_id = adv.worker_id
             LEFT JOIN (
                 SELECT worker_id, SUM(amount) as total_penalty
                 FROM penalties
-                WHERE EXTRACT(YEAR FROM penalty_date) = $1 AND EXTRACT(MONTH FROM penalty_date) = $2
+                WHERE penalty_date >= $1 AND penalty_date < $2
                 GROUP BY worker_id
             ) pen ON w.telegram_id = pen.worker_id
+            WHERE w.is_active OR earn.worker_id IS NOT NULL
+               OR adv.worker_id IS NOT NULL OR pen.worker_id IS NOT NULL
             ORDER BY w.name
-        """, year, month)
-        return [tuple(row) for row in rows]
+        """, parse_date(start), parse_date(end))
 
 
 async def get_worker_full_stats(worker_id: int, year: int = None, month: int = None):
@@ -763,47 +1588,41 @@ async def get_worker_full_stats(worker_id: int, year: int = None, month: int = N
         year = date.today().year
     if month is None:
         month = date.today().month
-    async with pool.acquire() as conn:
-        earn_row = await conn.fetchrow("""
-            SELECT
-                COALESCE(SUM(wl.total), 0) as earned,
-                COUNT(DISTINCT wl.work_date) as work_days
-            FROM work_log wl
-            WHERE wl.worker_id = $1
-              AND EXTRACT(YEAR FROM wl.work_date) = $2
-              AND EXTRACT(MONTH FROM wl.work_date) = $3
-        """, worker_id, year, month)
+    return await get_worker_stats(worker_id, *month_bounds(year, month))
 
-        adv_row = await conn.fetchrow("""
-            SELECT COALESCE(SUM(amount), 0)
-            FROM advances
-            WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM advance_date) = $2
-              AND EXTRACT(MONTH FROM advance_date) = $3
-        """, worker_id, year, month)
 
-        pen_row = await conn.fetchrow("""
-            SELECT COALESCE(SUM(amount), 0)
-            FROM penalties
-            WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM penalty_date) = $2
-              AND EXTRACT(MONTH FROM penalty_date) = $3
-        """, worker_id, year, month)
+async def get_worker_stats(worker_id: int, start, end) -> dict:
+    """Заработок, дни, авансы, штрафы и остаток работника за [start, end)"""
+    async with pool.acquire() as conn:
+        row = await _fetchrow(conn, None, """
+            SELECT earn.earned, earn.work_days, adv.total AS advances, pen.total AS penalties
+            FROM (SELECT COALESCE(SUM(total), 0) AS earned,
+                         COUNT(DISTINCT work_date) AS work_days
+                  FROM work_daily
+                  WHERE worker_id = $1 AND work_date >= $2 AND work_date < $3) earn,
+                 (SELECT COALESCE(SUM(amount), 0) AS total
+                  FROM advances
+                  WHERE worker_id = $1 AND advance_date >= $2 AND advance_date < $3) adv,
+                 (SELECT COALESCE(SUM(amount), 0) AS total
+                  FROM penalties
+                  WHERE worker_id = $1 AND penalty_date >= $2 AND penalty_date < $3) pen
+        """, worker_id, parse_date(start), parse_date(end))
 
     return {
-        'earned': earn_row['earned'],
-        'work_days': earn_row['work_days'],
-        'advances': adv_row[0],
-        'penalties': pen_row[0],
-        'balance': earn_row['earned'] - adv_row[0] - pen_row[0]
+        'earned': row['earned'],
+        'work_days': row['work_days'],
+        'advances': row['advances'],
+        'penalties': row['penalties'],
+        'balance': row['earned'] - row['advances'] - row['penalties']
     }
 
 
 # ==================== АВАНСЫ ====================
 
-async def add_advance(worker_id: int, amount: float, comment: str = "", advance_date=None):
+async def add_advance(worker_id: int, amount: float, comment: str = "", advance_date=None, conn=None):
     advance_date = parse_date(advance_date)
-    async with pool.acquire() as conn:
+    async with _transaction(conn) as conn:
+        await _lock_workers(conn, [worker_id])
         await conn.execute("""
             INSERT INTO advances (worker_id, amount, comment, advance_date)
             VALUES ($1, $2, $3, $4)
@@ -816,15 +1635,14 @@ async def get_worker_advances(worker_id: int, year: int = None, month: int = Non
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, Advance, """
             SELECT id, amount, comment, advance_date::TEXT, created_at::TEXT
             FROM advances
             WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM advance_date) = $2
-              AND EXTRACT(MONTH FROM advance_date) = $3
+              AND advance_date >= $2
+              AND advance_date < $3
             ORDER BY advance_date
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
+        """, worker_id, *month_bounds(year, month))
 
 
 async def get_worker_advances_total(worker_id: int, year: int = None, month: int = None):
@@ -837,21 +1655,20 @@ async def get_worker_advances_total(worker_id: int, year: int = None, month: int
             SELECT COALESCE(SUM(amount), 0)
             FROM advances
             WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM advance_date) = $2
-              AND EXTRACT(MONTH FROM advance_date) = $3
-        """, worker_id, year, month)
+              AND advance_date >= $2
+              AND advance_date < $3
+        """, worker_id, *month_bounds(year, month))
         return result
 
 
-async def delete_advance(advance_id: int):
-    async with pool.acquire() as conn:
-        advance = await conn.fetchrow(
-            "SELECT id, amount, comment, advance_date::TEXT, worker_id FROM advances WHERE id = $1",
-            advance_id)
-        if advance:
-            await conn.execute("DELETE FROM advances WHERE id = $1", advance_id)
-            return tuple(advance)
-        return None
+async def delete_advance(advance_id: int, conn=None):
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        await _lock_row_worker(conn, 'advances', advance_id)
+        return await _fetchrow(conn, DeletedAdvance, """
+            DELETE FROM advances WHERE id = $1
+            RETURNING id, amount, comment, advance_date::TEXT, worker_id
+        """, advance_id)
 
 
 async def get_all_advances_monthly(year: int = None, month: int = None):
@@ -860,24 +1677,25 @@ async def get_all_advances_monthly(year: int = None, month: int = None):
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerAmount, """
             SELECT w.telegram_id, w.name,
                    COALESCE(SUM(a.amount), 0) as total_advance
             FROM workers w
             LEFT JOIN advances a ON w.telegram_id = a.worker_id
-                AND EXTRACT(YEAR FROM a.advance_date) = $1
-                AND EXTRACT(MONTH FROM a.advance_date) = $2
+                AND a.advance_date >= $1
+                AND a.advance_date < $2
             GROUP BY w.telegram_id, w.name
+            HAVING w.is_active OR COUNT(a.id) > 0
             ORDER BY w.name
-        """, year, month)
-        return [tuple(row) for row in rows]
+        """, *month_bounds(year, month))
 
 
 # ==================== ШТРАФЫ ====================
 
-async def add_penalty(worker_id: int, amount: float, reason: str = "", penalty_date=None):
+async def add_penalty(worker_id: int, amount: float, reason: str = "", penalty_date=None, conn=None):
     penalty_date = parse_date(penalty_date)
-    async with pool.acquire() as conn:
+    async with _transaction(conn) as conn:
+        await _lock_workers(conn, [worker_id])
         await conn.execute("""
             INSERT INTO penalties (worker_id, amount, reason, penalty_date)
             VALUES ($1, $2, $3, $4)
@@ -890,15 +1708,14 @@ async def get_worker_penalties(worker_id: int, year: int = None, month: int = No
     if month is None:
         month = date.today().month
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, Penalty, """
             SELECT id, amount, reason, penalty_date::TEXT, created_at::TEXT
             FROM penalties
             WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM penalty_date) = $2
-              AND EXTRACT(MONTH FROM penalty_date) = $3
+              AND penalty_date >= $2
+              AND penalty_date < $3
             ORDER BY penalty_date
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
+        """, worker_id, *month_bounds(year, month))
 
 
 async def get_worker_penalties_total(worker_id: int, year: int = None, month: int = None):
@@ -911,104 +1728,286 @@ async def get_worker_penalties_total(worker_id: int, year: int = None, month: in
             SELECT COALESCE(SUM(amount), 0)
             FROM penalties
             WHERE worker_id = $1
-              AND EXTRACT(YEAR FROM penalty_date) = $2
-              AND EXTRACT(MONTH FROM penalty_date) = $3
-        """, worker_id, year, month)
+              AND penalty_date >= $2
+              AND penalty_date < $3
+        """, worker_id, *month_bounds(year, month))
         return result
 
 
-async def delete_penalty(penalty_id: int):
-    async with pool.acquire() as conn:
-        penalty = await conn.fetchrow(
-            "SELECT id, amount, reason, penalty_date::TEXT, worker_id FROM penalties WHERE id = $1",
-            penalty_id)
-        if penalty:
-            await conn.execute("DELETE FROM penalties WHERE id = $1", penalty_id)
-            return tuple(penalty)
-        return None
+async def delete_penalty(penalty_id: int, conn=None):
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        await _lock_row_worker(conn, 'penalties', penalty_id)
+        return await _fetchrow(conn, DeletedPenalty, """
+            DELETE FROM penalties WHERE id = $1
+            RETURNING id, amount, reason, penalty_date::TEXT, worker_id
+        """, penalty_id)
 
 
 # ==================== НАСТРОЙКИ НАПОМИНАНИЙ ====================
 
-async def get_reminder_settings():
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT * FROM reminder_settings WHERE id = 1")
-        if row:
-            return {
-                'evening_hour': row['evening_hour'],
-                'evening_minute': row['evening_minute'],
-                'late_hour': row['late_hour'],
-                'late_minute': row['late_minute'],
-                'report_hour': row['report_hour'],
-                'report_minute': row['report_minute'],
-                'evening_enabled': row['evening_enabled'],
-                'late_enabled': row['late_enabled'],
-                'report_enabled': row['report_enabled'],
-            }
-        return {
-            'evening_hour': 18, 'evening_minute': 0,
-            'late_hour': 20, 'late_minute': 0,
-            'report_hour': 21, 'report_minute': 0,
-            'evening_enabled': True, 'late_enabled': True, 'report_enabled': True,
-        }
+async def get_reminder_settings() -> ReminderSettings:
+    """Настройки напоминаний из кэша: запрос — только после изменения"""
+    return await _cached(('reminder_settings',), _load_reminder_settings)
 
 
-async def update_reminder_settings(**kwargs):
+async def _load_reminder_settings():
     async with pool.acquire() as conn:
+        row = await _fetchrow(conn, ReminderSettings, """
+            SELECT evening_hour, evening_minute, late_hour, late_minute,
+                   report_hour, report_minute,
+                   evening_enabled, late_enabled, report_enabled
+            FROM reminder_settings WHERE id = 1
+        """)
+        return row or ReminderSettings(18, 0, 20, 0, 21, 0, True, True, True)
+
+
+async def update_reminder_settings(conn=None, **kwargs):
+    async with _connection(conn) as conn:
         sets = ", ".join([f"{k} = ${i+1}" for i, k in enumerate(kwargs.keys())])
         vals = list(kwargs.values())
         vals.append(1)
         await conn.execute(
             f"UPDATE reminder_settings SET {sets} WHERE id = ${len(vals)}", *vals)
+        await _publish(conn, 'reminder_settings', fields=list(kwargs))
+
+
+async def get_reminder_jobs():
+    """Расписание трёх задач напоминаний вместе с их сохранённым состоянием"""
+    async with pool.acquire() as conn:
+        return await _fetch(conn, ReminderJob, """
+            SELECT j.job_id, j.hour, j.minute, j.enabled, NULL::text AS tz, s.last_run_at
+            FROM reminder_settings r
+            CROSS JOIN LATERAL (VALUES
+                ('evening_reminder', r.evening_hour, r.evening_minute, r.evening_enabled),
+                ('late_reminder', r.late_hour, r.late_minute, r.late_enabled),
+                ('admin_report', r.report_hour, r.report_minute, r.report_enabled)
+            ) AS j(job_id, hour, minute, enabled)
+            LEFT JOIN reminder_job_state s ON s.job_id = j.job_id
+            WHERE r.id = 1
+        """)
+
+
+async def get_reminder_job_states() -> dict:
+    """job_id -> время последнего выполненного запуска"""
+    async with pool.acquire() as conn:
+        rows = await _fetch(conn, None, "SELECT job_id, last_run_at FROM reminder_job_state")
+        return {r['job_id']: r['last_run_at'] for r in rows}
+
+
+async def get_reminder_prefs():
+    """Работники с личным временем напоминаний или часовым поясом"""
+    async with pool.acquire() as conn:
+        return await _fetch(conn, WorkerReminderPrefs, """
+            SELECT telegram_id, reminder_tz, evening_time, late_time
+            FROM workers
+            WHERE is_active
+              AND (reminder_tz IS NOT NULL OR evening_time IS NOT NULL OR late_time IS NOT NULL)
+        """)
+
+
+async def get_worker_reminder_prefs(telegram_id: int):
+    async with pool.acquire() as conn:
+        return await _fetchrow(conn, WorkerReminderPrefs, """
+            SELECT telegram_id, reminder_tz, evening_time, late_time
+            FROM workers WHERE telegram_id = $1
+        """, telegram_id)
+
+
+async def set_worker_reminder_prefs(telegram_id: int, tz: Optional[str], evening_time: Optional[time],
+                                    late_time: Optional[time], conn=None):
+    """Личное расписание работника; None — как у всех"""
+    async with _connection(conn) as conn:
+        await conn.execute("""
+            UPDATE workers SET reminder_tz = $2, evening_time = $3, late_time = $4
+            WHERE telegram_id = $1
+        """, telegram_id, tz, evening_time, late_time)
+        await _publish(conn, 'reminder_prefs', worker_id=telegram_id)
+
+
+async def claim_reminder_run(job_id: str, slot: datetime) -> bool:
+    """Отмечает запуск задачи за плановое время slot. False — этот запуск
+    уже выполнен (повторный вызов или другой процесс бота)"""
+    async with pool.acquire() as conn:
+        claimed = await conn.fetchval("""
+            INSERT INTO reminder_job_state (job_id, last_run_at) VALUES ($1, $2)
+            ON CONFLICT (job_id) DO UPDATE SET last_run_at = EXCLUDED.last_run_at
+            WHERE reminder_job_state.last_run_at < EXCLUDED.last_run_at
+            RETURNING job_id
+        """, job_id, slot)
+        return claimed is not None
+
 
 # ==================== ПЕРЕСЧЁТ ЗАПИСЕЙ ====================
 
-async def recalculate_entries_from_march(work_code: str, new_price: float) -> dict:
+async def recalculate_entries_from_march(work_code: str, new_price: float, conn=None) -> dict:
     """
     Пересчитывает все записи с марта 2025 для указанной работы
     Возвращает статистику: кол-во обновлённых записей и разницу сумм
     """
-    async with pool.acquire() as conn:
-        # Получаем все записи с 01.03.2025
-        entries = await conn.fetch("""
-            SELECT id, quantity, price_per_unit, total
-            FROM work_log
+    async with _transaction(conn) as conn:
+        await set_actor(conn)
+        workers = await _fetch(conn, None, """
+            SELECT DISTINCT worker_id FROM work_log
             WHERE work_code = $1 AND work_date >= '2025-03-01'
         """, work_code)
-        
-        if not entries:
-            return {'count': 0, 'old_total': 0, 'new_total': 0, 'difference': 0}
-        
-        old_total = sum(e['total'] for e in entries)
-        new_total = sum(e['quantity'] * new_price for e in entries)
-        
-        # Обновляем все записи
-        await conn.execute("""
-            UPDATE work_log
-            SET price_per_unit = $1, total = quantity * $1
-            WHERE work_code = $2 AND work_date >= '2025-03-01'
+        await _lock_workers(conn, [r['worker_id'] for r in workers])
+        # Один запрос: старые суммы берутся из заблокированных строк,
+        # новые — из RETURNING обновления
+        row = await _fetchrow(conn, None, """
+            WITH old AS (
+                SELECT id, total FROM work_log
+                WHERE work_code = $2 AND work_date >= '2025-03-01'
+                FOR UPDATE
+            ), upd AS (
+                UPDATE work_log wl
+                SET price_per_unit = $1, total = wl.quantity * $1
+                FROM old
+                WHERE wl.id = old.id
+                RETURNING old.total AS old_total, wl.total AS new_total
+            )
+            SELECT COUNT(*) AS count,
+                   COALESCE(SUM(old_total), 0) AS old_total,
+                   COALESCE(SUM(new_total), 0) AS new_total
+            FROM upd
         """, new_price, work_code)
-        
+        if row['count']:
+            await _publish(conn, 'work_log', worker_id=None, work_date=None, delta=None)
+
         return {
-            'count': len(entries),
-            'old_total': old_total,
-            'new_total': new_total,
-            'difference': new_total - old_total
+            'count': row['count'],
+            'old_total': row['old_total'],
+            'new_total': row['new_total'],
+            'difference': row['new_total'] - row['old_total']
         }
 
 
 async def get_worker_entries_by_month(worker_id: int, year: int, month: int):
     """Получает записи работника за конкретный месяц"""
     async with pool.acquire() as conn:
-        rows = await conn.fetch("""
+        return await _fetch(conn, WorkerEntry, """
             SELECT wl.id, pl.name, wl.quantity, wl.price_per_unit, wl.total,
                    wl.work_date::TEXT, wl.created_at::TEXT, w.name, pl.price_type
             FROM work_log wl
             JOIN price_list pl ON wl.work_code = pl.code
             JOIN workers w ON wl.worker_id = w.telegram_id
             WHERE wl.worker_id = $1
-              AND EXTRACT(YEAR FROM wl.work_date) = $2
-              AND EXTRACT(MONTH FROM wl.work_date) = $3
+              AND wl.work_date >= $2
+              AND wl.work_date < $3
             ORDER BY wl.work_date DESC, wl.created_at DESC
-        """, worker_id, year, month)
-        return [tuple(row) for row in rows]
\ No newline at end of file
+        """, worker_id, *month_bounds(year, month))
+
+
+# ==================== АРХИВ ====================
+
+# Строк в одной транзакции переноса
+ARCHIVE_BATCH = 5000
+
+# История работника: таблица -> переносимые колонки
+_ARCHIVED_HISTORY = {
+    'work_log': "id, worker_id, work_code, quantity, price_per_unit, total, work_date, created_at",
+    'advances': "id, worker_id, amount, comment, advance_date, created_at",
+    'penalties': "id, worker_id, amount, reason, penalty_date, created_at",
+}
+
+
+async def archive_inactive(batch: int = ARCHIVE_BATCH) -> dict:
+    """Переносит историю неактивных работников в *_archive пачками по batch
+    строк (каждая пачка — короткая транзакция, запись работ не ждёт) и
+    убирает из price_list неактивные позиции, на которые не осталось записей.
+    Возвращает {таблица: перенесено строк}"""
+    moved = {}
+    async with pool.acquire() as conn:
+        for table, columns in _ARCHIVED_HISTORY.items():
+            moved[table] = 0
+            while True:
+                async with conn.transaction():
+                    await conn.execute("SELECT set_config('cabinet.archiving', 'on', true)")
+                    n = await conn.fetchval(f"""
+                        WITH batch AS (
+                            SELECT t.id FROM {table} t
+                            JOIN workers w ON w.telegram_id = t.worker_id
+                            WHERE NOT w.is_active
+                            LIMIT $1
+                            FOR UPDATE OF t SKIP LOCKED
+                        ), gone AS (
+                            DELETE FROM {table} t USING batch
+                            WHERE t.id = batch.id
+                            RETURNING t.*
+                        ), ins AS (
+                            INSERT INTO {table}_archive ({columns})
+                            SELECT {columns} FROM gone
+                        )
+                        SELECT COUNT(*) FROM gone
+                    """, batch)
+                moved[table] += n
+                if n < batch:
+                    break
+
+        async with conn.transaction():
+            moved['price_list'] = await conn.fetchval("""
+                WITH gone AS (
+                    DELETE FROM price_list pl
+                    WHERE NOT pl.is_active
+                      AND NOT EXISTS (SELECT 1 FROM work_log wl WHERE wl.work_code = pl.code)
+                    RETURNING pl.code, pl.name, pl.price, pl.price_type, pl.category_code
+                ), ins AS (
+                    INSERT INTO price_list_archive (code, name, price, price_type, category_code)
+                    SELECT * FROM gone
+                    ON CONFLICT (code) DO UPDATE
+                    SET name = EXCLUDED.name, price = EXCLUDED.price,
+                        price_type = EXCLUDED.price_type, category_code = EXCLUDED.category_code,
+                        archived_at = CURRENT_TIMESTAMP
+                )
+                SELECT COUNT(*) FROM gone
+            """)
+
+        if moved['work_log']:
+            await _publish(conn, 'work_log', worker_id=None, work_date=None, delta=None)
+    return moved
+
+
+# ==================== ЖУРНАЛ ИЗМЕНЕНИЙ ====================
+
+AUDIT_TABLES = ('work_log', 'advances', 'penalties')
+
+_AUDIT_COLUMNS = "id, changed_at, actor, table_name, op, row_id, worker_id, before::TEXT, after::TEXT"
+
+
+def _audit_records(rows) -> List[AuditRecord]:
+    return [AuditRecord(r[0], r[1], r[2], r[3], r[4], r[5], r[6],
+                        json.loads(r[7]) if r[7] is not None else None,
+                        json.loads(r[8]) if r[8] is not None else None)
+            for r in rows]
+
+
+async def get_audit_for_row(table_name: str, row_id: int):
+    """Кто и как менял строку — от старых правок к новым"""
+    async with pool.acquire() as conn:
+        return _audit_records(await _fetch(conn, None, f"""
+            SELECT {_AUDIT_COLUMNS} FROM audit_log
+            WHERE table_name = $1 AND row_id = $2
+            ORDER BY id
+        """, table_name, row_id))
+
+
+# Дата записи в образе строки журнала (before/after) по её таблице
+_AUDIT_ROW_DATE = """({image} ->> CASE table_name WHEN 'work_log' THEN 'work_date'
+                                  WHEN 'advances' THEN 'advance_date'
+                                  ELSE 'penalty_date' END)::DATE"""
+
+
+async def get_audit_for_worker(worker_id: int, start, end, limit: int = 200):
+    """Правки денежных записей работника, датированных [start, end) — до или
+    после правки, когда бы правка ни была сделана. Новые первыми"""
+    before = _AUDIT_ROW_DATE.format(image='before')
+    after = _AUDIT_ROW_DATE.format(image='after')
+    async with pool.acquire() as conn:
+        return _audit_records(await _fetch(conn, None, f"""
+            SELECT {_AUDIT_COLUMNS} FROM audit_log
+            WHERE worker_id = $1
+              AND ({before} >= $2 AND {before} < $3
+                   OR {after} >= $2 AND {after} < $3)
+            ORDER BY changed_at DESC, id DESC
+            LIMIT $4
+        """, worker_id, parse_date(start), parse_date(end), limit))
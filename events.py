@@ -0,0 +1,123 @@
+"""События об изменении данных.
+
+database.py публикует событие после каждой успешной записи, кэши в services/
+и в самом database.py подписываются на нужные темы и обновляются сами, без
+повторных запросов.
+
+Между процессами события ходят через PostgreSQL LISTEN/NOTIFY: запись шлёт
+pg_notify в канал CHANNEL (в своей транзакции — другие процессы получат его
+только после коммита), а start_listener держит отдельное соединение пула и
+пересылает чужие уведомления локальным подписчикам.
+
+Темы и данные:
+    work_log          worker_id, work_date, delta — изменение суммы за день;
+                      work_date=None — массовое изменение (пересчёт цен)
+    workers           worker_id — добавлен, переименован или удалён работник
+    worker_categories worker_id — изменились категории работника
+    categories        code — изменилась категория (название/эмодзи)
+    staff_roles       worker_id — назначен или снят менеджер
+    price_list        code — изменилась позиция прайса (None — несколько)
+    reminder_settings fields — список изменённых настроек напоминаний
+    reminder_prefs    worker_id — изменилось личное расписание напоминаний
+    resync            — связь с БД терялась, события могли пропасть: сбросить всё
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+CHANNEL = 'cabinet_events'
+RESYNC = 'resync'
+
+# Метка процесса: свои уведомления уже разосланы локально, их пропускаем
+ORIGIN = f"{os.getpid()}-{os.urandom(4).hex()}"
+
+# Пауза перед переподключением слушателя
+RECONNECT_DELAY = 5
+
+_subscribers: Dict[str, List[Callable]] = defaultdict(list)
+_listener: Optional[asyncio.Task] = None
+
+
+def subscribe(topic: str, callback: Callable):
+    """callback(**data) — синхронный и быстрый: вызывается прямо из publish"""
+    _subscribers[topic].append(callback)
+
+
+def publish(topic: str, **data):
+    """Раздаёт событие подписчикам этого процесса"""
+    for callback in _subscribers.get(topic, ()):
+        try:
+            callback(**data)
+        except Exception as e:
+            logging.exception(f"Event {topic} handler failed: {e}")
+
+
+# ==================== МЕЖДУ ПРОЦЕССАМИ ====================
+
+def encode(topic: str, data: dict) -> str:
+    """Полезная нагрузка pg_notify (лимит PostgreSQL — 8000 байт)"""
+    return json.dumps({'o': ORIGIN, 't': topic, 'd': data},
+                      ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _decode(payload: str):
+    message = json.loads(payload)
+    data = message['d']
+    # Даты приходят строками ISO — возвращаем им тип
+    for key, value in data.items():
+        if key.endswith('_date') and isinstance(value, str):
+            data[key] = date.fromisoformat(value)
+    return message['o'], message['t'], data
+
+
+def _on_notify(conn, pid, channel, payload):
+    try:
+        origin, topic, data = _decode(payload)
+    except (ValueError, KeyError, TypeError) as e:
+        logging.error(f"Bad event payload {payload!r}: {e}")
+        return
+    if origin != ORIGIN:
+        publish(topic, **data)
+
+
+async def _listen(pool):
+    while True:
+        try:
+            async with pool.acquire() as conn:
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(CHANNEL, _on_notify)
+                # Пока не слушали, могли пропустить чужие изменения
+                publish(RESYNC)
+                logging.info(f"📡 Слушаю {CHANNEL}")
+                await lost.wait()
+            logging.warning(f"📡 Соединение {CHANNEL} потеряно, переподключаюсь")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"📡 Ошибка слушателя {CHANNEL}: {e}")
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+def start_listener(pool):
+    """Запускает фоновое прослушивание канала на отдельном соединении пула"""
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen(pool), name='events-listener')
+
+
+async def stop_listener():
+    """Останавливает слушателя и возвращает соединение в пул"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
@@ -0,0 +1,206 @@
+"""Машиночитаемая выгрузка для бухгалтерии: CSV (gzip) и Parquet.
+
+Строки идут из БД потоком и сразу пишутся в файл, так что память не зависит
+от длины периода:
+    csv      — COPY (...) TO STDOUT в формате CSV с заголовком, прямо в gzip;
+    parquet  — серверный курсор пачками по BATCH_ROWS, пачка — row group.
+               Нужен pyarrow; без него формат недоступен (PARQUET_AVAILABLE).
+
+Файл, выросший до PART_BYTES, закрывается и продолжается в следующей части
+(Telegram не принимает документы больше 50 МБ). Период и фильтр по работнику
+те же, что у отчётов в reports.py.
+"""
+import gzip
+import importlib.util
+import os
+from typing import List, Optional
+
+import database
+from utils import Period, lazy_import
+
+# pyarrow импортируется при первой выгрузке в Parquet, не при открытии меню
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+FORMATS = ('csv', 'parquet')
+
+PART_BYTES = 45 * 1024 * 1024
+BATCH_ROWS = 5000
+
+
+def _text(expr: str) -> str:
+    """Переводы строк в тексте -> пробел: одна строка CSV — одна запись,
+    и поток можно резать на части по '\\n'"""
+    return f"regexp_replace({expr}, '[\\r\\n]+', ' ', 'g')"
+
+
+# $1, $2 — полуинтервал дат, $3 — работник или NULL (все)
+TABLES = {
+    'work_log': f"""
+        SELECT wl.id, wl.work_date, wl.worker_id, {_text('w.name')} AS worker_name,
+               pl.category_code, wl.work_code, {_text('pl.name')} AS work_name,
+               wl.quantity, wl.price_per_unit, wl.total, wl.created_at
+        FROM work_log wl
+        LEFT JOIN workers w ON w.telegram_id = wl.worker_id
+        LEFT JOIN price_list pl ON pl.code = wl.work_code
+        WHERE wl.work_date >= $1 AND wl.work_date < $2
+          AND ($3::BIGINT IS NULL OR wl.worker_id = $3)
+        ORDER BY wl.work_date, wl.id
+    """,
+    'advances': f"""
+        SELECT a.id, a.advance_date, a.worker_id, {_text('w.name')} AS worker_name,
+               a.amount, {_text('a.comment')} AS comment, a.created_at
+        FROM advances a
+        LEFT JOIN workers w ON w.telegram_id = a.worker_id
+        WHERE a.advance_date >= $1 AND a.advance_date < $2
+          AND ($3::BIGINT IS NULL OR a.worker_id = $3)
+        ORDER BY a.advance_date, a.id
+    """,
+    'penalties': f"""
+        SELECT p.id, p.penalty_date, p.worker_id, {_text('w.name')} AS worker_name,
+               p.amount, {_text('p.reason')} AS reason, p.created_at
+        FROM penalties p
+        LEFT JOIN workers w ON w.telegram_id = p.worker_id
+        WHERE p.penalty_date >= $1 AND p.penalty_date < $2
+          AND ($3::BIGINT IS NULL OR p.worker_id = $3)
+        ORDER BY p.penalty_date, p.id
+    """,
+}
+
+# Типы колонок Parquet; всё, чего здесь нет, — строка
+COLUMN_TYPES = {
+    'id': 'int32',
+    'worker_id': 'int64',
+    'work_date': 'date32',
+    'advance_date': 'date32',
+    'penalty_date': 'date32',
+    'quantity': 'float64',
+    'price_per_unit': 'float64',
+    'total': 'float64',
+    'amount': 'float64',
+    'created_at': 'timestamp',
+}
+
+
+class _Parts:
+    """Имена частей одной выгрузки: stem.csv.gz, stem.part2.csv.gz, ..."""
+
+    def __init__(self, stem: str, suffix: str):
+        self.stem = stem
+        self.suffix = suffix
+        self.paths: List[str] = []
+
+    def next(self) -> str:
+        n = len(self.paths) + 1
+        path = f"{self.stem}{self.suffix}" if n == 1 else f"{self.stem}.part{n}{self.suffix}"
+        self.paths.append(path)
+        return path
+
+
+# ==================== CSV ====================
+
+async def _export_csv(conn, query: str, args, parts: _Parts):
+    raw = out = None
+    header = None
+    tail = b''
+
+    def open_part():
+        nonlocal raw, out
+        raw = open(parts.next(), 'wb')
+        out = gzip.GzipFile(fileobj=raw, mode='wb')
+        out.write(header)
+
+    def close_part():
+        out.close()
+        raw.close()
+
+    async def write(chunk: bytes):
+        nonlocal header, tail
+        data = tail + chunk
+        cut = data.rfind(b'\n') + 1
+        data, tail = data[:cut], data[cut:]
+        if not data:
+            return
+        if header is None:
+            end = data.index(b'\n') + 1
+            header, data = data[:end], data[end:]
+            open_part()
+        elif raw.tell() >= PART_BYTES:
+            close_part()
+            open_part()
+        out.write(data)
+
+    try:
+        await conn.copy_from_query(query, *args, output=write, format='csv', header=True)
+    finally:
+        if out is not None:
+            close_part()
+
+
+# ==================== PARQUET ====================
+
+def _schema(names: List[str]):
+    types = {
+        'int32': pa.int32(), 'int64': pa.int64(), 'date32': pa.date32(),
+        'float64': pa.float64(), 'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([(n, types.get(COLUMN_TYPES.get(n), pa.string())) for n in names])
+
+
+async def _export_parquet(conn, query: str, args, parts: _Parts):
+    stmt = await conn.prepare(query)
+    names = [a.name for a in stmt.get_attributes()]
+    schema = _schema(names)
+    writer = path = None
+    try:
+        # Курсор живёт только внутри транзакции
+        async with conn.transaction():
+            cursor = await stmt.cursor(*args)
+            while True:
+                rows = await cursor.fetch(BATCH_ROWS)
+                if not rows and path is not None:
+                    break
+                if writer is None:
+                    path = parts.next()
+                    writer = pq.ParquetWriter(path, schema, compression='zstd')
+                columns = {n: [r[i] for r in rows] for i, n in enumerate(names)}
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                if not rows:
+                    break
+                if os.path.getsize(path) >= PART_BYTES:
+                    writer.close()
+                    writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# ==================== ВЫГРУЗКА ====================
+
+async def export_period(period: Period, fmt: str = 'csv', worker_id: Optional[int] = None,
+                        tables=tuple(TABLES)) -> List[str]:
+    """Выгружает таблицы за период, возвращает пути ко всем частям.
+    Файлы удаляет вызывающий"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet недоступен: не установлен pyarrow")
+
+    export = _export_csv if fmt == 'csv' else _export_parquet
+    suffix = '.csv.gz' if fmt == 'csv' else '.parquet'
+    args = (period.start, period.end, worker_id)
+    paths: List[str] = []
+    try:
+        async with database.pool.acquire() as conn:
+            for name in tables:
+                parts = _Parts(f"{name}_{period.slug}", suffix)
+                try:
+                    await export(conn, TABLES[name], args, parts)
+                finally:
+                    paths.extend(parts.paths)
+    except BaseException:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return paths
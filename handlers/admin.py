@@ -1,8 +1,14 @@
 ﻿import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
 from datetime import date
+from html import escape
 from aiogram import Router, types, F, Bot
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, FSInputFile
 
 from config import ADMIN_ID
 from database import (
@@ -10,12 +16,13 @@ from database import (
     add_price_item, get_price_list, update_price, delete_price_item_permanently,
     add_worker, get_all_workers, delete_worker, rename_worker,
     assign_category_to_worker, remove_category_from_worker,
-    get_worker_categories, get_workers_in_category,
+    get_worker_categories, get_category_workers,
     get_worker_recent_entries, get_entry_by_id,
     delete_entry_by_id, update_entry_quantity,
     update_category, update_work_item, get_work_by_code,
     get_worker, get_worker_deletion_info, get_worker_entries_by_month,
-    recalculate_entries_from_march
+    recalculate_entries_from_march, unit_of_work, set_manager,
+    get_audit_for_row, get_audit_for_worker, month_bounds
 )
 
 from states import (
@@ -28,11 +35,17 @@ from states import (
 )
 
 from keyboards import get_add_keyboard, get_edit_keyboard, get_delete_keyboard, get_info_keyboard
-from utils import format_date, send_long_message, MONTHS_RU
+from utils import format_date, send_long_message, MONTHS_RU, TextBuilder, split_message, screens, Screen
+from utils import lazy_import
+from services import backup, fragments, identity
 from handlers.filters import AdminFilter, StaffFilter
 
 router = Router()
 
+# Снимки и восстановление из JSON нужны только по команде админа
+snapshots = lazy_import('snapshots')
+json_backup = lazy_import('json_backup')
+
 
 # ==================== КАТЕГОРИИ ====================
 
@@ -68,24 +81,36 @@ async def add_cat_emoji(message: types.Message, state: FSMContext):
     await state.clear()
 
 
+# Строки кэшируются в services.fragments, пока эти темы не изменятся
+CATEGORY_TOPICS = ('categories', 'price_list', 'workers', 'worker_categories')
+
+
 @router.message(F.text == "📂 Категории", StaffFilter())
 async def show_cats(message: types.Message, state: FSMContext):
     await state.clear()
+    seen = fragments.version(CATEGORY_TOPICS)
     cats = await get_categories()
     if not cats:
         await message.answer("📂 Пусто.")
         return
-    text = "📂 Категории:\n\n"
-    for code, name, emoji in cats:
-        workers = await get_workers_in_category(code)
-        w_str = ", ".join([w[1] for w in workers]) if workers else "—"
-        all_items = await get_price_list()
-        items = [i for i in all_items if i[4] == code]
-        i_str = ", ".join([f"{i[1]}({int(i[2])} руб)" for i in items]) if items else "—"
-        text += f"{emoji} {name} ({code})\n👥 {w_str}\n📋 {i_str}\n\n"
+    workers = await get_category_workers()
+    items = defaultdict(list)
+    for i in await get_price_list():
+        items[i.category_code].append(i)
+    text = TextBuilder("📂 Категории:", "")
+    for c in cats:
+        text.add(fragments.fragment(
+            ('category', c.code), CATEGORY_TOPICS,
+            lambda: _category_card(c, workers.get(c.code), items.get(c.code)), seen), "")
     await send_long_message(message, text)
 
 
+def _category_card(cat, worker_names, items) -> str:
+    w_str = ", ".join(worker_names) if worker_names else "—"
+    i_str = ", ".join([f"{i.name}({int(i.price)} руб)" for i in items]) if items else "—"
+    return f"{cat.emoji} {cat.name} ({cat.code})\n👥 {w_str}\n📋 {i_str}"
+
+
 # ==================== ВИД РАБОТЫ ====================
 
 @router.message(F.text == "➕ Вид работы", AdminFilter())
@@ -207,8 +232,7 @@ async def rename_worker_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("rnw:"), AdminRenameWorker.choosing_worker)
 async def rename_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    old_name = next((n for t, n in workers if t == wid), "?")
+    old_name = identity.worker_name(wid, "?")
     await state.update_data(worker_id=wid, old_name=old_name)
     await callback.message.edit_text(f"👤 Текущее имя: {old_name}\n\nВведите новое имя:")
     await state.set_state(AdminRenameWorker.entering_name)
@@ -227,6 +251,49 @@ async def rename_worker_done(message: types.Message, state: FSMContext):
     await state.clear()
 
 
+# ==================== МЕНЕДЖЕРЫ ====================
+
+def _managers_markup(workers):
+    buttons = []
+    for tid, name in workers:
+        if identity.is_admin(tid):
+            continue
+        mark = "✅" if identity.is_manager(tid) else "▫️"
+        buttons.append([InlineKeyboardButton(text=f"{mark} {name}", callback_data=f"mgr:{tid}")])
+    buttons.append([InlineKeyboardButton(text="✔️ Готово", callback_data="mgr_done")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+@router.message(F.text == "👔 Менеджеры", AdminFilter())
+async def managers_list(message: types.Message, state: FSMContext):
+    await state.clear()
+    workers = await get_all_workers()
+    if not workers:
+        await message.answer("⚠️ Нет работников.")
+        return
+    await message.answer(
+        "👔 Менеджеры\n\nНажмите на работника, чтобы назначить или снять:",
+        reply_markup=_managers_markup(workers)
+    )
+
+
+@router.callback_query(F.data.startswith("mgr:"), AdminFilter())
+async def manager_toggle(callback: types.CallbackQuery):
+    tid = int(callback.data.split(":")[1])
+    make_manager = not identity.is_manager(tid)
+    await set_manager(tid, make_manager)
+    await identity.ensure_loaded()
+    await callback.message.edit_reply_markup(reply_markup=_managers_markup(await get_all_workers()))
+    name = identity.worker_name(tid)
+    await callback.answer(f"✅ {name} — менеджер" if make_manager else f"❌ {name} больше не менеджер")
+
+
+@router.callback_query(F.data == "mgr_done")
+async def managers_done(callback: types.CallbackQuery):
+    await callback.message.edit_text("✅ Готово. Новое меню появится у менеджера после /start")
+    await callback.answer()
+
+
 # ==================== СПИСКИ ====================
 
 @router.message(F.text == "👥 Работники", StaffFilter())
@@ -239,29 +306,38 @@ async def show_workers(message: types.Message, state: FSMContext):
     text = "👥 Работники:\n\n"
     for tid, name in workers:
         cats = await get_worker_categories(tid)
-        c_str = ", ".join([f"{c[2]}{c[1]}" for c in cats]) if cats else "нет кат."
+        c_str = ", ".join([f"{c.emoji}{c.name}" for c in cats]) if cats else "нет кат."
         text += f"▪️ {name} ({tid})\n   {c_str}\n\n"
     await send_long_message(message, text)
 
 
+# Строка позиции зависит только от прайса
+PRICE_TOPICS = ('price_list',)
+
+
 @router.message(F.text == "📄 Прайс-лист", StaffFilter())
 async def show_pricelist(message: types.Message, state: FSMContext):
     await state.clear()
+    seen = fragments.version(PRICE_TOPICS)
     items = await get_price_list()
     if not items:
         await message.answer("📄 Пусто.")
         return
-    text = "📄 Прайс-лист:\n\n"
+    text = TextBuilder("📄 Прайс-лист:", "")
     cur = ""
-    for code, name, price, price_type, cat_code, cat_name, cat_emoji in items:
-        if cat_code != cur:
-            cur = cat_code
-            text += f"\n{cat_emoji} {cat_name}:\n"
-        unit_label = "м²" if price_type == "square" else "шт"
-        text += f"   ▪️ {code} — {name}: {int(price)} руб/{unit_label}\n"
+    for i in items:
+        if i.category_code != cur:
+            cur = i.category_code
+            text.add("", f"{i.category_emoji} {i.category_name}:")
+        text.add(fragments.fragment(('price', i.code), PRICE_TOPICS, lambda: _price_line(i), seen))
     await send_long_message(message, text)
 
 
+def _price_line(i) -> str:
+    unit_label = "м²" if i.price_type == "square" else "шт"
+    return f"   ▪️ {i.code} — {i.name}: {int(i.price)} руб/{unit_label}"
+
+
 # ==================== НАЗНАЧИТЬ / УБРАТЬ КАТЕГОРИЮ ====================
 
 @router.message(F.text == "🔗 Назначить кат.", AdminFilter())
@@ -274,7 +350,7 @@ async def assign_start(message: types.Message, state: FSMContext):
     buttons = []
     for tid, name in workers:
         cats = await get_worker_categories(tid)
-        c_str = ", ".join([f"{c[2]}{c[1]}" for c in cats]) if cats else "—"
+        c_str = ", ".join([f"{c.emoji}{c.name}" for c in cats]) if cats else "—"
         buttons.append([InlineKeyboardButton(text=f"{name} [{c_str}]", callback_data=f"asw:{tid}")])
     await message.answer("Работник:", reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
     await state.set_state(AdminAssignCategory.choosing_worker)
@@ -285,7 +361,7 @@ async def assign_worker(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
     await state.update_data(worker_id=wid)
     cats = await get_categories()
-    current = {c[0] for c in await get_worker_categories(wid)}
+    current = {c.code for c in await get_worker_categories(wid)}
     available = [(c, n, e) for c, n, e in cats if c not in current]
     if not available:
         await callback.message.edit_text("✅ Все назначены!")
@@ -303,8 +379,7 @@ async def assign_done(callback: types.CallbackQuery, state: FSMContext):
     cat = callback.data.split(":")[1]
     data = await state.get_data()
     await assign_category_to_worker(data["worker_id"], cat)
-    workers = await get_all_workers()
-    w = next((n for t, n in workers if t == data["worker_id"]), "?")
+    w = identity.worker_name(data["worker_id"], "?")
     cats = await get_categories()
     c = next((f"{e}{n}" for co, n, e in cats if co == cat), "?")
     await callback.message.edit_text(f"✅ {w} → {c}")
@@ -319,7 +394,7 @@ async def rmcat_start(message: types.Message, state: FSMContext):
     for tid, name in await get_all_workers():
         cats = await get_worker_categories(tid)
         if cats:
-            c_str = ", ".join([f"{c[2]}{c[1]}" for c in cats])
+            c_str = ", ".join([f"{c.emoji}{c.name}" for c in cats])
             buttons.append([InlineKeyboardButton(text=f"{name} [{c_str}]", callback_data=f"rcw:{tid}")])
     if not buttons:
         await message.answer("⚠️ Ни у кого нет категорий.")
@@ -403,12 +478,11 @@ async def recalc_confirm(callback: types.CallbackQuery, state: FSMContext):
     work_code = data["code"]
     new_price = data["new_price"]
     
-    # Обновляем цену в прайсе
-    await update_price(work_code, new_price)
-    
     if callback.data.split(":")[1] == "yes":
-        # Пересчитываем записи
-        stats = await recalculate_entries_from_march(work_code, new_price)
+        # Цена и пересчёт записей — одной транзакцией
+        async with unit_of_work() as conn:
+            await update_price(work_code, new_price, conn=conn)
+            stats = await recalculate_entries_from_march(work_code, new_price, conn=conn)
         
         await callback.message.edit_text(
             f"✅ Цена обновлена: {int(new_price)} руб\n\n"
@@ -418,6 +492,7 @@ async def recalc_confirm(callback: types.CallbackQuery, state: FSMContext):
             f"{'📈' if stats['difference'] > 0 else '📉'} Разница: {int(abs(stats['difference']))} руб"
         )
     else:
+        await update_price(work_code, new_price)
         await callback.message.edit_text(
             f"✅ Цена обновлена: {int(new_price)} руб\n"
             f"ℹ️ Старые записи не изменены"
@@ -446,17 +521,17 @@ async def del_cat_start(message: types.Message, state: FSMContext):
 async def del_cat_chosen(callback: types.CallbackQuery, state: FSMContext):
     code = callback.data.split(":")[1]
     cats = await get_categories()
-    info = next(((c, n, e) for c, n, e in cats if c == code), None)
+    info = next((c for c in cats if c.code == code), None)
     if not info:
         await callback.answer("Не найдена", show_alert=True)
         await state.clear()
         return
-    await state.update_data(code=code, name=info[1], emoji=info[2])
+    await state.update_data(code=code, name=info.name, emoji=info.emoji)
     buttons = [
         [InlineKeyboardButton(text="✅ Да!", callback_data="cdc:yes")],
         [InlineKeyboardButton(text="❌ Нет", callback_data="cdc:no")]
     ]
-    await callback.message.edit_text(f"⚠️ Удалить {info[2]} {info[1]}?",
+    await callback.message.edit_text(f"⚠️ Удалить {info.emoji} {info.name}?",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
     await state.set_state(AdminDeleteCategory.confirming)
     await callback.answer()
@@ -492,17 +567,17 @@ async def del_work_start(message: types.Message, state: FSMContext):
 async def del_work_chosen(callback: types.CallbackQuery, state: FSMContext):
     code = callback.data.split(":")[1]
     items = await get_price_list()
-    info = next(((c, n, p) for c, n, p, pt, cc, cn, ce in items if c == code), None)
+    info = next((i for i in items if i.code == code), None)
     if not info:
         await callback.answer("Не найдена", show_alert=True)
         await state.clear()
         return
-    await state.update_data(code=code, name=info[1])
+    await state.update_data(code=code, name=info.name)
     buttons = [
         [InlineKeyboardButton(text="✅ Да!", callback_data="cdw:yes")],
         [InlineKeyboardButton(text="❌ Нет", callback_data="cdw:no")]
     ]
-    await callback.message.edit_text(f"⚠️ Удалить {info[1]} ({int(info[2])} руб)?",
+    await callback.message.edit_text(f"⚠️ Удалить {info.name} ({int(info.price)} руб)?",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
     await state.set_state(AdminDeleteWork.confirming)
     await callback.answer()
@@ -512,8 +587,8 @@ async def del_work_chosen(callback: types.CallbackQuery, state: FSMContext):
 async def del_work_confirm(callback: types.CallbackQuery, state: FSMContext):
     if callback.data.split(":")[1] == "yes":
         data = await state.get_data()
-        full = await delete_price_item_permanently(data["code"])
-        msg = f"✅ {data['name']} удалён!" if full else f"✅ {data['name']} скрыт."
+        found = await delete_price_item_permanently(data["code"])
+        msg = f"✅ {data['name']} убран из прайса." if found else "❌ Позиция не найдена."
         await callback.message.edit_text(msg)
     else:
         await callback.message.edit_text("❌ Отменено.")
@@ -550,8 +625,8 @@ async def del_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     info = await get_worker_deletion_info(telegram_id)
     
     text = f"⚠️ <b>Подтверждение удаления</b>\n\n"
-    text += f"👤 Работник: {worker['name']}\n\n"
-    text += f"📊 <b>Будет удалено:</b>\n"
+    text += f"👤 Работник: {worker.name}\n\n"
+    text += f"📊 <b>Будет перенесено в архив:</b>\n"
     text += f"• Записей о работе: {info['work_count']}\n"
     text += f"• Авансов: {info['advances_count']}\n"
     text += f"• Штрафов: {info['penalties_count']}\n\n"
@@ -559,9 +634,9 @@ async def del_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     text += f"• Заработано: {info['total_earned']:,.0f} ₽\n"
     text += f"• Выдано авансов: {info['total_advances']:,.0f} ₽\n"
     text += f"• Штрафов: {info['total_penalties']:,.0f} ₽\n\n"
-    text += f"❗️ <b>Это действие нельзя отменить!</b>"
+    text += f"❗️ <b>Работник пропадёт из списков и отчётов.</b>"
 
-    await state.update_data(worker_id=telegram_id, worker_name=worker['name'])
+    await state.update_data(worker_id=telegram_id, worker_name=worker.name)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="✅ Да, удалить", callback_data='cdwk:yes')],
@@ -579,7 +654,7 @@ async def del_worker_confirm(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         try:
             await delete_worker(data["worker_id"])
-            await callback.message.edit_text(f"✅ {data['worker_name']} и все его данные успешно удалены!")
+            await callback.message.edit_text(f"✅ {data['worker_name']} удалён, история перенесена в архив.")
         except Exception as e:
             await callback.message.edit_text(f"❌ Ошибка: {e}")
             logging.error(f"Error deleting worker: {e}")
@@ -598,28 +673,13 @@ async def cancel_del(callback: types.CallbackQuery, state: FSMContext):
 
 # ==================== ЗАПИСИ РАБОТНИКОВ ====================
 
-@router.message(F.text == "🔧 Записи работников", AdminFilter())
-async def admin_entries_start(message: types.Message, state: FSMContext):
-    """Выбор работника для просмотра записей"""
-    await state.clear()
-    workers = await get_all_workers()
-    if not workers:
-        await message.answer("⚠️ Нет работников.")
-        return
+def _workers_screen(workers) -> Screen:
     buttons = [[InlineKeyboardButton(text=f"👤 {n}", callback_data=f"ae_w:{t}")] for t, n in workers]
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")])
-    await message.answer("👤 Выберите работника:", reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
-    await state.set_state(AdminManageEntries.choosing_worker)
+    return Screen("👤 Выберите работника:", InlineKeyboardMarkup(inline_keyboard=buttons))
 
 
-@router.callback_query(F.data.startswith("ae_w:"), AdminManageEntries.choosing_worker)
-async def admin_entries_choose_month(callback: types.CallbackQuery, state: FSMContext):
-    """Выбор месяца для просмотра записей"""
-    wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    wname = next((n for t, n in workers if t == wid), "?")
-    await state.update_data(worker_id=wid, worker_name=wname)
-    
+def _months_screen(wname: str) -> Screen:
     today = date.today()
     current_year = today.year
     current_month = today.month
@@ -643,12 +703,29 @@ async def admin_entries_choose_month(callback: types.CallbackQuery, state: FSMCo
         [InlineKeyboardButton(text="🔙 К работникам", callback_data="ae_back_workers")],
         [InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")]
     ]
-    
-    await callback.message.edit_text(
-        f"👤 <b>{wname}</b>\n\nВыберите месяц:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
-        parse_mode="HTML"
-    )
+    return Screen(f"👤 <b>{wname}</b>\n\nВыберите месяц:",
+                  InlineKeyboardMarkup(inline_keyboard=buttons), "HTML")
+
+
+@router.message(F.text == "🔧 Записи работников", AdminFilter())
+async def admin_entries_start(message: types.Message, state: FSMContext):
+    """Выбор работника для просмотра записей"""
+    await state.clear()
+    workers = await get_all_workers()
+    if not workers:
+        await message.answer("⚠️ Нет работников.")
+        return
+    await screens.send(message, _workers_screen(workers))
+    await state.set_state(AdminManageEntries.choosing_worker)
+
+
+@router.callback_query(F.data.startswith("ae_w:"), AdminManageEntries.choosing_worker)
+async def admin_entries_choose_month(callback: types.CallbackQuery, state: FSMContext):
+    """Выбор месяца для просмотра записей"""
+    wid = int(callback.data.split(":")[1])
+    wname = identity.worker_name(wid, "?")
+    await state.update_data(worker_id=wid, worker_name=wname)
+    await screens.show(callback.message, _months_screen(wname))
     await state.set_state(AdminManageEntries.choosing_month)
     await callback.answer()
 
@@ -666,17 +743,19 @@ async def admin_entries_show(callback: types.CallbackQuery, state: FSMContext):
     
     await state.update_data(year=year, month=month)
     
-    entries = await get_worker_entries_by_month(wid, year, month)
+    entries = await screens.memo(
+        callback.message.chat.id, ('entries', wid, year, month),
+        lambda: get_worker_entries_by_month(wid, year, month), topics=('work_log',))
     
     if not entries:
         buttons = [
+            [InlineKeyboardButton(text="📜 Изменения записей месяца", callback_data="ae_audit")],
             [InlineKeyboardButton(text="🔙 К месяцам", callback_data="ae_back_months")],
             [InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")]
         ]
-        await callback.message.edit_text(
+        await screens.show(callback.message, Screen(
             f"📭 У {wname} нет записей за {MONTHS_RU[month]} {year}",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-        )
+            InlineKeyboardMarkup(inline_keyboard=buttons)))
         await callback.answer()
         return
     
@@ -703,17 +782,16 @@ async def admin_entries_show(callback: types.CallbackQuery, state: FSMContext):
     
     text += f"\n💰 <b>Итого: {int(total_month):,} ₽</b>"
     
+    buttons = buttons[:23]
+    buttons.append([InlineKeyboardButton(text="📜 Изменения записей месяца", callback_data="ae_audit")])
     buttons.append([InlineKeyboardButton(text="🔙 К месяцам", callback_data="ae_back_months")])
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")])
     
     if len(text) > 4000:
         text = text[:4000] + "..."
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons[:25]),
-        parse_mode="HTML"
-    )
+    await screens.show(callback.message, Screen(
+        text, InlineKeyboardMarkup(inline_keyboard=buttons), "HTML"))
     await state.set_state(AdminManageEntries.viewing_entries)
     await callback.answer()
 
@@ -728,22 +806,23 @@ async def admin_entry_chosen(callback: types.CallbackQuery, state: FSMContext):
         return
     await state.update_data(entry_id=eid)
     
-    price_type = entry[8] if len(entry) > 8 else "unit"
+    price_type = entry.price_type
     unit_label = "м²" if price_type == "square" else "шт"
-    qty_display = f"{entry[2]:.2f}" if price_type == "square" else str(int(entry[2]))
+    qty_display = f"{entry.quantity:.2f}" if price_type == "square" else str(int(entry.quantity))
     
     buttons = [
         [InlineKeyboardButton(text="✏️ Изменить кол-во", callback_data="ae_act:edit")],
         [InlineKeyboardButton(text="🗑 Удалить", callback_data="ae_act:delete")],
+        [InlineKeyboardButton(text="📜 История", callback_data="ae_act:history")],
         [InlineKeyboardButton(text="🔙 К записям", callback_data="ae_act:back")]
     ]
     await callback.message.edit_text(
-        f"📦 <b>{entry[1]}</b>\n\n"
-        f"👤 {entry[7]}\n"
-        f"📅 {format_date(entry[5])}\n"
+        f"📦 <b>{entry.work_name}</b>\n\n"
+        f"👤 {entry.worker_name}\n"
+        f"📅 {format_date(entry.work_date)}\n"
         f"🔢 Кол-во: {qty_display} {unit_label}\n"
-        f"💵 Расценка: {int(entry[3])} ₽/{unit_label}\n"
-        f"💰 Сумма: {int(entry[4])} ₽",
+        f"💵 Расценка: {int(entry.price_per_unit)} ₽/{unit_label}\n"
+        f"💰 Сумма: {int(entry.total)} ₽",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
         parse_mode="HTML"
     )
@@ -768,11 +847,14 @@ async def admin_entry_action(callback: types.CallbackQuery, state: FSMContext):
             [InlineKeyboardButton(text="❌ Нет", callback_data="ae_del:no")]
         ]
         await callback.message.edit_text(
-            f"⚠️ Удалить запись?\n\n📦 {entry[1]} × {int(entry[2])} = {int(entry[4])} ₽",
+            f"⚠️ Удалить запись?\n\n📦 {entry.work_name} × {int(entry.quantity)} = {int(entry.total)} ₽",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
         )
         await state.set_state(AdminManageEntries.confirming_delete)
         
+    elif action == "history":
+        await _show_entry_history(callback, state, 0)
+
     elif action == "back":
         data = await state.get_data()
         year = data.get("year", date.today().year)
@@ -803,19 +885,20 @@ async def admin_entry_new_qty(message: types.Message, state: FSMContext):
         await state.clear()
         return
     
-    old_qty = entry[2]
-    old_total = entry[4]
-    new_total = new_qty * entry[3]
-    await update_entry_quantity(data["entry_id"], new_qty)
+    changed = await update_entry_quantity(data["entry_id"], new_qty)
+    if not changed:
+        await message.answer("❌ Запись не найдена.")
+        await state.clear()
+        return
     
-    price_type = entry[8] if len(entry) > 8 else "unit"
+    price_type = entry.price_type
     unit_label = "м²" if price_type == "square" else "шт"
     
     await message.answer(
         f"✅ Изменено!\n\n"
-        f"📦 {entry[1]} ({entry[7]})\n"
-        f"Было: {int(old_qty)} {unit_label} = {int(old_total)} ₽\n"
-        f"Стало: {int(new_qty)} {unit_label} = {int(new_total)} ₽",
+        f"📦 {entry.work_name} ({entry.worker_name})\n"
+        f"Было: {int(changed.old_quantity)} {unit_label} = {int(changed.old_total)} ₽\n"
+        f"Стало: {int(new_qty)} {unit_label} = {int(changed.new_total)} ₽",
         reply_markup=get_edit_keyboard()
     )
     await state.clear()
@@ -829,7 +912,7 @@ async def admin_entry_delete_confirm(callback: types.CallbackQuery, state: FSMCo
         deleted = await delete_entry_by_id(data["entry_id"])
         if deleted:
             await callback.message.edit_text(
-                f"✅ Удалено: {deleted[1]} × {int(deleted[2])} = {int(deleted[3])} ₽"
+                f"✅ Удалено: {deleted.work_name} × {int(deleted.quantity)} = {int(deleted.total)} ₽"
             )
         else:
             await callback.message.edit_text("❌ Запись не найдена.")
@@ -839,17 +922,117 @@ async def admin_entry_delete_confirm(callback: types.CallbackQuery, state: FSMCo
     await callback.answer()
 
 
+# Поля строк work_log / advances / penalties в журнале изменений
+_AUDIT_FIELDS = {
+    'quantity': "кол-во", 'total': "сумма", 'price_per_unit': "расценка",
+    'work_date': "дата", 'work_code': "работа", 'amount': "сумма",
+    'advance_date': "дата", 'penalty_date': "дата", 'comment': "комментарий",
+    'reason': "причина",
+}
+_AUDIT_TABLES = {'work_log': "работа", 'advances': "аванс", 'penalties': "штраф"}
+# Сколько последних правок за месяц показывать
+_AUDIT_LIMIT = 200
+
+
+def _audit_actor(actor) -> str:
+    if actor is None:
+        return "система"
+    if actor == ADMIN_ID:
+        return "админ"
+    return identity.worker_name(actor, str(actor))
+
+
+def _audit_value(value) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    return escape(str(value))
+
+
+def _audit_screen(text: TextBuilder, page: int, prefix: str, buttons) -> Screen:
+    """Страница page журнала: части по 4000 символов, листание кнопками
+    {prefix}:<страница>"""
+    parts = split_message(text, limit=4000, parse_mode="HTML")
+    page = max(0, min(page, len(parts) - 1))
+    body = parts[page]
+    nav = []
+    if len(parts) > 1:
+        body += f"\n\n📄 Страница {page + 1} из {len(parts)}"
+        if page > 0:
+            nav.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"{prefix}:{page - 1}"))
+        if page < len(parts) - 1:
+            nav.append(InlineKeyboardButton(text="Далее ▶️", callback_data=f"{prefix}:{page + 1}"))
+    keyboard = ([nav] if nav else []) + buttons
+    return Screen(body, InlineKeyboardMarkup(inline_keyboard=keyboard), "HTML")
+
+
+async def _show_entry_history(callback: types.CallbackQuery, state: FSMContext, page: int):
+    data = await state.get_data()
+    eid = data["entry_id"]
+    records = await get_audit_for_row('work_log', eid)
+    text = TextBuilder(f"📜 <b>История записи #{eid}</b>", "")
+    text.extend(_audit_line(r) for r in records)
+    if not records:
+        text.add("Запись не менялась.")
+    buttons = [[InlineKeyboardButton(text="🔙 К записи", callback_data=f"ae_e:{eid}")]]
+    await screens.show(callback.message, _audit_screen(text, page, "ae_hist", buttons))
+    await state.set_state(AdminManageEntries.viewing_entries)
+
+
+@router.callback_query(F.data.startswith("ae_hist:"), AdminManageEntries.viewing_entries, AdminFilter())
+async def admin_entry_history_page(callback: types.CallbackQuery, state: FSMContext):
+    """Листание истории записи"""
+    if "entry_id" not in await state.get_data():
+        await callback.answer()
+        return
+    await _show_entry_history(callback, state, int(callback.data.split(":")[1]))
+    await callback.answer()
+
+
+def _audit_line(r) -> str:
+    """Одна правка: когда, кто, что было и что стало"""
+    head = (f"🕓 {r.changed_at:%d.%m %H:%M} {_audit_actor(r.actor)}: "
+            f"{_AUDIT_TABLES.get(r.table_name, r.table_name)} #{r.row_id}")
+    if r.op == 'delete':
+        b = r.before
+        what = escape(b.get('work_code') or b.get('comment') or b.get('reason') or "")
+        return f"{head} — 🗑 удалено ({what} {_audit_value(b.get('total', b.get('amount')))} ₽)"
+    changes = [f"{_AUDIT_FIELDS.get(k, k)} {_audit_value(r.before.get(k))} → {_audit_value(v)}"
+               for k, v in r.after.items()
+               if k in _AUDIT_FIELDS and r.before.get(k) != v]
+    return f"{head} — ✏️ " + ", ".join(changes)
+
+
+@router.callback_query(F.data.startswith("ae_audit"), AdminFilter())
+async def admin_entries_audit(callback: types.CallbackQuery, state: FSMContext):
+    """Правки и удаления денежных записей работника, датированных выбранным
+    месяцем (ae_audit — первая страница, ae_audit:<n> — листание)"""
+    data = await state.get_data()
+    if "worker_id" not in data:
+        await callback.answer()
+        return
+    _, _, page = callback.data.partition(":")
+    year = data.get("year", date.today().year)
+    month = data.get("month", date.today().month)
+    records = await get_audit_for_worker(data["worker_id"], *month_bounds(year, month), limit=_AUDIT_LIMIT)
+    text = TextBuilder(f"📜 <b>{data['worker_name']}</b>: изменения записей за {MONTHS_RU[month]} {year}", "")
+    if len(records) == _AUDIT_LIMIT:
+        text.add(f"Показаны последние {_AUDIT_LIMIT} изменений.", "")
+    text.extend(_audit_line(r) for r in records)
+    if not records:
+        text.add("Изменений не было.")
+    buttons = [
+        [InlineKeyboardButton(text="🔙 К записям", callback_data=f"ae_month:{year}:{month}")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")]
+    ]
+    await screens.show(callback.message, _audit_screen(text, int(page or 0), "ae_audit", buttons))
+    await state.set_state(AdminManageEntries.choosing_month)
+    await callback.answer()
+
+
 @router.callback_query(F.data == "ae_back_workers")
 async def admin_entries_back_to_workers(callback: types.CallbackQuery, state: FSMContext):
     """Возврат к списку работников"""
-    workers = await get_all_workers()
-    buttons = [[InlineKeyboardButton(text=f"👤 {n}", callback_data=f"ae_w:{t}")] for t, n in workers]
-    buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")])
-    
-    await callback.message.edit_text(
-        "👤 Выберите работника:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-    )
+    await screens.show(callback.message, _workers_screen(await get_all_workers()))
     await state.set_state(AdminManageEntries.choosing_worker)
     await callback.answer()
 
@@ -858,37 +1041,7 @@ async def admin_entries_back_to_workers(callback: types.CallbackQuery, state: FS
 async def admin_entries_back_to_months(callback: types.CallbackQuery, state: FSMContext):
     """Возврат к выбору месяца"""
     data = await state.get_data()
-    wname = data.get("worker_name", "Работник")
-    
-    today = date.today()
-    current_year = today.year
-    current_month = today.month
-    
-    if current_month == 1:
-        prev_month = 12
-        prev_year = current_year - 1
-    else:
-        prev_month = current_month - 1
-        prev_year = current_year
-    
-    buttons = [
-        [InlineKeyboardButton(
-            text=f"📅 {MONTHS_RU[current_month]} {current_year}",
-            callback_data=f"ae_month:{current_year}:{current_month}"
-        )],
-        [InlineKeyboardButton(
-            text=f"📅 {MONTHS_RU[prev_month]} {prev_year}",
-            callback_data=f"ae_month:{prev_year}:{prev_month}"
-        )],
-        [InlineKeyboardButton(text="🔙 К работникам", callback_data="ae_back_workers")],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="ae_cancel")]
-    ]
-    
-    await callback.message.edit_text(
-        f"👤 <b>{wname}</b>\n\nВыберите месяц:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
-        parse_mode="HTML"
-    )
+    await screens.show(callback.message, _months_screen(data.get("worker_name", "Работник")))
     await state.set_state(AdminManageEntries.choosing_month)
     await callback.answer()
 
@@ -926,19 +1079,19 @@ async def edit_category_start(message: types.Message, state: FSMContext):
 async def edit_category_chosen(callback: types.CallbackQuery, state: FSMContext):
     code = callback.data.split(":")[1]
     cats = await get_categories()
-    cat_info = next(((c, n, e) for c, n, e in cats if c == code), None)
+    cat_info = next((c for c in cats if c.code == code), None)
     if not cat_info:
         await callback.answer("Не найдена", show_alert=True)
         await state.clear()
         return
-    await state.update_data(cat_code=code, cat_name=cat_info[1], cat_emoji=cat_info[2])
+    await state.update_data(cat_code=code, cat_name=cat_info.name, cat_emoji=cat_info.emoji)
     buttons = [
         [InlineKeyboardButton(text="✏️ Изменить название", callback_data="ec_act:name")],
         [InlineKeyboardButton(text="🎨 Изменить эмодзи", callback_data="ec_act:emoji")],
         [InlineKeyboardButton(text="🔙 Назад", callback_data="ec_act:back")]
     ]
     await callback.message.edit_text(
-        f"Категория: {cat_info[2]} {cat_info[1]}\nКод: {code}\n\nЧто изменить?",
+        f"Категория: {cat_info.emoji} {cat_info.name}\nКод: {code}\n\nЧто изменить?",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
     )
     await state.set_state(AdminEditCategory.choosing_action)
@@ -1006,7 +1159,7 @@ async def edit_work_category_chosen(callback: types.CallbackQuery, state: FSMCon
     cat_code = callback.data.split(":")[1]
     await state.update_data(category_code=cat_code)
     items = await get_price_list()
-    cat_items = [i for i in items if i[4] == cat_code]
+    cat_items = [i for i in items if i.category_code == cat_code]
     if not cat_items:
         await callback.message.edit_text("📭 В этой категории нет работ.")
         await state.clear()
@@ -1142,4 +1295,137 @@ async def edit_work_back(callback: types.CallbackQuery, state: FSMContext):
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="cdel")])
     await callback.message.edit_text("Выберите категорию:", reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
     await state.set_state(AdminEditWork.choosing_category)
-    await callback.answer()
\ No newline at end of file
+    await callback.answer()
+
+
+# ==================== БЭКАП И ВОССТАНОВЛЕНИЕ ====================
+
+@router.message(F.text == "💾 Бэкап БД", AdminFilter())
+async def manual_backup(message: types.Message, state: FSMContext):
+    await state.clear()
+    await backup.send_backup(message.bot, message.from_user.id)
+
+
+# ==================== СНИМОК БД ====================
+
+# Больше Telegram не отправит
+SNAPSHOT_SEND_LIMIT = 50 * 1024 * 1024
+
+
+@router.message(Command("snapshot"), AdminFilter())
+async def make_snapshot(message: types.Message, state: FSMContext):
+    """Бинарный снимок всей БД (snapshots.py) — для быстрого восстановления"""
+    await state.clear()
+    await message.answer("⏳ Снимаю БД...")
+    try:
+        path = await snapshots.create_snapshot()
+    except Exception as e:
+        logging.error(f"Snapshot error: {e}")
+        await message.answer(f"❌ Ошибка снимка: {e}")
+        return
+    manifest = snapshots.read_manifest(path)
+    size = os.path.getsize(path)
+    caption = (f"🗜 Снимок БД\n📅 {format_date(manifest['created_at'][:10])}\n"
+               f"📦 {sum(t['rows'] for t in manifest['tables'])} строк, {size / 1024 / 1024:.1f} МБ\n\n"
+               f"Восстановить — отправьте файл боту")
+    if size > SNAPSHOT_SEND_LIMIT:
+        await message.answer(f"{caption}\n\n⚠️ Больше 50 МБ — файл оставлен на сервере: {path}")
+        return
+    await message.answer_document(FSInputFile(path, filename=os.path.basename(path)), caption=caption)
+    os.unlink(path)
+
+
+@router.message(F.document.file_name.endswith('.tar.gz'), AdminFilter())
+async def restore_snapshot_start(message: types.Message, state: FSMContext):
+    """Админ отправил снимок — проверяем манифест и спрашиваем подтверждение"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.tar.gz') as tmp:
+        path = tmp.name
+    try:
+        file = await message.bot.get_file(message.document.file_id)
+        await message.bot.download_file(file.file_path, path)
+        manifest = snapshots.read_manifest(path)
+    except Exception as e:
+        await message.answer(f"❌ Не снимок БД или файл больше 20 МБ: {e}\n"
+                             f"Большие снимки: python snapshots.py restore <файл> --yes")
+        return
+    await state.update_data(snapshot_path=path)
+    rows = "\n".join(f"• {t['name']}: {t['rows']}" for t in manifest['tables'] if t['rows'])
+    buttons = [
+        [InlineKeyboardButton(text="✅ Восстановить", callback_data="snap:yes")],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="snap:no")]
+    ]
+    await message.answer(
+        f"⚠️ Восстановить снимок от {manifest['created_at'].replace('T', ' ')}?\n"
+        f"Все текущие данные будут заменены.\n\n{rows}",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+
+
+@router.callback_query(F.data.startswith("snap:"))
+async def restore_snapshot_confirm(callback: types.CallbackQuery, state: FSMContext):
+    if not identity.is_admin(callback.from_user.id):
+        await callback.answer("⛔ Только админ может восстанавливать БД", show_alert=True)
+        return
+    path = (await state.get_data()).get("snapshot_path")
+    await state.clear()
+    if not path or not os.path.exists(path):
+        await callback.message.edit_text("❌ Файл снимка не найден, отправьте его ещё раз.")
+        await callback.answer()
+        return
+    if callback.data.split(":")[1] != "yes":
+        os.unlink(path)
+        await callback.message.edit_text("❌ Отменено.")
+        await callback.answer()
+        return
+    await callback.message.edit_text("⏳ Восстанавливаю...")
+    await callback.answer()
+    started = time.monotonic()
+    try:
+        counts = await snapshots.restore_snapshot(path)
+        await callback.message.edit_text(
+            f"✅ Снимок восстановлен за {time.monotonic() - started:.1f} с\n"
+            f"📦 Строк: {sum(counts.values())}")
+    except Exception as e:
+        logging.error(f"Snapshot restore error: {e}")
+        await callback.message.edit_text(f"❌ Ошибка восстановления: {e}\n"
+                                         f"Данные могли загрузиться частично — повторите восстановление.")
+    finally:
+        os.unlink(path)
+
+
+# ==================== ИМПОРТ ИЗ JSON ====================
+
+@router.message(F.document.file_name.endswith('.json'), AdminFilter())
+async def import_from_json(message: types.Message):
+    """Админ отправляет .json файл — бот переносит данные в PostgreSQL"""
+
+    await message.answer("⏳ Начинаю импорт из JSON...\n🧹 Очищаю старые данные...")
+
+    try:
+        file = await message.bot.get_file(message.document.file_id)
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.json', mode='w', encoding='utf-8') as tmp:
+            tmp_path = tmp.name
+
+        await message.bot.download_file(file.file_path, tmp_path)
+
+        data = json_backup.read(tmp_path)
+        # Одна транзакция: при ошибке на середине БД остаётся как была
+        counts = await json_backup.restore(data)
+
+        os.unlink(tmp_path)
+
+        await message.answer(
+            f"✅ Импорт из JSON завершён!\n\n"
+            f"📊 Перенесено:\n"
+            f"👥 Работников: {counts.get('workers', 0)}\n"
+            f"📂 Категорий: {counts.get('categories', 0)}\n"
+            f"💰 Позиций прайса: {counts.get('price_list', 0)}\n"
+            f"🔗 Связей: {counts.get('worker_categories', 0)}\n"
+            f"📝 Записей работ: {counts.get('work_log', 0)}\n"
+            f"💳 Авансов: {counts.get('advances', 0)}\n"
+            f"⚠️ Штрафов: {counts.get('penalties', 0)}"
+        )
+
+    except Exception as e:
+        logging.error(f"JSON Import error: {e}")
+        await message.answer(f"❌ Ошибка импорта: {e}")
@@ -4,13 +4,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from config import ADMIN_ID, MANAGER_IDS
-from database import add_worker, worker_exists, get_all_workers
+from config import ADMIN_ID
+from database import add_worker
 from keyboards import (
     get_main_keyboard, get_admin_keyboard, get_manager_keyboard,
     get_add_keyboard, get_edit_keyboard, get_delete_keyboard,
     get_info_keyboard, get_money_keyboard
 )
+from services import identity
 from handlers.filters import AdminFilter, StaffFilter
 
 router = Router()
@@ -25,12 +26,14 @@ class ReplyToWorker(StatesGroup):
 
 
 @router.message(Command("start"))
-async def cmd_start(message: types.Message, state: FSMContext, is_admin: bool, is_manager: bool, **kwargs):
+async def cmd_start(message: types.Message, state: FSMContext, is_admin: bool, is_manager: bool,
+                    worker=None, **kwargs):
     await state.clear()
     uid = message.from_user.id
 
-    if not await worker_exists(uid):
+    if worker is None:
         await add_worker(uid, message.from_user.full_name)
+        await identity.ensure_loaded()
 
     if is_admin:
         text = (
@@ -135,9 +138,9 @@ async def menu_money(message: types.Message, state: FSMContext):
 async def back_to_admin_panel(message: types.Message, state: FSMContext):
     await state.clear()
     uid = message.from_user.id
-    if uid == ADMIN_ID:
+    if identity.is_admin(uid):
         await message.answer("🖥 Админ-панель", reply_markup=get_admin_keyboard())
-    elif uid in MANAGER_IDS:
+    elif identity.is_manager(uid):
         await message.answer("📊 Панель отчётов", reply_markup=get_manager_keyboard())
     else:
         await message.answer("🏠 Главное меню", reply_markup=get_main_keyboard(uid))
@@ -160,14 +163,13 @@ async def message_to_admin_start(message: types.Message, state: FSMContext):
 
 
 @router.message(MessageToAdmin.waiting_for_message)
-async def message_to_admin_send(message: types.Message, state: FSMContext, bot: Bot):
+async def message_to_admin_send(message: types.Message, state: FSMContext, bot: Bot, worker=None):
     if message.text == "🔙 Назад":
         await state.clear()
         await message.answer("❌ Отменено.", reply_markup=get_main_keyboard(message.from_user.id))
         return
 
-    workers = await get_all_workers()
-    sender_name = next((name for tid, name in workers if tid == message.from_user.id), "Неизвестный")
+    sender_name = worker.name if worker else "Неизвестный"
 
     reply_kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(
@@ -194,7 +196,7 @@ async def message_to_admin_send(message: types.Message, state: FSMContext, bot:
 
 @router.callback_query(F.data.startswith("reply_to:"))
 async def reply_to_worker_start(callback: types.CallbackQuery, state: FSMContext):
-    if callback.from_user.id != ADMIN_ID:
+    if not identity.is_admin(callback.from_user.id):
         await callback.answer("⛔ Только админ может отвечать", show_alert=True)
         return
 
@@ -1,13 +1,15 @@
 from aiogram.filters import Filter
 from aiogram import types
-from config import ADMIN_ID, MANAGER_IDS
+from services import identity
 
 
 class AdminFilter(Filter):
     async def __call__(self, message: types.Message) -> bool:
-        return message.from_user.id == ADMIN_ID
+        await identity.ensure_loaded()
+        return identity.is_admin(message.from_user.id)
 
 
 class StaffFilter(Filter):
     async def __call__(self, message: types.Message) -> bool:
-        return message.from_user.id == ADMIN_ID or message.from_user.id in MANAGER_IDS
\ No newline at end of file
+        await identity.ensure_loaded()
+        return identity.is_staff(message.from_user.id)
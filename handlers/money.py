@@ -15,7 +15,8 @@ from database import (
 )
 from states import AdminAdvance, AdminDeleteAdvance, AdminPenalty, AdminDeletePenalty
 from keyboards import get_money_keyboard
-from utils import format_date, format_date_short, send_long_message, MONTHS_RU
+from utils import format_date, format_date_short, send_long_message, MONTHS_RU, TextBuilder
+from services import identity
 from handlers.filters import StaffFilter
 
 router = Router()
@@ -47,8 +48,7 @@ async def advance_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("adv_w:"), AdminAdvance.choosing_worker)
 async def advance_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    wname = next((n for t, n in workers if t == wid), "?")
+    wname = identity.worker_name(wid, "?")
     today = date.today()
     stats = await get_worker_full_stats(wid, today.year, today.month)
     await state.update_data(worker_id=wid, worker_name=wname)
@@ -136,7 +136,7 @@ async def delete_advance_start(message: types.Message, state: FSMContext):
     for tid, name in workers:
         advances = await get_worker_advances(tid, today.year, today.month)
         if advances:
-            total = sum(a[1] for a in advances)
+            total = sum(a.amount for a in advances)
             buttons.append([InlineKeyboardButton(
                 text=f"👤 {name} ({int(total)} руб, {len(advances)} шт)",
                 callback_data=f"dadv_w:{tid}"
@@ -152,8 +152,7 @@ async def delete_advance_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("dadv_w:"), AdminDeleteAdvance.choosing_worker)
 async def del_advance_worker(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    wname = next((n for t, n in workers if t == wid), "?")
+    wname = identity.worker_name(wid, "?")
     await state.update_data(worker_id=wid, worker_name=wname)
     today = date.today()
     advances = await get_worker_advances(wid, today.year, today.month)
@@ -192,7 +191,7 @@ async def del_advance_confirm(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         deleted = await delete_advance(data["advance_id"])
         if deleted:
-            await callback.message.edit_text(f"✅ Аванс {int(deleted[1])} руб удалён!")
+            await callback.message.edit_text(f"✅ Аванс {int(deleted.amount)} руб удалён!")
         else:
             await callback.message.edit_text("❌ Не найден.")
     else:
@@ -226,8 +225,7 @@ async def penalty_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("pen_w:"), AdminPenalty.choosing_worker)
 async def penalty_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    wname = next((n for t, n in workers if t == wid), "?")
+    wname = identity.worker_name(wid, "?")
     today = date.today()
     stats = await get_worker_full_stats(wid, today.year, today.month)
     await state.update_data(worker_id=wid, worker_name=wname)
@@ -315,7 +313,7 @@ async def delete_penalty_start(message: types.Message, state: FSMContext):
     for tid, name in workers:
         penalties = await get_worker_penalties(tid, today.year, today.month)
         if penalties:
-            total = sum(p[1] for p in penalties)
+            total = sum(p.amount for p in penalties)
             buttons.append([InlineKeyboardButton(
                 text=f"👤 {name} ({int(total)} руб, {len(penalties)} шт)",
                 callback_data=f"dpen_w:{tid}"
@@ -331,8 +329,7 @@ async def delete_penalty_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("dpen_w:"), AdminDeletePenalty.choosing_worker)
 async def del_penalty_worker(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    wname = next((n for t, n in workers if t == wid), "?")
+    wname = identity.worker_name(wid, "?")
     await state.update_data(worker_id=wid, worker_name=wname)
     today = date.today()
     penalties = await get_worker_penalties(wid, today.year, today.month)
@@ -371,7 +368,7 @@ async def del_penalty_confirm(callback: types.CallbackQuery, state: FSMContext):
         data = await state.get_data()
         deleted = await delete_penalty(data["penalty_id"])
         if deleted:
-            await callback.message.edit_text(f"✅ Штраф {int(deleted[1])} руб удалён!")
+            await callback.message.edit_text(f"✅ Штраф {int(deleted.amount)} руб удалён!")
         else:
             await callback.message.edit_text("❌ Не найден.")
     else:
@@ -387,27 +384,27 @@ async def show_balances(message: types.Message, state: FSMContext):
     await state.clear()
     today = date.today()
     balances = await get_all_workers_balance(today.year, today.month)
-    text = f"💰 Баланс — {MONTHS_RU[today.month]} {today.year}\n\n"
+    text = TextBuilder(f"💰 Баланс — {MONTHS_RU[today.month]} {today.year}", "")
     grand_earned = grand_advance = grand_penalty = 0
     for tid, name, earned, advances, penalties, work_days in balances:
         balance = earned - advances - penalties
         if earned > 0 or advances > 0 or penalties > 0:
             icon = "✅" if balance >= 0 else "⚠️"
-            text += f"{icon} {name}\n"
-            text += f"   💰 Заработано: {int(earned)} руб\n"
-            text += f"   💳 Авансы: {int(advances)} руб\n"
+            text.add(f"{icon} {name}",
+                     f"   💰 Заработано: {int(earned)} руб",
+                     f"   💳 Авансы: {int(advances)} руб")
             if penalties > 0:
-                text += f"   ⚠️ Штрафы: {int(penalties)} руб\n"
-            text += f"   📊 Остаток: {int(balance)} руб\n\n"
+                text.add(f"   ⚠️ Штрафы: {int(penalties)} руб")
+            text.add(f"   📊 Остаток: {int(balance)} руб", "")
             grand_earned += earned
             grand_advance += advances
             grand_penalty += penalties
-    text += f"━━━━━━━━━━━━━━━━━━━\n"
-    text += f"💰 Всего заработано: {int(grand_earned)} руб\n"
-    text += f"💳 Всего авансов: {int(grand_advance)} руб\n"
+    text.add("━━━━━━━━━━━━━━━━━━━",
+             f"💰 Всего заработано: {int(grand_earned)} руб",
+             f"💳 Всего авансов: {int(grand_advance)} руб")
     if grand_penalty > 0:
-        text += f"⚠️ Всего штрафов: {int(grand_penalty)} руб\n"
-    text += f"📊 Общий остаток: {int(grand_earned - grand_advance - grand_penalty)} руб"
+        text.add(f"⚠️ Всего штрафов: {int(grand_penalty)} руб")
+    text.add(f"📊 Общий остаток: {int(grand_earned - grand_advance - grand_penalty)} руб")
     await send_long_message(message, text)
 
 
@@ -422,9 +419,9 @@ async def earnings_month(message: types.Message, state: FSMContext):
     grand_total = 0
     for tid, name in workers:
         monthly = await get_monthly_total(tid, today.year, today.month)
-        earned = sum(r[3] for r in monthly)
+        earned = sum(r.total for r in monthly)
         cats = await get_worker_categories(tid)
-        ce = "".join([c[2] for c in cats]) if cats else ""
+        ce = "".join([c.emoji for c in cats]) if cats else ""
         if earned > 0:
             details = await get_worker_monthly_details(tid, today.year, today.month)
             text += f"👤 {name} {ce}\n"
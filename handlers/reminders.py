@@ -1,55 +1,48 @@
-from datetime import datetime
+from datetime import datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from aiogram import Router, types, F
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from database import get_reminder_settings, update_reminder_settings
+from database import (
+    get_reminder_settings, update_reminder_settings,
+    get_worker_reminder_prefs, set_worker_reminder_prefs,
+)
+from models import ReminderSettings
+from services import reminders
 from states import AdminReminderSettings
 from keyboards import get_admin_keyboard
 from handlers.filters import AdminFilter
 
 router = Router()
 
-# Ссылка на scheduler — будет установлена из bot.py
-scheduler = None
 
-
-def set_scheduler(sched):
-    global scheduler
-    scheduler = sched
-
-
-# ==================== НАСТРОЙКА НАПОМИНАНИЙ ====================
-
-@router.message(F.text == "⏰ Напоминания", AdminFilter())
-async def reminder_settings_menu(message: types.Message, state: FSMContext):
-    await state.clear()
-    settings = await get_reminder_settings()
-
-    ev_status = "✅" if settings['evening_enabled'] else "❌"
-    lt_status = "✅" if settings['late_enabled'] else "❌"
-    rp_status = "✅" if settings['report_enabled'] else "❌"
+def _settings_menu(settings: ReminderSettings):
+    ev_status = "✅" if settings.evening_enabled else "❌"
+    lt_status = "✅" if settings.late_enabled else "❌"
+    rp_status = "✅" if settings.report_enabled else "❌"
 
     text = (
         "⏰ Настройка напоминаний\n\n"
-        f"{ev_status} Вечернее: {settings['evening_hour']:02d}:{settings['evening_minute']:02d}\n"
-        f"{lt_status} Позднее: {settings['late_hour']:02d}:{settings['late_minute']:02d}\n"
-        f"{rp_status} Отчёт админу: {settings['report_hour']:02d}:{settings['report_minute']:02d}\n"
+        f"{ev_status} Вечернее: {settings.evening_hour:02d}:{settings.evening_minute:02d}\n"
+        f"{lt_status} Позднее: {settings.late_hour:02d}:{settings.late_minute:02d}\n"
+        f"{rp_status} Отчёт админу: {settings.report_hour:02d}:{settings.report_minute:02d}\n"
         f"\nОбновлено: {datetime.now().strftime('%H:%M:%S')}"
     )
 
     buttons = [
         [InlineKeyboardButton(
-            text=f"{'🔴' if settings['evening_enabled'] else '🟢'} Вечернее {'выкл' if settings['evening_enabled'] else 'вкл'}",
+            text=f"{'🔴' if settings.evening_enabled else '🟢'} Вечернее {'выкл' if settings.evening_enabled else 'вкл'}",
             callback_data="rem:toggle_evening"
         )],
         [InlineKeyboardButton(
-            text=f"{'🔴' if settings['late_enabled'] else '🟢'} Позднее {'выкл' if settings['late_enabled'] else 'вкл'}",
+            text=f"{'🔴' if settings.late_enabled else '🟢'} Позднее {'выкл' if settings.late_enabled else 'вкл'}",
             callback_data="rem:toggle_late"
         )],
         [InlineKeyboardButton(
-            text=f"{'🔴' if settings['report_enabled'] else '🟢'} Отчёт {'выкл' if settings['report_enabled'] else 'вкл'}",
+            text=f"{'🔴' if settings.report_enabled else '🟢'} Отчёт {'выкл' if settings.report_enabled else 'вкл'}",
             callback_data="rem:toggle_report"
         )],
         [InlineKeyboardButton(text="🕐 Время вечернего", callback_data="rem:time_evening")],
@@ -58,7 +51,16 @@ async def reminder_settings_menu(message: types.Message, state: FSMContext):
         [InlineKeyboardButton(text="🔄 Применить", callback_data="rem:apply")],
         [InlineKeyboardButton(text="🔙 Назад", callback_data="rem:back")],
     ]
-    await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+    return text, InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+# ==================== НАСТРОЙКА НАПОМИНАНИЙ ====================
+
+@router.message(F.text == "⏰ Напоминания", AdminFilter())
+async def reminder_settings_menu(message: types.Message, state: FSMContext):
+    await state.clear()
+    text, markup = _settings_menu(await get_reminder_settings())
+    await message.answer(text, reply_markup=markup)
     await state.set_state(AdminReminderSettings.main_menu)
 
 
@@ -68,16 +70,16 @@ async def reminder_action(callback: types.CallbackQuery, state: FSMContext):
     settings = await get_reminder_settings()
 
     if action == "toggle_evening":
-        new_val = not settings['evening_enabled']
-        await update_reminder_settings(evening_enabled=int(new_val))
+        new_val = not settings.evening_enabled
+        await update_reminder_settings(evening_enabled=new_val)
         await callback.answer(f"Вечернее: {'ВКЛ' if new_val else 'ВЫКЛ'}")
     elif action == "toggle_late":
-        new_val = not settings['late_enabled']
-        await update_reminder_settings(late_enabled=int(new_val))
+        new_val = not settings.late_enabled
+        await update_reminder_settings(late_enabled=new_val)
         await callback.answer(f"Позднее: {'ВКЛ' if new_val else 'ВЫКЛ'}")
     elif action == "toggle_report":
-        new_val = not settings['report_enabled']
-        await update_reminder_settings(report_enabled=int(new_val))
+        new_val = not settings.report_enabled
+        await update_reminder_settings(report_enabled=new_val)
         await callback.answer(f"Отчёт: {'ВКЛ' if new_val else 'ВЫКЛ'}")
     elif action in ("time_evening", "time_late", "time_report"):
         await state.update_data(time_target=action.replace("time_", ""))
@@ -86,10 +88,8 @@ async def reminder_action(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer()
         return
     elif action == "apply":
-        # Вызываем reschedule из bot.py через глобальную функцию
-        if scheduler:
-            from bot import reschedule_reminders
-            await reschedule_reminders()
+        # Изменения применяются сразу; кнопка сверяет расписание с БД
+        await reminders.sync()
         await callback.answer("✅ Расписание обновлено!", show_alert=True)
     elif action == "back":
         await state.clear()
@@ -97,42 +97,10 @@ async def reminder_action(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer()
         return
 
-    # Обновляем меню
-    settings = await get_reminder_settings()
-    ev_status = "✅" if settings['evening_enabled'] else "❌"
-    lt_status = "✅" if settings['late_enabled'] else "❌"
-    rp_status = "✅" if settings['report_enabled'] else "❌"
-
-    text = (
-        f"⏰ Настройка напоминаний\n\n"
-        f"{ev_status} Вечернее: {settings['evening_hour']:02d}:{settings['evening_minute']:02d}\n"
-        f"{lt_status} Позднее: {settings['late_hour']:02d}:{settings['late_minute']:02d}\n"
-        f"{rp_status} Отчёт админу: {settings['report_hour']:02d}:{settings['report_minute']:02d}\n"
-        f"\nОбновлено: {datetime.now().strftime('%H:%M:%S')}"
-    )
-
-    buttons = [
-        [InlineKeyboardButton(
-            text=f"{'🔴' if settings['evening_enabled'] else '🟢'} Вечернее {'выкл' if settings['evening_enabled'] else 'вкл'}",
-            callback_data="rem:toggle_evening"
-        )],
-        [InlineKeyboardButton(
-            text=f"{'🔴' if settings['late_enabled'] else '🟢'} Позднее {'выкл' if settings['late_enabled'] else 'вкл'}",
-            callback_data="rem:toggle_late"
-        )],
-        [InlineKeyboardButton(
-            text=f"{'🔴' if settings['report_enabled'] else '🟢'} Отчёт {'выкл' if settings['report_enabled'] else 'вкл'}",
-            callback_data="rem:toggle_report"
-        )],
-        [InlineKeyboardButton(text="🕐 Время вечернего", callback_data="rem:time_evening")],
-        [InlineKeyboardButton(text="🕐 Время позднего", callback_data="rem:time_late")],
-        [InlineKeyboardButton(text="🕐 Время отчёта", callback_data="rem:time_report")],
-        [InlineKeyboardButton(text="🔄 Применить", callback_data="rem:apply")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="rem:back")],
-    ]
-
+    # Обновляем меню (кэш настроек сброшен событием об изменении)
+    text, markup = _settings_menu(await get_reminder_settings())
     try:
-        await callback.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+        await callback.message.edit_text(text, reply_markup=markup)
     except Exception:
         pass
 
@@ -161,7 +129,65 @@ async def reminder_time_entered(message: types.Message, state: FSMContext):
 
     await message.answer(
         f"✅ Время установлено: {hour:02d}:{minute:02d}\n\n"
-        f"Нажмите 🔄 Применить чтобы обновить расписание.",
+        f"Расписание уже обновлено.",
         reply_markup=get_admin_keyboard()
     )
-    await state.clear()
\ No newline at end of file
+    await state.clear()
+
+
+# ==================== ЛИЧНОЕ РАСПИСАНИЕ ====================
+
+REMINDERS_HELP = (
+    "⏰ Свои напоминания:\n"
+    "/reminders 19:00 21:30 — вечернее и позднее\n"
+    "/reminders 19:00 21:30 Asia/Yekaterinburg — и часовой пояс\n"
+    "/reminders сброс — как у всех"
+)
+
+
+def _parse_time(text: str):
+    return datetime.strptime(text, "%H:%M").time()
+
+
+@router.message(Command("reminders"))
+async def worker_reminders(message: types.Message, command: CommandObject, worker=None, **kwargs):
+    if worker is None:
+        await message.answer("Сначала нажмите /start")
+        return
+    args = (command.args or "").split()
+
+    if not args:
+        prefs = await get_worker_reminder_prefs(worker.telegram_id)
+        settings = await get_reminder_settings()
+        evening = prefs.evening_time or time(settings.evening_hour, settings.evening_minute)
+        late = prefs.late_time or time(settings.late_hour, settings.late_minute)
+        await message.answer(
+            f"🔔 Вечернее: {evening:%H:%M}\n"
+            f"⚠️ Позднее: {late:%H:%M}\n"
+            f"🌍 Пояс: {prefs.tz or 'как у всех'}\n\n{REMINDERS_HELP}"
+        )
+        return
+
+    if args[0].lower() in ("сброс", "reset"):
+        await set_worker_reminder_prefs(worker.telegram_id, None, None, None)
+        await message.answer("✅ Напоминания — как у всех")
+        return
+
+    try:
+        evening = _parse_time(args[0])
+        late = _parse_time(args[1]) if len(args) > 1 else None
+        tz = args[2] if len(args) > 2 else None
+        if tz:
+            ZoneInfo(tz)
+    except (ValueError, ZoneInfoNotFoundError):
+        await message.answer(f"❌ Не понял.\n\n{REMINDERS_HELP}")
+        return
+
+    await set_worker_reminder_prefs(worker.telegram_id, tz, evening, late)
+    text = f"✅ Вечернее: {evening:%H:%M}"
+    if late:
+        text += f", позднее: {late:%H:%M}"
+    if tz:
+        text += f" ({tz})"
+    await message.answer(text)
+
@@ -7,14 +7,17 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile
 
 from database import (
-    get_all_workers, get_all_workers_daily_summary,
-    get_admin_monthly_detailed_all, get_worker_categories,
-    get_worker_monthly_details, get_worker_full_stats
+    get_all_workers, get_balances, get_rollup, get_worker_categories,
+    get_worker_category_emojis, get_worker_stats,
 )
-from states import ReportWorker, MonthlySummaryWorker
-from utils import format_date, format_date_short, send_long_message, MONTHS_RU
+from services import get_daily_summary, identity
+from states import ReportWorker, MonthlySummaryWorker, PeriodReport
+from utils import parse_user_date, send_long_message, periods, Period, TextBuilder, lazy_import
 from handlers.filters import StaffFilter
-from reports import generate_monthly_report, generate_worker_report
+
+# openpyxl и pyarrow — только когда просят отчёт или выгрузку
+exports = lazy_import('exports')
+reports = lazy_import('reports')
 
 router = Router()
 
@@ -22,12 +25,10 @@ router = Router()
 @router.message(F.text == "📁 Сводка день", StaffFilter())
 async def summary_day(message: types.Message, state: FSMContext):
     await state.clear()
-    summary = await get_all_workers_daily_summary()
+    summary = await get_daily_summary()
     text = f"📁 {date.today().strftime('%d.%m.%Y')}:\n\n"
     total = 0
-    for tid, name, dt in summary:
-        cats = await get_worker_categories(tid)
-        ce = "".join([c[2] for c in cats]) if cats else ""
+    for tid, name, ce, dt in summary:
         icon = '✅' if dt > 0 else '❌'
         text += f"{icon} {ce}{name}: {int(dt)} руб\n"
         total += dt
@@ -39,53 +40,105 @@ async def summary_day(message: types.Message, state: FSMContext):
 @router.message(F.text == "📁 Сводка месяц", StaffFilter())
 async def summary_month_choose_worker(message: types.Message, state: FSMContext):
     await state.clear()
-    workers = await get_all_workers()
-    
-    if not workers:
+    await _choose_worker(message, state, periods.current_month())
+
+
+# ==================== СВОДКА ЗА ПЕРИОД ====================
+
+def _period_buttons():
+    today = date.today()
+    options = [
+        ("Этот месяц", periods.current_month(today)),
+        ("Прошлый месяц", periods.previous_month(today)),
+        ("Этот квартал", periods.current_quarter(today)),
+        ("Прошлый квартал", periods.previous_quarter(today)),
+        ("С начала года", periods.year_to_date(today)),
+        ("Прошлый год", periods.year(today.year - 1)),
+    ]
+    buttons = [[InlineKeyboardButton(text=f"📆 {title}", callback_data=f"per:{p.key}")]
+               for title, p in options]
+    buttons.append([InlineKeyboardButton(text="📝 Свои даты", callback_data="per:custom")])
+    buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="per:cancel")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+@router.message(F.text == "📆 Период", StaffFilter())
+async def summary_period_menu(message: types.Message, state: FSMContext):
+    await state.clear()
+    await message.answer("📆 Период сводки:", reply_markup=_period_buttons())
+    await state.set_state(PeriodReport.choosing_period)
+
+
+@router.callback_query(F.data.startswith("per:"), PeriodReport.choosing_period)
+async def summary_period_chosen(callback: types.CallbackQuery, state: FSMContext):
+    value = callback.data.split(":", 1)[1]
+    await callback.answer()
+    if value == "cancel":
+        await callback.message.edit_text("❌ Отменено.")
+        await state.clear()
+        return
+    if value == "custom":
+        await callback.message.edit_text(
+            "Введите даты через дефис:\n01.01.2025-31.03.2025")
+        await state.set_state(PeriodReport.entering_dates)
+        return
+    period = periods.from_key(value)
+    if period is None:
+        await callback.message.edit_text("❌ Неизвестный период.")
+        await state.clear()
+        return
+    await callback.message.delete()
+    await _choose_worker(callback.message, state, period)
+
+
+@router.message(PeriodReport.entering_dates)
+async def summary_period_dates(message: types.Message, state: FSMContext):
+    parts = (message.text or "").replace(" ", "").split("-")
+    dates = [parse_user_date(p) for p in parts] if len(parts) == 2 else []
+    if len(dates) != 2 or None in dates:
+        await message.answer("❌ Формат: 01.01.2025-31.03.2025")
+        return
+    await _choose_worker(message, state, periods.date_range(*dates))
+
+
+async def _choose_worker(message: types.Message, state: FSMContext, period: Period):
+    """Экран выбора работника для сводки за период (один запрос на всех)"""
+    balances = await get_balances(period.start, period.end)
+    if not balances:
         await message.answer("📭 Нет работников.")
+        await state.clear()
         return
-    
-    today = date.today()
-    buttons = []
-    
-    # Кнопка "Все работники" для Excel отчёта
-    buttons.append([InlineKeyboardButton(
-        text="📊 Все работники (краткая сводка)",
-        callback_data="msw:all"
-    )])
-    
-    # Кнопки для каждого работника
-    for tid, name in workers:
-        stats = await get_worker_full_stats(tid, today.year, today.month)
-        earned = int(stats['earned'])
-        cats = await get_worker_categories(tid)
-        ce = "".join([c[2] for c in cats]) if cats else ""
-        
-        if earned > 0:
-            buttons.append([InlineKeyboardButton(
-                text=f"👤 {ce}{name} — {earned} руб",
-                callback_data=f"msw:{tid}"
-            )])
-        else:
-            buttons.append([InlineKeyboardButton(
-                text=f"👤 {ce}{name} — нет записей",
-                callback_data=f"msw:{tid}"
-            )])
-    
+    emojis = await get_worker_category_emojis()
+
+    buttons = [
+        # Кнопка "Все работники" для краткой сводки
+        [InlineKeyboardButton(text="📊 Все работники (краткая сводка)", callback_data="msw:all")],
+        [InlineKeyboardButton(text="📥 Отчёт Excel за период", callback_data="msw:xlsx")],
+        [InlineKeyboardButton(text=f"🧾 {fmt.upper()}", callback_data=f"msw:{fmt}")
+         for fmt in exports.FORMATS if fmt != 'parquet' or exports.PARQUET_AVAILABLE],
+    ]
+    for b in balances:
+        ce = emojis.get(b.telegram_id, "")
+        earned = int(b.earned)
+        label = f"{earned} руб" if earned > 0 else "нет записей"
+        buttons.append([InlineKeyboardButton(
+            text=f"👤 {ce}{b.name} — {label}", callback_data=f"msw:{b.telegram_id}")])
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="msw:cancel")])
-    
+
     await message.answer(
-        f"📊 Сводка за {MONTHS_RU[today.month]} {today.year}\n\n"
+        f"📊 Сводка за {period.label}\n\n"
         f"Выберите работника:",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
     )
     await state.set_state(MonthlySummaryWorker.choosing_worker)
+    await state.update_data(period=period.key)
 
 
 @router.callback_query(F.data.startswith("msw:"), MonthlySummaryWorker.choosing_worker)
 async def monthly_summary_worker_chosen(callback: types.CallbackQuery, state: FSMContext):
     value = callback.data.split(":")[1]
-    today = date.today()
+    data = await state.get_data()
+    period = periods.from_key(data.get("period", "")) or periods.current_month()
     
     if value == "cancel":
         await callback.message.edit_text("❌ Отменено.")
@@ -93,35 +146,65 @@ async def monthly_summary_worker_chosen(callback: types.CallbackQuery, state: FS
         await callback.answer()
         return
     
+    if value == "xlsx":
+        await callback.message.edit_text("⏳ Формирую...")
+        try:
+            fn = await reports.generate_period_report(period)
+            await callback.message.answer_document(
+                FSInputFile(fn), caption=f"📊 Отчёт за {period.label}")
+            os.remove(fn)
+        except Exception as e:
+            logging.exception(f"Report error: {e}")
+            await callback.message.answer(f"❌ Ошибка: {e}")
+        await state.clear()
+        await callback.answer()
+        return
+    
+    if value in exports.FORMATS:
+        # Выгрузка для бухгалтерии: по файлу на таблицу, большие — частями
+        await callback.message.edit_text("⏳ Выгружаю...")
+        try:
+            paths = await exports.export_period(period, value)
+        except Exception as e:
+            logging.exception(f"Export error: {e}")
+            await callback.message.answer(f"❌ Ошибка: {e}")
+            paths = []
+        try:
+            for path in paths:
+                await callback.message.answer_document(
+                    FSInputFile(path), caption=f"🧾 {os.path.basename(path)}")
+        finally:
+            for path in paths:
+                os.remove(path)
+        await state.clear()
+        await callback.answer()
+        return
+    
     if value == "all":
         # Краткая сводка по всем работникам
         await callback.message.edit_text("⏳ Формирую сводку...")
         
-        workers = await get_all_workers()
-        text = f"📊 {MONTHS_RU[today.month].upper()} {today.year} — КРАТКАЯ СВОДКА\n\n"
+        balances = await get_balances(period.start, period.end)
+        emojis = await get_worker_category_emojis()
+        text = TextBuilder(f"📊 {period.label.upper()} — КРАТКАЯ СВОДКА", "")
         grand_total = 0
         
-        for tid, name in workers:
-            stats = await get_worker_full_stats(tid, today.year, today.month)
-            earned = stats['earned']
-            cats = await get_worker_categories(tid)
-            ce = "".join([c[2] for c in cats]) if cats else ""
-            
-            if earned > 0:
-                text += f"✅ {ce}{name}\n"
-                text += f"   💰 Заработано: {int(earned)} руб\n"
-                text += f"   📅 Дней: {stats['work_days']}\n"
-                if stats['advances'] > 0:
-                    text += f"   💳 Авансы: {int(stats['advances'])} руб\n"
-                if stats['penalties'] > 0:
-                    text += f"   ⚠️ Штрафы: {int(stats['penalties'])} руб\n"
-                text += f"   📊 Остаток: {int(stats['balance'])} руб\n\n"
-                grand_total += earned
+        for b in balances:
+            ce = emojis.get(b.telegram_id, "")
+            if b.earned > 0:
+                text.add(f"✅ {ce}{b.name}",
+                         f"   💰 Заработано: {int(b.earned)} руб",
+                         f"   📅 Дней: {b.work_days}")
+                if b.advances > 0:
+                    text.add(f"   💳 Авансы: {int(b.advances)} руб")
+                if b.penalties > 0:
+                    text.add(f"   ⚠️ Штрафы: {int(b.penalties)} руб")
+                text.add(f"   📊 Остаток: {int(b.earned - b.advances - b.penalties)} руб", "")
+                grand_total += b.earned
             else:
-                text += f"❌ {ce}{name} — нет записей\n\n"
+                text.add(f"❌ {ce}{b.name} — нет записей", "")
         
-        text += f"━━━━━━━━━━━━━━━━━━━\n"
-        text += f"💰 ОБЩИЙ ФОНД: {int(grand_total)} руб"
+        text.add("━━━━━━━━━━━━━━━━━━━", f"💰 ОБЩИЙ ФОНД: {int(grand_total)} руб")
         
         await send_long_message(callback.message, text)
         await state.clear()
@@ -130,58 +213,58 @@ async def monthly_summary_worker_chosen(callback: types.CallbackQuery, state: FS
     
     # Детальная сводка по конкретному работнику
     worker_id = int(value)
-    workers = await get_all_workers()
-    worker_name = next((n for t, n in workers if t == worker_id), "Работник")
+    worker_name = identity.worker_name(worker_id, "Работник")
     
     await callback.message.edit_text(f"⏳ Формирую сводку для {worker_name}...")
     
     # Получаем детальную статистику
-    details = await get_worker_monthly_details(worker_id, today.year, today.month)
-    stats = await get_worker_full_stats(worker_id, today.year, today.month)
+    details = await get_rollup(period.start, period.end, by=('category', 'work', 'price'),
+                               worker_id=worker_id)
+    stats = await get_worker_stats(worker_id, period.start, period.end)
     cats = await get_worker_categories(worker_id)
-    ce = "".join([c[2] for c in cats]) if cats else ""
+    ce = "".join([c.emoji for c in cats]) if cats else ""
     
     if not details:
-        text = f"📭 {ce}{worker_name} — нет записей за {MONTHS_RU[today.month]} {today.year}"
+        text = f"📭 {ce}{worker_name} — нет записей за {period.label}"
         await callback.message.edit_text(text)
         await state.clear()
         await callback.answer()
         return
     
-    text = f"📊 {ce}{worker_name}\n"
-    text += f"📅 {MONTHS_RU[today.month]} {today.year}\n\n"
+    text = TextBuilder(f"📊 {ce}{worker_name}", f"📅 {period.label}", "")
     
     current_cat = ""
     cat_total = 0
     
-    for pl_name, c_emoji, c_name, qty, price, total, price_type in details:
-        if c_name != current_cat:
+    for d in details:
+        if d.category_name != current_cat:
             if current_cat != "":
-                text += f"   📊 Итого: {int(cat_total)} руб\n\n"
-            current_cat = c_name
+                text.add(f"   📊 Итого: {int(cat_total)} руб", "")
+            current_cat = d.category_name
             cat_total = 0
-            text += f"{c_emoji} {c_name}:\n"
+            text.add(f"{d.category_emoji} {d.category_name}:")
         
-        unit_label = "м²" if price_type == "square" else "шт"
-        qty_display = f"{qty:.2f}" if price_type == "square" else str(int(qty))
-        text += f"   ▪️ {pl_name}: {qty_display} {unit_label} x {int(price)} руб = {int(total)} руб\n"
-        cat_total += total
+        unit_label = "м²" if d.price_type == "square" else "шт"
+        qty_display = f"{d.quantity:.2f}" if d.price_type == "square" else str(int(d.quantity))
+        text.add(f"   ▪️ {d.work_name}: {qty_display} {unit_label} x {int(d.price_per_unit)} руб"
+                 f" = {int(d.total)} руб")
+        cat_total += d.total
     
     if current_cat != "":
-        text += f"   📊 Итого: {int(cat_total)} руб\n"
+        text.add(f"   📊 Итого: {int(cat_total)} руб")
     
-    text += f"\n━━━━━━━━━━━━━━━━━━━\n"
-    text += f"📅 Рабочих дней: {stats['work_days']}\n"
-    text += f"💰 Заработано: {int(stats['earned'])} руб\n"
+    text.add("", "━━━━━━━━━━━━━━━━━━━",
+             f"📅 Рабочих дней: {stats['work_days']}",
+             f"💰 Заработано: {int(stats['earned'])} руб")
     if stats['advances'] > 0:
-        text += f"💳 Авансы: {int(stats['advances'])} руб\n"
+        text.add(f"💳 Авансы: {int(stats['advances'])} руб")
     if stats['penalties'] > 0:
-        text += f"⚠️ Штрафы: {int(stats['penalties'])} руб\n"
-    text += f"📊 К выплате: {int(stats['balance'])} руб"
+        text.add(f"⚠️ Штрафы: {int(stats['penalties'])} руб")
+    text.add(f"📊 К выплате: {int(stats['balance'])} руб")
     
     if stats['work_days'] > 0:
         avg = stats['earned'] / stats['work_days']
-        text += f"\n📈 Среднее в день: {int(avg)} руб"
+        text.add(f"📈 Среднее в день: {int(avg)} руб")
     
     await send_long_message(callback.message, text)
     await state.clear()
@@ -194,7 +277,7 @@ async def report_month(message: types.Message, state: FSMContext):
     await message.answer("⏳ Формирую...")
     try:
         today = date.today()
-        fn = await generate_monthly_report(today.year, today.month)
+        fn = await reports.generate_monthly_report(today.year, today.month)
         await message.answer_document(FSInputFile(fn), caption="📊 Отчёт за месяц")
         os.remove(fn)
     except Exception as e:
@@ -217,12 +300,11 @@ async def report_worker_start(message: types.Message, state: FSMContext):
 @router.callback_query(F.data.startswith("rw:"), ReportWorker.choosing_worker)
 async def report_worker_gen(callback: types.CallbackQuery, state: FSMContext):
     wid = int(callback.data.split(":")[1])
-    workers = await get_all_workers()
-    name = next((n for t, n in workers if t == wid), "Работник")
+    name = identity.worker_name(wid, "Работник")
     await callback.message.edit_text("⏳ Формирую...")
     try:
         today = date.today()
-        fn = await generate_worker_report(wid, name, today.year, today.month)
+        fn = await reports.generate_worker_report(wid, name, today.year, today.month)
         await callback.message.answer_document(FSInputFile(fn), caption=f"📊 {name}")
         os.remove(fn)
     except Exception as e:
@@ -1,9 +1,14 @@
 from datetime import date, timedelta
+from typing import Dict, Tuple
 import logging
+import time
 
 from aiogram import Router, types, F, Bot
 from aiogram.fsm.context import FSMContext
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.types import (
+    InlineKeyboardButton, InlineKeyboardMarkup,
+    InlineQueryResultArticle, InputTextMessageContent,
+)
 
 from config import ADMIN_ID, MANAGER_IDS, BOT_TOKEN
 from database import (
@@ -18,6 +23,8 @@ from database import (
 from states import WorkEntry, ViewEntries, WorkerDeleteEntry, WorkerEditEntry
 from keyboards import make_date_picker, make_work_buttons
 from utils import format_date, format_date_short, parse_user_date, send_long_message, MONTHS_RU
+from utils import screens, Screen
+from services import work_search, write_behind
 from keyboards import get_main_keyboard
 
 router = Router()
@@ -97,21 +104,21 @@ async def custom_date_entered(message: types.Message, state: FSMContext):
     worker_cats = await get_worker_categories(message.from_user.id)
 
     if len(worker_cats) == 1:
-        cat_code = worker_cats[0][0]
-        cat_items = [i for i in items if i[3] == cat_code]
+        cat_code = worker_cats[0].code
+        cat_items = [i for i in items if i.category_code == cat_code]
         buttons = make_work_buttons(cat_items)
         buttons.append([InlineKeyboardButton(text="🔙 К датам", callback_data="wdate_back")])
         buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")])
         await message.answer(
             f"📅 Дата: {format_date(chosen_date)}\n"
-            f"📁 {worker_cats[0][2]} {worker_cats[0][1]}\n\nВыберите работу:",
+            f"📁 {worker_cats[0].emoji} {worker_cats[0].name}\n\nВыберите работу:",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
         )
         await state.set_state(WorkEntry.choosing_work)
     else:
         buttons = []
         for cat_code, cat_name, cat_emoji in worker_cats:
-            count = len([i for i in items if i[3] == cat_code])
+            count = len([i for i in items if i.category_code == cat_code])
             buttons.append([InlineKeyboardButton(
                 text=f"{cat_emoji} {cat_name} ({count})",
                 callback_data=f"wcat:{cat_code}"
@@ -130,21 +137,21 @@ async def show_category_or_work(callback, state, chosen_date):
     worker_cats = await get_worker_categories(callback.from_user.id)
 
     if len(worker_cats) == 1:
-        cat_code = worker_cats[0][0]
-        cat_items = [i for i in items if i[3] == cat_code]
+        cat_code = worker_cats[0].code
+        cat_items = [i for i in items if i.category_code == cat_code]
         buttons = make_work_buttons(cat_items)
         buttons.append([InlineKeyboardButton(text="🔙 К датам", callback_data="wdate_back")])
         buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")])
         await callback.message.edit_text(
             f"📅 Дата: {format_date(chosen_date)}\n"
-            f"📁 {worker_cats[0][2]} {worker_cats[0][1]}\n\nВыберите работу:",
+            f"📁 {worker_cats[0].emoji} {worker_cats[0].name}\n\nВыберите работу:",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
         )
         await state.set_state(WorkEntry.choosing_work)
     else:
         buttons = []
         for cat_code, cat_name, cat_emoji in worker_cats:
-            count = len([i for i in items if i[3] == cat_code])
+            count = len([i for i in items if i.category_code == cat_code])
             buttons.append([InlineKeyboardButton(
                 text=f"{cat_emoji} {cat_name} ({count})",
                 callback_data=f"wcat:{cat_code}"
@@ -172,19 +179,20 @@ async def work_back_to_dates(callback: types.CallbackQuery, state: FSMContext):
 async def work_category_chosen(callback: types.CallbackQuery, state: FSMContext):
     cat_code = callback.data.split(":")[1]
     items = await get_price_list_for_worker(callback.from_user.id)
-    cat_items = [i for i in items if i[3] == cat_code]
+    cat_items = [i for i in items if i.category_code == cat_code]
     if not cat_items:
         await callback.answer("Нет работ в категории", show_alert=True)
         return
     cats = await get_worker_categories(callback.from_user.id)
-    cat_info = next(((n, e) for c, n, e in cats if c == cat_code), ("", "📦"))
+    cat_info = next((c for c in cats if c.code == cat_code), None)
+    cat_name, cat_emoji = (cat_info.name, cat_info.emoji) if cat_info else ("", "📦")
     data = await state.get_data()
     buttons = make_work_buttons(cat_items)
     buttons.append([InlineKeyboardButton(text="🔙 К категориям", callback_data="wcat_back")])
     buttons.append([InlineKeyboardButton(text="❌ Отмена", callback_data="cancel")])
     await callback.message.edit_text(
         f"📅 Дата: {format_date(data['work_date'])}\n"
-        f"{cat_info[1]} {cat_info[0]}\n\nВыберите работу:",
+        f"{cat_emoji} {cat_name}\n\nВыберите работу:",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
     )
     await state.set_state(WorkEntry.choosing_work)
@@ -198,7 +206,7 @@ async def work_back_to_categories(callback: types.CallbackQuery, state: FSMConte
     data = await state.get_data()
     buttons = []
     for cat_code, cat_name, cat_emoji in worker_cats:
-        count = len([i for i in items if i[3] == cat_code])
+        count = len([i for i in items if i.category_code == cat_code])
         buttons.append([InlineKeyboardButton(
             text=f"{cat_emoji} {cat_name} ({count})",
             callback_data=f"wcat:{cat_code}"
@@ -217,16 +225,16 @@ async def work_back_to_categories(callback: types.CallbackQuery, state: FSMConte
 async def work_chosen(callback: types.CallbackQuery, state: FSMContext):
     code = callback.data.split(":")[1]
     items = await get_price_list_for_worker(callback.from_user.id)
-    info = next(((c, n, p, cat, pt) for c, n, p, cat, pt in items if c == code), None)
+    info = next((i for i in items if i.code == code), None)
     if not info:
         await callback.answer("Не найдено", show_alert=True)
         return
 
-    price_type = info[4]
+    price_type = info.price_type
     await state.update_data(work_info={
-        "code": info[0],
-        "name": info[1],
-        "price": info[2],
+        "code": info.code,
+        "name": info.name,
+        "price": info.price,
         "price_type": price_type
     })
 
@@ -234,10 +242,10 @@ async def work_chosen(callback: types.CallbackQuery, state: FSMContext):
 
     if price_type == 'square':
         prompt = f"📅 Дата: {format_date(data['work_date'])}\n" \
-                 f"{info[1]} ({int(info[2])} руб/м²)\n\nВведите площадь (м²):"
+                 f"{info.name} ({int(info.price)} руб/м²)\n\nВведите площадь (м²):"
     else:
         prompt = f"📅 Дата: {format_date(data['work_date'])}\n" \
-                 f"{info[1]} ({int(info[2])} руб/шт)\n\nВведите количество:"
+                 f"{info.name} ({int(info.price)} руб/шт)\n\nВведите количество:"
 
     await callback.message.edit_text(prompt)
     await state.set_state(WorkEntry.entering_quantity)
@@ -321,26 +329,39 @@ async def save_work_entry(message, state, qty, user=None):
     data = await state.get_data()
     info = data["work_info"]
     work_date = to_date_str(data.get("work_date", date.today().isoformat()))
-    price_type = info.get("price_type", "unit")
 
-    total = await add_work(user.id, info["code"], qty, info["price"], work_date)
-    daily = await get_daily_total(user.id, work_date)
-    day_total = sum(r[3] for r in daily)
+    summary = await record_work(user, info, qty, work_date)
 
     buttons = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📝 Записать ещё", callback_data="write_more")],
         [InlineKeyboardButton(text="🏠 В меню", callback_data="back_to_menu")],
     ])
+    await message.answer(f"✅ Записано!\n\n{summary}", reply_markup=buttons)
+    await state.clear()
+
+
+async def record_work(user, info: dict, qty, work_date: str) -> str:
+    """Записывает работу (add_work) и уведомляет админа.
+    Возвращает строки «дата / работа / итог дня» для ответа работнику"""
+    price_type = info.get("price_type", "unit")
+
+    if write_behind.enabled():
+        # Подтверждаем сразу, в work_log запись попадёт со следующей пачкой
+        total = await write_behind.submit(user.id, info["code"], qty, info["price"], work_date)
+        day_line = "⏳ Сохраняется, итог дня обновится через пару секунд"
+        month_line = ""
+    else:
+        saved = await add_work(user.id, info["code"], qty, info["price"], work_date)
+        total = saved.total
+        day_line = f"💰 За этот день: {int(saved.day_total)} руб"
+        month_line = f"\n📊 Баланс за месяц: {int(saved.month_balance)} руб"
 
     unit_label = "м²" if price_type == 'square' else "шт"
     qty_display = f"{qty:.2f}" if price_type == 'square' else str(int(qty))
-
-    await message.answer(
-        f"✅ Записано!\n\n"
+    summary = (
         f"📅 Дата: {format_date(work_date)}\n"
         f"📦 {info['name']} x {qty_display} {unit_label} = {int(total)} руб\n"
-        f"💰 За этот день: {int(day_total)} руб",
-        reply_markup=buttons
+        f"{day_line}{month_line}"
     )
 
     if user.id != ADMIN_ID:
@@ -349,14 +370,14 @@ async def save_work_entry(message, state, qty, user=None):
             f"👤 {user.full_name}\n"
             f"📅 {format_date(work_date)}\n"
             f"📦 {info['name']} x {qty_display} {unit_label} = {int(total)} руб\n"
-            f"💰 За этот день: {int(day_total)} руб"
+            f"{day_line}"
         )
         try:
             await bot.send_message(ADMIN_ID, notify_text)
         except Exception as e:
             logging.error(f"Notify admin: {e}")
 
-    await state.clear()
+    return summary
 
 
 @router.callback_query(F.data == "write_more")
@@ -386,13 +407,108 @@ async def back_to_menu(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+# ==================== БЫСТРАЯ ЗАПИСЬ (INLINE) ====================
+# «@бот шлиф 3» в любом чате: поиск по индексу в памяти, без запросов к БД.
+# Выбранный результат присылает карточку с кнопкой «Записать» — запись
+# идёт через тот же record_work, что и обычный ввод. Нужен включённый
+# inline-режим бота (BotFather → /setinline).
+# Карточку видят все в чате: в кнопке — telegram_id автора, нажать её может
+# только он, и только один раз (_claimed по inline_message_id).
+
+# inline_message_id уже записанных карточек -> время нажатия
+_claimed: Dict[str, float] = {}
+# Сколько помнить нажатые карточки, сек (карточка после записи без кнопки)
+CLAIM_TTL = 24 * 3600
+
+def _quick_card(item, qty) -> Tuple[str, str]:
+    """Текст карточки и подпись результата"""
+    unit_label = "м²" if item.price_type == "square" else "шт"
+    if qty is None:
+        return (f"📦 {item.name} — {int(item.price)} руб/{unit_label}\n"
+                f"Укажите количество в запросе: «{item.name.split()[0].lower()} 3»",
+                f"{int(item.price)} руб/{unit_label}")
+    qty_display = f"{qty:.2f}" if item.price_type == "square" else str(int(qty))
+    total = qty * item.price
+    warn = "⚠️ Большая сумма!\n" if total > 10000 else ""
+    return (f"{warn}📅 Сегодня, {date.today():%d.%m.%Y}\n"
+            f"📦 {item.name} x {qty_display} {unit_label} = {int(total)} руб",
+            f"{qty_display} {unit_label} = {int(total)} руб")
+
+
+@router.inline_query()
+async def quick_entry_search(inline_query: types.InlineQuery, worker=None, **kwargs):
+    if worker is None:
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+    await work_search.ensure_loaded()
+    text, qty = work_search.parse_query(inline_query.query)
+    results = []
+    for item in work_search.search(worker.telegram_id, text):
+        if qty is not None and item.price_type != "square" and qty != int(qty):
+            continue
+        card, description = _quick_card(item, qty)
+        markup = None
+        if qty is not None:
+            markup = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(
+                text="✅ Записать", callback_data=f"qe:{item.code}:{qty:g}:{worker.telegram_id}")]])
+        results.append(InlineQueryResultArticle(
+            id=f"{item.code}:{qty}",
+            title=f"{item.category_emoji} {item.name}",
+            description=description,
+            input_message_content=InputTextMessageContent(message_text=card),
+            reply_markup=markup,
+        ))
+    await inline_query.answer(results, cache_time=5, is_personal=True)
+
+
+def _claim(inline_message_id: str) -> bool:
+    """Отмечает карточку записанной; False — её уже нажимали"""
+    now = time.monotonic()
+    if len(_claimed) > 1000:
+        for key, claimed_at in list(_claimed.items()):
+            if now - claimed_at > CLAIM_TTL:
+                del _claimed[key]
+    if inline_message_id in _claimed:
+        return False
+    _claimed[inline_message_id] = now
+    return True
+
+
+@router.callback_query(F.data.startswith("qe:"))
+async def quick_entry_confirm(callback: types.CallbackQuery, worker=None, **kwargs):
+    _, code, qty_text, author_id = callback.data.split(":")
+    if worker is None or worker.telegram_id != int(author_id):
+        await callback.answer("⛔ Записать может только автор карточки.", show_alert=True)
+        return
+    await work_search.ensure_loaded()
+    item = work_search.get_item(worker.telegram_id, code)
+    if item is None:
+        await callback.answer("❌ Работа недоступна.", show_alert=True)
+        return
+    if not _claim(callback.inline_message_id):
+        await callback.answer("✅ Уже записано")
+        return
+    qty = float(qty_text)
+    if item.price_type != "square":
+        qty = int(qty)
+    info = {"code": item.code, "name": item.name, "price": item.price,
+            "price_type": item.price_type}
+    try:
+        summary = await record_work(callback.from_user, info, qty, date.today().isoformat())
+    except Exception:
+        # Не записалось — карточку можно нажать ещё раз
+        _claimed.pop(callback.inline_message_id, None)
+        raise
+    # Карточка — сообщение inline-режима: правится по inline_message_id, кнопка убирается
+    await bot.edit_message_text(f"✅ Записано!\n\n{summary}",
+                                inline_message_id=callback.inline_message_id)
+    await callback.answer("✅ Записано!")
+
+
 # ==================== МОИ ЗАПИСИ ====================
 
-@router.message(F.text == "📁 Мои записи")
-async def my_entries_start(message: types.Message, state: FSMContext):
-    """Выбор месяца для просмотра записей"""
-    await state.clear()
-    
+def _months_screen() -> Screen:
+    """Выбор месяца: текущий и прошлый"""
     today = date.today()
     current_year = today.year
     current_month = today.month
@@ -415,15 +531,16 @@ async def my_entries_start(message: types.Message, state: FSMContext):
         )],
         [InlineKeyboardButton(text="❌ Отмена", callback_data="entries_cancel")]
     ]
-    
-    await message.answer(
-        "📁 <b>Мои записи</b>\n\nВыберите месяц:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
-        parse_mode="HTML"
-    )
-    await state.set_state(ViewEntries.choosing_month)
+    return Screen("📁 <b>Мои записи</b>\n\nВыберите месяц:",
+                  InlineKeyboardMarkup(inline_keyboard=buttons), "HTML")
 
 
+@router.message(F.text == "📁 Мои записи")
+async def my_entries_start(message: types.Message, state: FSMContext):
+    """Выбор месяца для просмотра записей"""
+    await state.clear()
+    await screens.send(message, _months_screen())
+    await state.set_state(ViewEntries.choosing_month)
 
 
 @router.callback_query(F.data.startswith("view_entry:"), ViewEntries.viewing)
@@ -438,15 +555,15 @@ async def view_entry_details(callback: types.CallbackQuery, state: FSMContext):
     
     await state.update_data(entry_id=entry_id)
     
-    price_type = entry[8] if len(entry) > 8 else "unit"
+    price_type = entry.price_type
     unit = "м²" if price_type == "square" else "шт"
-    qty_display = f"{entry[2]:.2f}" if price_type == "square" else str(int(entry[2]))
+    qty_display = f"{entry.quantity:.2f}" if price_type == "square" else str(int(entry.quantity))
     
-    text = f"📦 <b>{entry[1]}</b>\n\n"
-    text += f"📅 Дата: {format_date(entry[5])}\n"
+    text = f"📦 <b>{entry.work_name}</b>\n\n"
+    text += f"📅 Дата: {format_date(entry.work_date)}\n"
     text += f"🔢 Количество: {qty_display} {unit}\n"
-    text += f"💵 Расценка: {int(entry[3])} ₽/{unit}\n"
-    text += f"💰 Сумма: {int(entry[4])} ₽"
+    text += f"💵 Расценка: {int(entry.price_per_unit)} ₽/{unit}\n"
+    text += f"💰 Сумма: {int(entry.total)} ₽"
     
     buttons = [
         [InlineKeyboardButton(text="✏️ Изменить кол-во", callback_data="entry_edit")],
@@ -482,7 +599,7 @@ async def entry_delete_confirm(callback: types.CallbackQuery, state: FSMContext)
     ]
     
     await callback.message.edit_text(
-        f"⚠️ Удалить запись?\n\n📦 {entry[1]} × {int(entry[2])} = {int(entry[4])} ₽",
+        f"⚠️ Удалить запись?\n\n📦 {entry.work_name} × {int(entry.quantity)} = {int(entry.total)} ₽",
         reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
     )
     await state.set_state(WorkerDeleteEntry.confirming)
@@ -497,7 +614,7 @@ async def entry_delete_execute(callback: types.CallbackQuery, state: FSMContext)
     
     if deleted:
         await callback.message.edit_text(
-            f"✅ Удалено: {deleted[1]} × {int(deleted[2])} = {int(deleted[3])} ₽"
+            f"✅ Удалено: {deleted.work_name} × {int(deleted.quantity)} = {int(deleted.total)} ₽"
         )
     else:
         await callback.message.edit_text("❌ Запись не найдена")
@@ -533,20 +650,20 @@ async def entry_edit_quantity(message: types.Message, state: FSMContext):
         await state.clear()
         return
     
-    old_qty = entry[2]
-    old_total = entry[4]
-    new_total = new_qty * entry[3]
-    
-    await update_entry_quantity(data["entry_id"], new_qty)
+    changed = await update_entry_quantity(data["entry_id"], new_qty)
+    if not changed:
+        await message.answer("❌ Запись не найдена")
+        await state.clear()
+        return
     
-    price_type = entry[8] if len(entry) > 8 else "unit"
+    price_type = entry.price_type
     unit = "м²" if price_type == "square" else "шт"
     
     await message.answer(
         f"✅ Изменено!\n\n"
-        f"📦 {entry[1]}\n"
-        f"Было: {int(old_qty)} {unit} = {int(old_total)} ₽\n"
-        f"Стало: {int(new_qty)} {unit} = {int(new_total)} ₽"
+        f"📦 {entry.work_name}\n"
+        f"Было: {int(changed.old_quantity)} {unit} = {int(changed.old_total)} ₽\n"
+        f"Стало: {int(new_qty)} {unit} = {int(changed.new_total)} ₽"
     )
     await state.clear()
 
@@ -555,12 +672,13 @@ async def _render_month_entries(callback: types.CallbackQuery, state: FSMContext
                                  year: int, month: int):
     """Общая функция отображения записей за месяц"""
     worker_id = callback.from_user.id
-    entries = await get_worker_entries_by_month(worker_id, year, month)
+    entries = await screens.memo(
+        callback.message.chat.id, ('entries', worker_id, year, month),
+        lambda: get_worker_entries_by_month(worker_id, year, month), topics=('work_log',))
 
     if not entries:
-        await callback.message.edit_text(
-            f"📭 У вас нет записей за {MONTHS_RU[month]} {year}"
-        )
+        await screens.show(callback.message, Screen(
+            f"📭 У вас нет записей за {MONTHS_RU[month]} {year}"))
         await state.clear()
         await callback.answer()
         return
@@ -593,11 +711,8 @@ async def _render_month_entries(callback: types.CallbackQuery, state: FSMContext
     if len(text) > 4000:
         text = text[:4000] + "..."
 
-    await callback.message.edit_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons[:20]),
-        parse_mode="HTML"
-    )
+    await screens.show(callback.message, Screen(
+        text, InlineKeyboardMarkup(inline_keyboard=buttons[:20]), "HTML"))
     await state.set_state(ViewEntries.viewing)
     await callback.answer()
 
@@ -623,34 +738,7 @@ async def entry_back_to_list(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "entries_back")
 async def entries_back_to_months(callback: types.CallbackQuery, state: FSMContext):
     """Возврат к выбору месяца"""
-    today = date.today()
-    current_year = today.year
-    current_month = today.month
-    
-    if current_month == 1:
-        prev_month = 12
-        prev_year = current_year - 1
-    else:
-        prev_month = current_month - 1
-        prev_year = current_year
-    
-    buttons = [
-        [InlineKeyboardButton(
-            text=f"📅 {MONTHS_RU[current_month]} {current_year}",
-            callback_data=f"entries_month:{current_year}:{current_month}"
-        )],
-        [InlineKeyboardButton(
-            text=f"📅 {MONTHS_RU[prev_month]} {prev_year}",
-            callback_data=f"entries_month:{prev_year}:{prev_month}"
-        )],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="entries_cancel")]
-    ]
-    
-    await callback.message.edit_text(
-        "📁 <b>Мои записи</b>\n\nВыберите месяц:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
-        parse_mode="HTML"
-    )
+    await screens.show(callback.message, _months_screen())
     await state.set_state(ViewEntries.choosing_month)
     await callback.answer()
 
@@ -718,7 +806,7 @@ async def show_daily(message: types.Message, state: FSMContext):
         return
 
     all_items = await get_price_list()
-    names = {i[0]: i[1] for i in all_items}
+    names = {i.code: i.name for i in all_items}
     text = f"📊 {today.strftime('%d.%m.%Y')}:\n\n"
     total = 0
     for code, qty, price, sub in rows:
@@ -783,155 +871,3 @@ async def show_monthly(message: types.Message, state: FSMContext):
         text += f"\n📈 Среднее в день: {int(avg)} руб"
 
     await send_long_message(message, text)
-
-
-# ==================== БЭКАП ====================
-
-@router.message(F.text == "💾 Бэкап БД")
-async def manual_backup(message: types.Message, state: FSMContext):
-    if message.from_user.id != ADMIN_ID:
-        return
-    await state.clear()
-    from bot import send_backup
-    await send_backup(message.from_user.id)
-
-
-# ==================== ИМПОРТ ИЗ JSON ====================
-
-@router.message(F.document.file_name.endswith('.json'))
-async def import_from_json(message: types.Message):
-    """Админ отправляет .json файл — бот переносит данные в PostgreSQL"""
-    if message.from_user.id != ADMIN_ID:
-        return
-
-    await message.answer("⏳ Начинаю импорт из JSON...\n🧹 Очищаю старые данные...")
-
-    import tempfile
-    import os
-    import json
-    from datetime import datetime, date as date_type
-
-    def parse_datetime(value):
-        if value is None:
-            return None
-        if isinstance(value, (datetime, date_type)):
-            return value
-        try:
-            return datetime.fromisoformat(value)
-        except:
-            return None
-
-    def parse_date_local(value):
-        if value is None:
-            return None
-        if isinstance(value, date_type):
-            return value
-        try:
-            return datetime.fromisoformat(value).date() if 'T' in value else datetime.strptime(value, '%Y-%m-%d').date()
-        except:
-            return None
-
-    try:
-        file = await bot.get_file(message.document.file_id)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.json', mode='w', encoding='utf-8') as tmp:
-            tmp_path = tmp.name
-
-        await bot.download_file(file.file_path, tmp_path)
-
-        with open(tmp_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        from database import pool
-
-        stats = {
-            'workers': 0, 'categories': 0, 'prices': 0,
-            'worker_cats': 0, 'work_logs': 0, 'advances': 0, 'penalties': 0
-        }
-
-        async with pool.acquire() as pg:
-            await pg.execute("DELETE FROM work_log")
-            await pg.execute("DELETE FROM advances")
-            await pg.execute("DELETE FROM penalties")
-            await pg.execute("DELETE FROM worker_categories")
-            await pg.execute("DELETE FROM price_list")
-            await pg.execute("DELETE FROM workers")
-            await pg.execute("DELETE FROM categories")
-            await pg.execute("DELETE FROM reminder_settings")
-
-            await pg.execute("ALTER SEQUENCE IF EXISTS work_log_id_seq RESTART WITH 1")
-            await pg.execute("ALTER SEQUENCE IF EXISTS advances_id_seq RESTART WITH 1")
-            await pg.execute("ALTER SEQUENCE IF EXISTS penalties_id_seq RESTART WITH 1")
-
-            for row in data.get('categories', []):
-                await pg.execute(
-                    "INSERT INTO categories (code, name, emoji) VALUES ($1, $2, $3)",
-                    row['code'], row['name'], row['emoji'])
-            stats['categories'] = len(data.get('categories', []))
-
-            for row in data.get('workers', []):
-                await pg.execute(
-                    "INSERT INTO workers (telegram_id, name, registered_at) VALUES ($1, $2, $3)",
-                    row['telegram_id'], row['name'], parse_datetime(row['registered_at']))
-            stats['workers'] = len(data.get('workers', []))
-
-            for row in data.get('price_list', []):
-                price_type = row.get('price_type', 'unit')
-                await pg.execute(
-                    "INSERT INTO price_list (code, name, price, price_type, category_code, is_active) VALUES ($1, $2, $3, $4, $5, $6)",
-                    row['code'], row['name'], row['price'], price_type, row['category_code'], row.get('is_active', True))
-            stats['prices'] = len(data.get('price_list', []))
-
-            for row in data.get('worker_categories', []):
-                await pg.execute(
-                    "INSERT INTO worker_categories (worker_id, category_code) VALUES ($1, $2)",
-                    row['worker_id'], row['category_code'])
-            stats['worker_cats'] = len(data.get('worker_categories', []))
-
-            for row in data.get('work_log', []):
-                await pg.execute(
-                    "INSERT INTO work_log (worker_id, work_code, quantity, price_per_unit, total, work_date, created_at) VALUES ($1, $2, $3, $4, $5, $6, $7)",
-                    row['worker_id'], row['work_code'], row['quantity'], row['price_per_unit'], row['total'],
-                    parse_date_local(row['work_date']), parse_datetime(row['created_at']))
-            stats['work_logs'] = len(data.get('work_log', []))
-
-            for row in data.get('advances', []):
-                await pg.execute(
-                    "INSERT INTO advances (worker_id, amount, comment, advance_date, created_at) VALUES ($1, $2, $3, $4, $5)",
-                    row['worker_id'], row['amount'], row.get('comment', ''),
-                    parse_date_local(row['advance_date']), parse_datetime(row['created_at']))
-            stats['advances'] = len(data.get('advances', []))
-
-            for row in data.get('penalties', []):
-                await pg.execute(
-                    "INSERT INTO penalties (worker_id, amount, reason, penalty_date, created_at) VALUES ($1, $2, $3, $4, $5)",
-                    row['worker_id'], row['amount'], row.get('reason', ''),
-                    parse_date_local(row['penalty_date']), parse_datetime(row['created_at']))
-            stats['penalties'] = len(data.get('penalties', []))
-
-            for row in data.get('reminder_settings', []):
-                await pg.execute("""
-                    INSERT INTO reminder_settings
-                    (id, evening_hour, evening_minute, late_hour, late_minute,
-                     report_hour, report_minute, evening_enabled, late_enabled, report_enabled)
-                    VALUES (1, $1, $2, $3, $4, $5, $6, $7, $8, $9)
-                """, row['evening_hour'], row['evening_minute'], row['late_hour'], row['late_minute'],
-                    row['report_hour'], row['report_minute'], row['evening_enabled'], row['late_enabled'], row['report_enabled'])
-
-        os.unlink(tmp_path)
-
-        await message.answer(
-            f"✅ Импорт из JSON завершён!\n\n"
-            f"📊 Перенесено:\n"
-            f"👥 Работников: {stats['workers']}\n"
-            f"📂 Категорий: {stats['categories']}\n"
-            f"💰 Позиций прайса: {stats['prices']}\n"
-            f"🔗 Связей: {stats['worker_cats']}\n"
-            f"📝 Записей работ: {stats['work_logs']}\n"
-            f"💳 Авансов: {stats['advances']}\n"
-            f"⚠️ Штрафов: {stats['penalties']}"
-        )
-
-    except Exception as e:
-        logging.error(f"JSON Import error: {e}")
-        await message.answer(f"❌ Ошибка импорта: {e}")
\ No newline at end of file
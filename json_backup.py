@@ -0,0 +1,114 @@
+"""JSON-бэкап (services.backup.send_backup): восстановление.
+
+Бэкап — {таблица: [строка, ...]}, строки — SELECT * с датами и временем
+в ISO. load() кладёт их в таблицы схемы как есть, вместе с id: колонки
+берутся из самой схемы, значения приводятся по типу колонки, колонок,
+которых в старом бэкапе нет, COPY не касается — остаются значения по
+умолчанию. В public перед загрузкой текущие строки удаляются, после —
+сдвигаются последовательности.
+
+Восстановление — одна транзакция, поэтому одно соединение и таблицы по
+очереди. Проверка бэкапа (backup_check.verify_json) грузит его в отдельную
+схему без внешних ключей через load_parallel(): те же _copy() и
+приведение типов, но таблицы параллельно, каждая на своём соединении пула.
+"""
+import asyncio
+import json
+from datetime import datetime, time
+from typing import Dict, List
+
+import database
+import events
+from snapshots import PARALLEL, reset_sequences, table_columns
+
+# Порядок загрузки: таблица ссылается только на предыдущие
+TABLES = ['categories', 'workers', 'price_list', 'worker_categories',
+          'work_log', 'advances', 'penalties', 'reminder_settings',
+          *database.ARCHIVE_TABLES]
+
+
+def read(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _converter(type_: str):
+    """Значение из JSON-бэкапа -> тип колонки для COPY"""
+    if type_ == 'date':
+        # В старых бэкапах даты бывали с временем: 2025-03-01T00:00:00
+        return lambda value: datetime.fromisoformat(value).date()
+    if type_.startswith('timestamp'):
+        return datetime.fromisoformat
+    if type_.startswith('time'):
+        return time.fromisoformat
+    if type_ in ('real', 'double precision'):
+        return float
+    if type_ in ('integer', 'bigint', 'smallint'):
+        return int
+    return None
+
+
+def _records(rows: List[dict], columns: List[List[str]]) -> List[tuple]:
+    converters = [(name, _converter(type_)) for name, type_ in columns]
+    return [tuple(None if row.get(name) is None else conv(row[name]) if conv else row[name]
+                  for name, conv in converters)
+            for row in rows]
+
+
+async def _copy(conn, table: str, rows: List[dict], columns: List[List[str]], schema: str):
+    present = [c for c in columns if c[0] in rows[0]]
+    await conn.copy_records_to_table(
+        table, records=_records(rows, present), columns=[c for c, _ in present],
+        schema_name=schema)
+
+
+async def load(conn, data: dict, schema: str = 'public') -> Dict[str, int]:
+    """Загружает бэкап data в таблицы schema. Транзакцией управляет
+    вызывающий. Возвращает {таблица: строк}"""
+    columns = await table_columns(conn, TABLES, schema)
+    tables = [t for t in TABLES if t in columns]
+    if schema == 'public':
+        for table in reversed(tables):
+            await conn.execute(f"DELETE FROM {table}")
+    counts = {}
+    for table in tables:
+        rows = data.get(table) or []
+        counts[table] = len(rows)
+        if rows:
+            await _copy(conn, table, rows, columns[table], schema)
+    if schema == 'public':
+        await reset_sequences(conn, tables)
+    return counts
+
+
+async def load_parallel(data: dict, schema: str) -> Dict[str, int]:
+    """Как load(), но в схему без внешних ключей (не public): все таблицы
+    сразу, не больше PARALLEL соединений пула. Возвращает {таблица: строк}"""
+    async with database.pool.acquire() as conn:
+        columns = await table_columns(conn, TABLES, schema)
+    tables = [t for t in TABLES if t in columns]
+    limit = asyncio.Semaphore(PARALLEL)
+
+    async def copy(table):
+        rows = data.get(table) or []
+        if rows:
+            async with limit, database.pool.acquire() as conn:
+                await _copy(conn, table, rows, columns[table], schema)
+        return len(rows)
+
+    return dict(zip(tables, await asyncio.gather(*(copy(t) for t in tables))))
+
+
+async def restore(data: dict) -> Dict[str, int]:
+    """Заменяет рабочие данные бэкапом одной транзакцией и обновляет кэши
+    всех процессов (RESYNC)"""
+    async with database.pool.acquire() as conn:
+        async with conn.transaction():
+            # Удаляемые строки попадут в журнал изменений от имени админа
+            await database.set_actor(conn)
+            counts = await load(conn, data)
+            # NOTIFY уходит с коммитом
+            await conn.execute("SELECT pg_notify($1, $2)",
+                               events.CHANNEL, events.encode(events.RESYNC, {}))
+    events.publish(events.RESYNC)
+    return counts
@@ -1,5 +1,5 @@
 ﻿from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-from config import ADMIN_ID, MANAGER_IDS
+from services import identity
 
 
 def get_main_keyboard(user_id=None):
@@ -11,9 +11,9 @@ def get_main_keyboard(user_id=None):
         [KeyboardButton(text="💳 Мой баланс"),
          KeyboardButton(text="💬 Написать вопрос")]
     ]
-    if user_id and user_id == ADMIN_ID:
+    if identity.is_admin(user_id):
         buttons.append([KeyboardButton(text="🖥 Админ-панель")])
-    elif user_id and user_id in MANAGER_IDS:
+    elif identity.is_manager(user_id):
         buttons.append([KeyboardButton(text="💼 Кабинет Эльмурзы")])
     return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
 
@@ -21,7 +21,8 @@ def get_main_keyboard(user_id=None):
 def get_admin_keyboard():
     buttons = [
         [KeyboardButton(text="📁 Сводка день"),
-         KeyboardButton(text="📁 Сводка месяц")],
+         KeyboardButton(text="📁 Сводка месяц"),
+         KeyboardButton(text="📆 Период")],
         [KeyboardButton(text="📥 Отчёт месяц"),
          KeyboardButton(text="📥 Отчёт работник")],
         [KeyboardButton(text="➕ Добавить"),
@@ -40,7 +41,8 @@ def get_admin_keyboard():
 def get_manager_keyboard():
     buttons = [
         [KeyboardButton(text="📁 Сводка день"),
-         KeyboardButton(text="📁 Сводка месяц")],
+         KeyboardButton(text="📁 Сводка месяц"),
+         KeyboardButton(text="📆 Период")],
         [KeyboardButton(text="📥 Отчёт месяц"),
          KeyboardButton(text="📥 Отчёт работник")],
         [KeyboardButton(text="📂 Справочники")],
@@ -68,6 +70,7 @@ def get_edit_keyboard():
          KeyboardButton(text="✏️ Переименовать")],
         [KeyboardButton(text="🔗 Назначить кат."),
          KeyboardButton(text="🔓 Убрать кат.")],
+        [KeyboardButton(text="👔 Менеджеры")],
         [KeyboardButton(text="🔙 В админ-панель")]
     ], resize_keyboard=True)
 
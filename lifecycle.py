@@ -0,0 +1,128 @@
+"""Запуск и остановка бота.
+
+startup(): БД, слушатель событий, повтор журнала write-behind и прогрев —
+справочники и кэши в памяти, горячие запросы в кэше запросов всех
+соединений пула. Апдейты (LifecycleMiddleware) ждут set_ready(), которую
+bot.py вызывает после запуска планировщика.
+
+shutdown() — после остановки polling (aiogram ловит SIGTERM/SIGINT):
+планировщик на паузе, новые запуски задач не начинаются; ждём обработчики
+в работе, задачи планировщика и фоновые задачи напоминаний, но не дольше
+SHUTDOWN_TIMEOUT. Затем сбрасываем очередь write-behind и закрываем
+слушателя событий и пул.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED,
+)
+
+import database
+import events
+from config import SHUTDOWN_TIMEOUT
+from services import identity, reminders, work_search, write_behind
+
+_ready = asyncio.Event()
+# Апдейты и задачи планировщика (id), которые сейчас выполняются.
+# У задачи не больше одного запуска одновременно (max_instances=1)
+_updates = 0
+_jobs = set()
+_idle = asyncio.Event()
+_idle.set()
+
+
+# ==================== ЗАПУСК ====================
+
+async def startup():
+    await database.init_db()
+    # Изменения из других процессов бота — сразу в локальные кэши
+    events.start_listener(database.pool)
+    # Отложенная запись работ (WRITE_BEHIND): повтор журнала после сбоя
+    await write_behind.start()
+    await warmup()
+
+
+async def warmup():
+    """Загружает кэши справочников и прогревает кэш запросов на соединениях пула"""
+    started = time.monotonic()
+    await identity.ensure_loaded()
+    await work_search.ensure_loaded()
+    await database.get_categories()
+    await database.get_reminder_settings()
+    await database.prepare_pool()
+    logging.info(f"🔥 Прогрев: {time.monotonic() - started:.2f} с")
+
+
+def set_ready():
+    _ready.set()
+
+
+async def wait_ready():
+    if not _ready.is_set():
+        await _ready.wait()
+
+
+# ==================== УЧЁТ РАБОТЫ ====================
+
+def _changed():
+    if _updates or _jobs:
+        _idle.clear()
+    else:
+        _idle.set()
+
+
+@contextmanager
+def in_flight():
+    """Обработка одного апдейта"""
+    global _updates
+    _updates += 1
+    _changed()
+    try:
+        yield
+    finally:
+        _updates -= 1
+        _changed()
+
+
+def _on_job_event(event):
+    if event.code == EVENT_JOB_SUBMITTED:
+        _jobs.add(event.job_id)
+    else:
+        _jobs.discard(event.job_id)
+    _changed()
+
+
+def track_jobs(scheduler):
+    """Учитывает запущенные задачи планировщика"""
+    scheduler.add_listener(
+        _on_job_event,
+        EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+
+
+# ==================== ОСТАНОВКА ====================
+
+async def _drain():
+    await _idle.wait()
+    await reminders.wait_idle()
+    # Пока ждали напоминания, мог начаться ещё апдейт или задача
+    await _idle.wait()
+
+
+async def shutdown(scheduler):
+    """Дожидается текущей работы (до SHUTDOWN_TIMEOUT) и освобождает ресурсы"""
+    if scheduler.running:
+        scheduler.pause()
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(_drain(), SHUTDOWN_TIMEOUT)
+        logging.info(f"⏹ Текущая работа завершена за {time.monotonic() - started:.1f} с")
+    except asyncio.TimeoutError:
+        logging.warning(f"⏹ Не дождались за {SHUTDOWN_TIMEOUT:g} с: апдейтов {_updates}, задач {len(_jobs)}")
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    await write_behind.stop()
+    await events.stop_listener()
+    await database.close_db()
@@ -1,3 +1,6 @@
 from .role import RoleMiddleware
+from .lifecycle import LifecycleMiddleware
+from .serialize import ChatSerializeMiddleware
+from .throttle import ThrottleMiddleware
 
-__all__ = ['RoleMiddleware']
\ No newline at end of file
+__all__ = ['RoleMiddleware', 'LifecycleMiddleware', 'ChatSerializeMiddleware', 'ThrottleMiddleware']
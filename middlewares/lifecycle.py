@@ -0,0 +1,14 @@
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+import lifecycle
+
+
+class LifecycleMiddleware(BaseMiddleware):
+    """Апдейты ждут готовности бота; обработчики в работе учитываются,
+    чтобы остановка дождалась их"""
+
+    async def __call__(self, handler, event: TelegramObject, data: dict):
+        await lifecycle.wait_ready()
+        with lifecycle.in_flight():
+            return await handler(event, data)
@@ -1,18 +1,21 @@
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from config import ADMIN_ID, MANAGER_IDS
+from database import current_actor
+from services import identity
 
 
 class RoleMiddleware(BaseMiddleware):
+    """Роли и работник из кэша identity — без запросов к БД на каждый апдейт"""
+
     async def __call__(self, handler, event: TelegramObject, data: dict):
+        await identity.ensure_loaded()
         user = data.get("event_from_user")
-        if user:
-            uid = user.id
-            data["is_admin"] = uid == ADMIN_ID
-            data["is_manager"] = uid in MANAGER_IDS
-            data["is_staff"] = uid == ADMIN_ID or uid in MANAGER_IDS
-        else:
-            data["is_admin"] = False
-            data["is_manager"] = False
-            data["is_staff"] = False
-        return await handler(event, data)
\ No newline at end of file
+        uid = user.id if user else None
+        role = identity.get_role(uid)
+        data["is_admin"] = role == 'admin'
+        data["is_manager"] = role == 'manager'
+        data["is_staff"] = role is not None
+        data["worker"] = identity.get_worker(uid)
+        # Для журнала изменений: кто выполняет правки в этом апдейте
+        current_actor.set(uid)
+        return await handler(event, data)
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Update
+
+from config import CHAT_QUEUE_LIMIT
+
+
+class _Queue:
+    __slots__ = ('lock', 'size')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.size = 0
+
+
+class ChatSerializeMiddleware(BaseMiddleware):
+    """Апдейты одного чата обрабатываются по очереди: двойное нажатие
+    кнопки видит состояние FSM уже после первого. Разные чаты — параллельно.
+    В очереди чата не больше CHAT_QUEUE_LIMIT апдейтов, лишние
+    отбрасываются (на нажатие кнопки — короткий ответ).
+    Подключается к dp.update как outer-middleware"""
+
+    def __init__(self, limit: int = CHAT_QUEUE_LIMIT):
+        self.limit = limit
+        self._queues = {}
+
+    async def __call__(self, handler, event: Update, data: dict):
+        chat, user = data.get("event_chat"), data.get("event_from_user")
+        key = chat.id if chat else user.id if user else None
+        if key is None:
+            return await handler(event, data)
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _Queue()
+        if queue.size >= self.limit:
+            logging.warning(f"Очередь чата {key} заполнена, апдейт {event.update_id} пропущен")
+            if event.callback_query:
+                try:
+                    await event.callback_query.answer("⏳ Предыдущее действие ещё выполняется")
+                except TelegramBadRequest:
+                    pass
+            return None
+        queue.size += 1
+        try:
+            async with queue.lock:
+                return await handler(event, data)
+        finally:
+            queue.size -= 1
+            if not queue.size:
+                del self._queues[key]
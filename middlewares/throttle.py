@@ -0,0 +1,139 @@
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Update
+
+# Классы действий: (ёмкость, пополнение в секунду). 'user' — общий бюджет
+# пользователя на любые апдейты, остальные — отдельные корзины для тяжёлых
+# действий, чтобы один пользователь не занял пул или построение отчётов
+BUCKETS = {
+    'user': (20, 2.0),
+    'summary': (6, 0.2),      # сводки по месяцу и всей истории: потом раз в 5 с
+    'report': (6, 0.1),       # файлы (Excel, CSV, Parquet): по 3 — два подряд, потом раз в 30 с
+    'backup': (1, 1 / 120),   # бэкап и снимок БД: раз в 2 минуты
+}
+
+# Тяжёлые действия: текст кнопки / команда -> (класс, стоимость не больше ёмкости).
+# Стоимость списывается и из корзины класса, и из общей корзины пользователя
+MESSAGE_COSTS = {
+    "📥 Отчёт месяц": ('report', 3),
+    "💾 Бэкап БД": ('backup', 1),
+    "/snapshot": ('backup', 1),
+    "📊 За месяц": ('summary', 1),
+    "📊 Заработок за месяц": ('summary', 1),
+    "📁 Мои записи": ('summary', 1),
+    "📁 Сводка месяц": ('summary', 2),
+    "💼 Итоги месяца": ('summary', 2),
+    "💰 Баланс работников": ('summary', 2),
+    "🏆 Рейтинг работников": ('summary', 2),
+}
+# Префикс callback_data -> (класс, стоимость)
+CALLBACK_COSTS = {
+    "msw:xlsx": ('report', 3),
+    "msw:csv": ('report', 3),
+    "msw:parquet": ('report', 3),
+    "rw:": ('report', 2),
+    "snap:yes": ('backup', 1),
+    "per:": ('summary', 1),
+    "entries_month:": ('summary', 1),
+    "totals_month:": ('summary', 1),
+    "ae_audit": ('summary', 2),
+    "ae_act:history": ('summary', 1),
+    "ae_hist:": ('summary', 1),
+}
+
+# Раз в столько секунд удаляются корзины, успевшие наполниться
+CLEANUP_INTERVAL = 300
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'warned')
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        self.warned = False
+
+    def refill(self, capacity: float, rate: float, now: float):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+def _action(event: Update):
+    """(класс, стоимость) апдейта; обычные действия — (None, 1)"""
+    if event.message and event.message.text:
+        text = event.message.text
+        if text.startswith("/"):
+            text = text.split()[0].split("@")[0]
+        return MESSAGE_COSTS.get(text, (None, 1))
+    if event.callback_query and event.callback_query.data:
+        data = event.callback_query.data
+        for prefix, cost in CALLBACK_COSTS.items():
+            if data.startswith(prefix):
+                return cost
+    return None, 1
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """Ограничение частоты по корзинам токенов: общая на пользователя и
+    по классу тяжёлых действий (BUCKETS). Не хватило токенов — апдейт не
+    обрабатывается, пользователь получает «подождите N с» (на сообщения —
+    один раз, пока ограничение не снимется). Состояние в памяти процесса.
+    Подключается к dp.update как outer-middleware"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._cleaned = time.monotonic()
+
+    def _bucket(self, key: tuple, now: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(BUCKETS[key[1]][0], now)
+        else:
+            bucket.refill(*BUCKETS[key[1]], now)
+        return bucket
+
+    def _cleanup(self, now: float):
+        self._cleaned = now
+        for key, bucket in list(self._buckets.items()):
+            capacity, rate = BUCKETS[key[1]]
+            if bucket.tokens + (now - bucket.updated) * rate >= capacity:
+                del self._buckets[key]
+
+    async def __call__(self, handler, event: Update, data: dict):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        now = time.monotonic()
+        if now - self._cleaned >= CLEANUP_INTERVAL:
+            self._cleanup(now)
+
+        kind, cost = _action(event)
+        keys = [(user.id, 'user')] + ([(user.id, kind)] if kind else [])
+        buckets = [self._bucket(key, now) for key in keys]
+        # Сколько ждать, пока в каждой корзине наберётся cost
+        wait = max((cost - b.tokens) / BUCKETS[key[1]][1] for key, b in zip(keys, buckets))
+        if wait <= 0:
+            for bucket in buckets:
+                bucket.tokens -= cost
+                bucket.warned = False
+            return await handler(event, data)
+
+        await self._reject(event, user.id, buckets, wait)
+        return None
+
+    async def _reject(self, event: Update, user_id: int, buckets, wait: float):
+        seconds = max(1, round(wait))
+        logging.info(f"Throttle: {event.event_type} от {user_id}, ждать {seconds} с")
+        text = f"⏳ Слишком часто. Подождите {seconds} с и повторите"
+        try:
+            if event.callback_query:
+                await event.callback_query.answer(text)
+            elif event.message and not any(b.warned for b in buckets):
+                await event.message.answer(text)
+        except TelegramBadRequest:
+            pass
+        for bucket in buckets:
+            bucket.warned = True
@@ -0,0 +1,326 @@
+"""Типизированные строки, которые возвращает database.py.
+
+Все модели — NamedTuple: они остаются обычными кортежами (распаковка и
+индексы по-прежнему работают), но поля доступны по имени, а лишних копий
+и словарей на каждую строку не создаётся.
+"""
+from datetime import date, datetime, time
+from typing import NamedTuple, Optional
+
+
+# ==================== СПРАВОЧНИКИ ====================
+
+class Category(NamedTuple):
+    code: str
+    name: str
+    emoji: str
+
+
+class WorkerRef(NamedTuple):
+    telegram_id: int
+    name: str
+
+
+class Worker(NamedTuple):
+    telegram_id: int
+    name: str
+    registered_at: Optional[datetime]
+
+
+class StaffRole(NamedTuple):
+    telegram_id: int
+    role: str  # 'admin' | 'manager'
+
+
+class Identity(NamedTuple):
+    """Имя и роль пользователя; None — нет в workers / staff_roles"""
+    telegram_id: int
+    name: Optional[str]
+    role: Optional[str]
+
+
+class PriceItem(NamedTuple):
+    """Позиция прайса вместе с категорией"""
+    code: str
+    name: str
+    price: float
+    price_type: str
+    category_code: str
+    category_name: str
+    category_emoji: str
+
+
+class WorkerPriceItem(NamedTuple):
+    """Позиция прайса, доступная работнику"""
+    code: str
+    name: str
+    price: float
+    category_code: str
+    price_type: str
+
+
+# ==================== ЗАПИСИ О РАБОТЕ ====================
+
+class WorkTotal(NamedTuple):
+    """Итог по одной работе за день/месяц"""
+    work_code: str
+    quantity: float
+    price_per_unit: float
+    total: float
+
+
+class WorkSaved(NamedTuple):
+    """Результат add_work: сумма записи и итоги уже с её учётом"""
+    total: float
+    day_total: float
+    month_earned: float
+    month_balance: float  # заработок за месяц минус авансы и штрафы
+
+
+class WorkerAmount(NamedTuple):
+    """Сумма по работнику (заработок или авансы)"""
+    telegram_id: int
+    name: str
+    total: float
+
+
+class DayLine(NamedTuple):
+    work_date: str
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+
+
+class Entry(NamedTuple):
+    """Одна запись work_log с названием работы и работника"""
+    id: int
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    work_date: str
+    worker_id: int
+    worker_name: str
+    price_type: str
+
+
+class DeletedEntry(NamedTuple):
+    id: int
+    work_name: str
+    quantity: float
+    total: float
+    work_date: str
+    worker_name: str
+    worker_id: int
+
+
+class EntryUpdate(NamedTuple):
+    """Результат изменения количества в записи: было/стало"""
+    id: int
+    worker_id: int
+    work_date: date
+    old_quantity: float
+    old_total: float
+    new_quantity: float
+    new_total: float
+
+
+class TodayEntry(NamedTuple):
+    id: int
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    created_at: str
+    price_type: str
+
+
+class DateEntry(NamedTuple):
+    id: int
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    work_date: str
+    created_at: str
+    price_type: str
+
+
+class WorkerEntry(NamedTuple):
+    id: int
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    work_date: str
+    created_at: str
+    worker_name: str
+    price_type: str
+
+
+class CategoryEntry(NamedTuple):
+    id: int
+    work_name: str
+    category_name: str
+    category_emoji: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    created_at: str
+    price_type: str
+
+
+class MonthlyDetail(NamedTuple):
+    work_name: str
+    category_emoji: str
+    category_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    price_type: str
+
+
+class WorkerMonthlyDetail(NamedTuple):
+    """Строка сводки по всем работникам (поля работы пустые, если записей нет)"""
+    telegram_id: int
+    worker_name: str
+    work_name: Optional[str]
+    category_emoji: Optional[str]
+    category_name: Optional[str]
+    quantity: Optional[float]
+    price_per_unit: Optional[float]
+    total: Optional[float]
+    work_days: int
+    price_type: Optional[str]
+
+
+class AdminEntry(NamedTuple):
+    telegram_id: int
+    worker_name: str
+    category_name: str
+    category_emoji: str
+    work_date: str
+    work_name: str
+    quantity: float
+    price_per_unit: float
+    total: float
+    price_type: str
+
+
+class DailySummaryRow(NamedTuple):
+    """Итог дня по работнику с эмодзи его категорий"""
+    telegram_id: int
+    name: str
+    emojis: str
+    total: float
+
+
+class RollupRow(NamedTuple):
+    """Срез дневных итогов (work_daily). Поля измерений, по которым не
+    группировали, — None"""
+    work_date: Optional[date]
+    month: Optional[date]
+    worker_id: Optional[int]
+    worker_name: Optional[str]
+    category_code: Optional[str]
+    category_name: Optional[str]
+    category_emoji: Optional[str]
+    work_code: Optional[str]
+    work_name: Optional[str]
+    price_type: Optional[str]
+    price_per_unit: Optional[float]
+    quantity: float
+    total: float
+    entries: int
+    days: int
+
+
+class WorkerBalance(NamedTuple):
+    telegram_id: int
+    name: str
+    earned: float
+    advances: float
+    penalties: float
+    work_days: int
+
+
+# ==================== АВАНСЫ И ШТРАФЫ ====================
+
+class Advance(NamedTuple):
+    id: int
+    amount: float
+    comment: str
+    advance_date: str
+    created_at: str
+
+
+class DeletedAdvance(NamedTuple):
+    id: int
+    amount: float
+    comment: str
+    advance_date: str
+    worker_id: int
+
+
+class Penalty(NamedTuple):
+    id: int
+    amount: float
+    reason: str
+    penalty_date: str
+    created_at: str
+
+
+class DeletedPenalty(NamedTuple):
+    id: int
+    amount: float
+    reason: str
+    penalty_date: str
+    worker_id: int
+
+
+# ==================== НАПОМИНАНИЯ ====================
+
+class ReminderSettings(NamedTuple):
+    evening_hour: int
+    evening_minute: int
+    late_hour: int
+    late_minute: int
+    report_hour: int
+    report_minute: int
+    evening_enabled: bool
+    late_enabled: bool
+    report_enabled: bool
+
+
+class ReminderJob(NamedTuple):
+    """Задача напоминания: расписание из настроек и время последнего запуска"""
+    job_id: str
+    hour: int
+    minute: int
+    enabled: bool
+    tz: Optional[str]  # None — часовой пояс планировщика
+    last_run_at: Optional[datetime]
+
+
+class WorkerReminderPrefs(NamedTuple):
+    """Личное расписание напоминаний; None — как в общих настройках"""
+    telegram_id: int
+    tz: Optional[str]
+    evening_time: Optional[time]
+    late_time: Optional[time]
+
+
+# ==================== ЖУРНАЛ ИЗМЕНЕНИЙ ====================
+
+class AuditRecord(NamedTuple):
+    """Правка или удаление строки work_log / advances / penalties"""
+    id: int
+    changed_at: datetime
+    actor: Optional[int]
+    table_name: str
+    op: str  # 'update' | 'delete'
+    row_id: int
+    worker_id: Optional[int]
+    before: Optional[dict]
+    after: Optional[dict]
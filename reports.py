@@ -4,6 +4,9 @@ from datetime import date, datetime
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 
+from database import get_rollup, month_bounds
+from utils import periods, Period
+
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 
 MONTHS_RU = [
@@ -47,132 +50,136 @@ async def generate_monthly_report(year=None, month=None):
         year = date.today().year
     if month is None:
         month = date.today().month
+    return await generate_period_report(periods.month(year, month))
+
 
+async def generate_period_report(period: Period):
+    """Excel-отчёт за произвольный период.
+
+    Сводка, месяцы и категории строятся по work_daily, поэтому год стоит
+    почти как месяц. Построчная детализация и разбивка по дням — только
+    для периода в пределах одного месяца.
+    """
     s = _styles()
     wb = Workbook()
 
     conn = await asyncpg.connect(DATABASE_URL)
     try:
-        # ===== ЛИСТ 1: СВОДКА =====
-        ws = wb.active
-        ws.title = "Сводка"
-
-        ws.merge_cells('A1:F1')
-        ws['A1'] = f"Отчёт за {MONTHS_RU[month]} {year}"
-        ws['A1'].font = s["header"]
-        ws['A1'].alignment = Alignment(horizontal='center')
-
-        ws.merge_cells('A2:F2')
-        ws['A2'] = f"Сформирован: {datetime.now().strftime('%d.%m.%Y %H:%M')}"
-        ws['A2'].alignment = Alignment(horizontal='center')
-
-        row = 4
-        for col, h in enumerate(["№", "Работник", "Категории", "Записей", "Дней", "Итого (₽)"], 1):
-            _cell(ws, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
-
-        workers = await conn.fetch("SELECT telegram_id, name FROM workers ORDER BY name")
-        row = 5
-        grand = 0
-
-        for idx, worker in enumerate(workers, 1):
-            tid, name = worker['telegram_id'], worker['name']
-            
-            cats = await conn.fetch("""
-                SELECT c.emoji, c.name FROM worker_categories wc
-                JOIN categories c ON wc.category_code = c.code WHERE wc.worker_id = $1
-            """, tid)
-            cats_str = ", ".join([f"{c['emoji']}{c['name']}" for c in cats]) if cats else "—"
-
-            stat = await conn.fetchrow("""
-                SELECT COUNT(*), COUNT(DISTINCT work_date), COALESCE(SUM(total), 0)
-                FROM work_log WHERE worker_id = $1
-                AND EXTRACT(YEAR FROM work_date) = $2 AND EXTRACT(MONTH FROM work_date) = $3
-            """, tid, year, month)
-            cnt, days, total = stat[0], stat[1], stat[2]
-
-            _cell(ws, row, 1, idx, s, center=True)
-            _cell(ws, row, 2, name, s)
-            _cell(ws, row, 3, cats_str, s)
-            _cell(ws, row, 4, cnt, s, center=True)
-            _cell(ws, row, 5, days, s, center=True)
-            _cell(ws, row, 6, round(total, 2), s, fmt='#,##0.00 ₽')
-            grand += total
-            row += 1
+        workers = await _sheet_summary(wb, conn, period, s)
+        if period.months == 1:
+            await _sheet_details(wb, conn, workers, period, s)
+            await _sheet_by_days(wb, period, s)
+        else:
+            await _sheet_by_months(wb, period, s)
+        await _sheet_by_categories(wb, period, s)
+    finally:
+        await conn.close()
 
-        _cell(ws, row, 1, "", s, fill=s["total_fill"])
-        _cell(ws, row, 2, "ИТОГО", s, font=s["total_font"], fill=s["total_fill"])
-        for col in range(3, 6):
-            _cell(ws, row, col, "", s, fill=s["total_fill"])
-        _cell(ws, row, 6, round(grand, 2), s, font=s["total_font"],
-              fill=s["total_fill"], fmt='#,##0.00 ₽')
-
-        for col, w in zip('ABCDEF', [5, 25, 30, 12, 12, 18]):
-            ws.column_dimensions[col].width = w
-
-        # ===== ЛИСТ 2: ДЕТАЛИЗАЦИЯ =====
-        ws2 = wb.create_sheet("Детализация")
-        ws2.merge_cells('A1:G1')
-        ws2['A1'] = f"Детализация за {MONTHS_RU[month]} {year}"
-        ws2['A1'].font = s["header"]
-        ws2['A1'].alignment = Alignment(horizontal='center')
-
-        row = 3
-        for worker in workers:
-            tid, name = worker['telegram_id'], worker['name']
-            
-            ws2.merge_cells(f'A{row}:G{row}')
-            cell = ws2.cell(row=row, column=1, value=f"👤 {name}")
-            cell.font = Font(bold=True, size=12)
-            cell.fill = s["worker_fill"]
-            row += 1
+    filename = f"report_{period.slug}.xlsx"
+    wb.save(filename)
+    return filename
 
-            for col, h in enumerate(["Дата", "Работа", "Категория", "Кол-во",
-                                       "Расценка", "Сумма", "Время"], 1):
-                _cell(ws2, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
-            row += 1
 
-            records = await conn.fetch("""
-                SELECT wl.work_date::TEXT, pl.name, c.name, wl.quantity,
-                       wl.price_per_unit, wl.total, wl.created_at::TEXT
-                FROM work_log wl
-                JOIN price_list pl ON wl.work_code = pl.code
-                JOIN categories c ON pl.category_code = c.code
-                WHERE wl.worker_id = $1
-                  AND EXTRACT(YEAR FROM wl.work_date) = $2
-                  AND EXTRACT(MONTH FROM wl.work_date) = $3
-                ORDER BY wl.work_date, wl.created_at
-            """, tid, year, month)
-
-            wtotal = 0
-            cur_date = ""
-            day_total = 0
+async def _sheet_summary(wb, conn, period: Period, s):
+    ws = wb.active
+    ws.title = "Сводка"
 
-            for rec in records:
-                if rec[0] != cur_date and cur_date != "":
-                    for c2 in range(1, 6):
-                        _cell(ws2, row, c2, "", s, fill=s["day_fill"])
-                    _cell(ws2, row, 5, f"День {cur_date}:", s,
-                          font=Font(bold=True, italic=True, size=9), fill=s["day_fill"])
-                    _cell(ws2, row, 6, round(day_total, 2), s,
-                          font=Font(bold=True, italic=True, size=9),
-                          fill=s["day_fill"], fmt='#,##0.00')
-                    _cell(ws2, row, 7, "", s, fill=s["day_fill"])
-                    row += 1
-                    day_total = 0
-                cur_date = rec[0]
-
-                _cell(ws2, row, 1, rec[0], s)
-                _cell(ws2, row, 2, rec[1], s)
-                _cell(ws2, row, 3, rec[2], s)
-                _cell(ws2, row, 4, rec[3], s, center=True)
-                _cell(ws2, row, 5, round(rec[4], 2), s, fmt='#,##0.00')
-                _cell(ws2, row, 6, round(rec[5], 2), s, fmt='#,##0.00')
-                _cell(ws2, row, 7, rec[6], s)
-                wtotal += rec[5]
-                day_total += rec[5]
-                row += 1
+    ws.merge_cells('A1:F1')
+    ws['A1'] = f"Отчёт за {period.label}"
+    ws['A1'].font = s["header"]
+    ws['A1'].alignment = Alignment(horizontal='center')
+
+    ws.merge_cells('A2:F2')
+    ws['A2'] = f"Сформирован: {datetime.now().strftime('%d.%m.%Y %H:%M')}"
+    ws['A2'].alignment = Alignment(horizontal='center')
+
+    row = 4
+    for col, h in enumerate(["№", "Работник", "Категории", "Записей", "Дней", "Итого (₽)"], 1):
+        _cell(ws, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
+
+    worker_cats = {}
+    for rec in await conn.fetch("""
+        SELECT wc.worker_id, c.emoji, c.name FROM worker_categories wc
+        JOIN categories c ON wc.category_code = c.code
+    """):
+        worker_cats.setdefault(rec['worker_id'], []).append(f"{rec['emoji']}{rec['name']}")
+    # Записи, дни и суммы — из дневных итогов, одним запросом на всех
+    stats = {r.worker_id: r for r in await get_rollup(period.start, period.end, by=('worker',))}
+    # Удалённые работники — только если у них есть записи за период
+    workers = [w for w in await conn.fetch(
+        "SELECT telegram_id, name, is_active FROM workers ORDER BY name")
+        if w['is_active'] or w['telegram_id'] in stats]
+    row = 5
+    grand = 0
+
+    for idx, worker in enumerate(workers, 1):
+        tid, name = worker['telegram_id'], worker['name']
+        cats_str = ", ".join(worker_cats.get(tid, [])) or "—"
+        stat = stats.get(tid)
+        cnt, days, total = (stat.entries, stat.days, stat.total) if stat else (0, 0, 0)
+
+        _cell(ws, row, 1, idx, s, center=True)
+        _cell(ws, row, 2, name, s)
+        _cell(ws, row, 3, cats_str, s)
+        _cell(ws, row, 4, cnt, s, center=True)
+        _cell(ws, row, 5, days, s, center=True)
+        _cell(ws, row, 6, round(total, 2), s, fmt='#,##0.00 ₽')
+        grand += total
+        row += 1
+
+    _cell(ws, row, 1, "", s, fill=s["total_fill"])
+    _cell(ws, row, 2, "ИТОГО", s, font=s["total_font"], fill=s["total_fill"])
+    for col in range(3, 6):
+        _cell(ws, row, col, "", s, fill=s["total_fill"])
+    _cell(ws, row, 6, round(grand, 2), s, font=s["total_font"],
+          fill=s["total_fill"], fmt='#,##0.00 ₽')
+
+    for col, w in zip('ABCDEF', [5, 25, 30, 12, 12, 18]):
+        ws.column_dimensions[col].width = w
+
+    return workers
+
+
+async def _sheet_details(wb, conn, workers, period: Period, s):
+    ws2 = wb.create_sheet("Детализация")
+    ws2.merge_cells('A1:G1')
+    ws2['A1'] = f"Детализация за {period.label}"
+    ws2['A1'].font = s["header"]
+    ws2['A1'].alignment = Alignment(horizontal='center')
+
+    row = 3
+    for worker in workers:
+        tid, name = worker['telegram_id'], worker['name']
+
+        ws2.merge_cells(f'A{row}:G{row}')
+        cell = ws2.cell(row=row, column=1, value=f"👤 {name}")
+        cell.font = Font(bold=True, size=12)
+        cell.fill = s["worker_fill"]
+        row += 1
+
+        for col, h in enumerate(["Дата", "Работа", "Категория", "Кол-во",
+                                   "Расценка", "Сумма", "Время"], 1):
+            _cell(ws2, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
+        row += 1
+
+        records = await conn.fetch("""
+            SELECT wl.work_date::TEXT, pl.name, c.name, wl.quantity,
+                   wl.price_per_unit, wl.total, wl.created_at::TEXT
+            FROM work_log wl
+            JOIN price_list pl ON wl.work_code = pl.code
+            JOIN categories c ON pl.category_code = c.code
+            WHERE wl.worker_id = $1
+              AND wl.work_date >= $2
+              AND wl.work_date < $3
+            ORDER BY wl.work_date, wl.created_at
+        """, tid, period.start, period.end)
+
+        wtotal = 0
+        cur_date = ""
+        day_total = 0
 
-            if cur_date != "":
+        for rec in records:
+            if rec[0] != cur_date and cur_date != "":
                 for c2 in range(1, 6):
                     _cell(ws2, row, c2, "", s, fill=s["day_fill"])
                 _cell(ws2, row, 5, f"День {cur_date}:", s,
@@ -182,125 +189,175 @@ async def generate_monthly_report(year=None, month=None):
                       fill=s["day_fill"], fmt='#,##0.00')
                 _cell(ws2, row, 7, "", s, fill=s["day_fill"])
                 row += 1
+                day_total = 0
+            cur_date = rec[0]
+
+            _cell(ws2, row, 1, rec[0], s)
+            _cell(ws2, row, 2, rec[1], s)
+            _cell(ws2, row, 3, rec[2], s)
+            _cell(ws2, row, 4, rec[3], s, center=True)
+            _cell(ws2, row, 5, round(rec[4], 2), s, fmt='#,##0.00')
+            _cell(ws2, row, 6, round(rec[5], 2), s, fmt='#,##0.00')
+            _cell(ws2, row, 7, rec[6], s)
+            wtotal += rec[5]
+            day_total += rec[5]
+            row += 1
 
-            if records:
-                for col in range(1, 6):
-                    _cell(ws2, row, col, "", s, fill=s["total_fill"])
-                _cell(ws2, row, 2, f"ИТОГО {name}:", s, font=s["total_font"], fill=s["total_fill"])
-                _cell(ws2, row, 6, round(wtotal, 2), s, font=s["total_font"],
-                      fill=s["total_fill"], fmt='#,##0.00 ₽')
-                _cell(ws2, row, 7, "", s, fill=s["total_fill"])
-                row += 1
-            else:
-                ws2.cell(row=row, column=1, value="Нет записей")
-                row += 1
+        if cur_date != "":
+            for c2 in range(1, 6):
+                _cell(ws2, row, c2, "", s, fill=s["day_fill"])
+            _cell(ws2, row, 5, f"День {cur_date}:", s,
+                  font=Font(bold=True, italic=True, size=9), fill=s["day_fill"])
+            _cell(ws2, row, 6, round(day_total, 2), s,
+                  font=Font(bold=True, italic=True, size=9),
+                  fill=s["day_fill"], fmt='#,##0.00')
+            _cell(ws2, row, 7, "", s, fill=s["day_fill"])
             row += 1
 
-        for col, w in zip('ABCDEFG', [14, 25, 20, 10, 14, 14, 20]):
-            ws2.column_dimensions[col].width = w
+        if records:
+            for col in range(1, 6):
+                _cell(ws2, row, col, "", s, fill=s["total_fill"])
+            _cell(ws2, row, 2, f"ИТОГО {name}:", s, font=s["total_font"], fill=s["total_fill"])
+            _cell(ws2, row, 6, round(wtotal, 2), s, font=s["total_font"],
+                  fill=s["total_fill"], fmt='#,##0.00 ₽')
+            _cell(ws2, row, 7, "", s, fill=s["total_fill"])
+            row += 1
+        else:
+            ws2.cell(row=row, column=1, value="Нет записей")
+            row += 1
+        row += 1
 
-        # ===== ЛИСТ 3: ПО ДНЯМ =====
-        ws3 = wb.create_sheet("По дням")
-        ws3.merge_cells('A1:D1')
-        ws3['A1'] = f"По дням за {MONTHS_RU[month]} {year}"
-        ws3['A1'].font = s["header"]
-        ws3['A1'].alignment = Alignment(horizontal='center')
+    for col, w in zip('ABCDEFG', [14, 25, 20, 10, 14, 14, 20]):
+        ws2.column_dimensions[col].width = w
 
-        row = 3
-        for col, h in enumerate(["Дата", "Работник", "Работа", "Сумма (₽)"], 1):
-            _cell(ws3, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
-        row += 1
 
-        daily = await conn.fetch("""
-            SELECT wl.work_date::TEXT, w.name, pl.name, SUM(wl.total)
-            FROM work_log wl
-            JOIN workers w ON wl.worker_id = w.telegram_id
-            JOIN price_list pl ON wl.work_code = pl.code
-            WHERE EXTRACT(YEAR FROM wl.work_date) = $1 AND EXTRACT(MONTH FROM wl.work_date) = $2
-            GROUP BY wl.work_date, w.name, pl.name
-            ORDER BY wl.work_date, w.name
-        """, year, month)
+async def _sheet_by_days(wb, period: Period, s):
+    ws3 = wb.create_sheet("По дням")
+    ws3.merge_cells('A1:D1')
+    ws3['A1'] = f"По дням за {period.label}"
+    ws3['A1'].font = s["header"]
+    ws3['A1'].alignment = Alignment(horizontal='center')
 
-        cur_date = ""
-        day_sum = 0
-        for rec in daily:
-            wd, wn, wname, total = rec[0], rec[1], rec[2], rec[3]
-            if wd != cur_date and cur_date != "":
-                _cell(ws3, row, 1, "", s)
-                _cell(ws3, row, 2, f"Итого за {cur_date}:", s,
-                      font=Font(bold=True, italic=True, size=9))
-                _cell(ws3, row, 3, "", s)
-                _cell(ws3, row, 4, round(day_sum, 2), s,
-                      font=Font(bold=True, size=9), fmt='#,##0.00')
-                row += 1
-                day_sum = 0
-            cur_date = wd
-            _cell(ws3, row, 1, wd, s)
-            _cell(ws3, row, 2, wn, s)
-            _cell(ws3, row, 3, wname, s)
-            _cell(ws3, row, 4, round(total, 2), s, fmt='#,##0.00')
-            day_sum += total
-            row += 1
+    row = 3
+    for col, h in enumerate(["Дата", "Работник", "Работа", "Сумма (₽)"], 1):
+        _cell(ws3, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
+    row += 1
+
+    daily = await get_rollup(period.start, period.end, by=('day', 'worker', 'work'))
 
-        if cur_date:
+    cur_date = ""
+    day_sum = 0
+    for rec in daily:
+        wd, wn, wname, total = rec.work_date.isoformat(), rec.worker_name, rec.work_name, rec.total
+        if wd != cur_date and cur_date != "":
             _cell(ws3, row, 1, "", s)
             _cell(ws3, row, 2, f"Итого за {cur_date}:", s,
                   font=Font(bold=True, italic=True, size=9))
             _cell(ws3, row, 3, "", s)
             _cell(ws3, row, 4, round(day_sum, 2), s,
                   font=Font(bold=True, size=9), fmt='#,##0.00')
+            row += 1
+            day_sum = 0
+        cur_date = wd
+        _cell(ws3, row, 1, wd, s)
+        _cell(ws3, row, 2, wn, s)
+        _cell(ws3, row, 3, wname, s)
+        _cell(ws3, row, 4, round(total, 2), s, fmt='#,##0.00')
+        day_sum += total
+        row += 1
 
-        for col, w in zip('ABCD', [14, 25, 25, 15]):
-            ws3.column_dimensions[col].width = w
+    if cur_date:
+        _cell(ws3, row, 1, "", s)
+        _cell(ws3, row, 2, f"Итого за {cur_date}:", s,
+              font=Font(bold=True, italic=True, size=9))
+        _cell(ws3, row, 3, "", s)
+        _cell(ws3, row, 4, round(day_sum, 2), s,
+              font=Font(bold=True, size=9), fmt='#,##0.00')
 
-        # ===== ЛИСТ 4: ПО КАТЕГОРИЯМ =====
-        ws4 = wb.create_sheet("По категориям")
-        ws4.merge_cells('A1:E1')
-        ws4['A1'] = f"По категориям за {MONTHS_RU[month]} {year}"
-        ws4['A1'].font = s["header"]
-        ws4['A1'].alignment = Alignment(horizontal='center')
+    for col, w in zip('ABCD', [14, 25, 25, 15]):
+        ws3.column_dimensions[col].width = w
 
-        row = 3
-        for col, h in enumerate(["Категория", "Работа", "Кол-во", "Расценка", "Итого (₽)"], 1):
-            _cell(ws4, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
-        row += 1
 
-        cat_data = await conn.fetch("""
-            SELECT c.name, pl.name, SUM(wl.quantity), wl.price_per_unit, SUM(wl.total)
-            FROM work_log wl
-            JOIN price_list pl ON wl.work_code = pl.code
-            JOIN categories c ON pl.category_code = c.code
-            WHERE EXTRACT(YEAR FROM wl.work_date) = $1 AND EXTRACT(MONTH FROM wl.work_date) = $2
-            GROUP BY c.name, pl.name, wl.price_per_unit
-            ORDER BY c.name, pl.name
-        """, year, month)
-
-        cat_grand = 0
-        for rec in cat_data:
-            cn, pn, qty, price, total = rec[0], rec[1], rec[2], rec[3], rec[4]
-            _cell(ws4, row, 1, cn, s)
-            _cell(ws4, row, 2, pn, s)
-            _cell(ws4, row, 3, qty, s, center=True)
-            _cell(ws4, row, 4, round(price, 2), s, fmt='#,##0.00')
-            _cell(ws4, row, 5, round(total, 2), s, fmt='#,##0.00')
-            cat_grand += total
+async def _sheet_by_months(wb, period: Period, s):
+    ws = wb.create_sheet("По месяцам")
+    ws.merge_cells('A1:E1')
+    ws['A1'] = f"По месяцам за {period.label}"
+    ws['A1'].font = s["header"]
+    ws['A1'].alignment = Alignment(horizontal='center')
+
+    row = 3
+    for col, h in enumerate(["Месяц", "Работник", "Дней", "Записей", "Сумма (₽)"], 1):
+        _cell(ws, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
+    row += 1
+
+    monthly = await get_rollup(period.start, period.end, by=('month', 'worker'))
+
+    cur_month = None
+    month_sum = 0
+    for rec in monthly:
+        if rec.month != cur_month and cur_month is not None:
+            _month_total(ws, row, cur_month, month_sum, s)
             row += 1
+            month_sum = 0
+        cur_month = rec.month
+        _cell(ws, row, 1, f"{MONTHS_RU[rec.month.month]} {rec.month.year}", s)
+        _cell(ws, row, 2, rec.worker_name, s)
+        _cell(ws, row, 3, rec.days, s, center=True)
+        _cell(ws, row, 4, rec.entries, s, center=True)
+        _cell(ws, row, 5, round(rec.total, 2), s, fmt='#,##0.00')
+        month_sum += rec.total
+        row += 1
 
-        for col in range(1, 5):
-            _cell(ws4, row, col, "", s, fill=s["total_fill"])
-        _cell(ws4, row, 2, "ОБЩИЙ ИТОГО", s, font=s["total_font"], fill=s["total_fill"])
-        _cell(ws4, row, 5, round(cat_grand, 2), s, font=s["total_font"],
-              fill=s["total_fill"], fmt='#,##0.00 ₽')
+    if cur_month is not None:
+        _month_total(ws, row, cur_month, month_sum, s)
 
-        for col, w in zip('ABCDE', [20, 25, 12, 14, 15]):
-            ws4.column_dimensions[col].width = w
+    for col, w in zip('ABCDE', [16, 25, 10, 10, 15]):
+        ws.column_dimensions[col].width = w
 
-    finally:
-        await conn.close()
 
-    filename = f"report_{year}_{month:02d}.xlsx"
-    wb.save(filename)
-    return filename
+def _month_total(ws, row, month_start, total, s):
+    for col in (1, 3, 4):
+        _cell(ws, row, col, "", s, fill=s["day_fill"])
+    _cell(ws, row, 2, f"Итого за {MONTHS_RU[month_start.month]}:", s,
+          font=Font(bold=True, italic=True, size=9), fill=s["day_fill"])
+    _cell(ws, row, 5, round(total, 2), s,
+          font=Font(bold=True, size=9), fill=s["day_fill"], fmt='#,##0.00')
+
+
+async def _sheet_by_categories(wb, period: Period, s):
+    ws4 = wb.create_sheet("По категориям")
+    ws4.merge_cells('A1:E1')
+    ws4['A1'] = f"По категориям за {period.label}"
+    ws4['A1'].font = s["header"]
+    ws4['A1'].alignment = Alignment(horizontal='center')
+
+    row = 3
+    for col, h in enumerate(["Категория", "Работа", "Кол-во", "Расценка", "Итого (₽)"], 1):
+        _cell(ws4, row, col, h, s, font=s["th_font"], fill=s["th_fill"], center=True)
+    row += 1
+
+    cat_data = await get_rollup(period.start, period.end, by=('category', 'work', 'price'))
+
+    cat_grand = 0
+    for rec in cat_data:
+        cn, pn, qty, price, total = (rec.category_name, rec.work_name, rec.quantity,
+                                     rec.price_per_unit, rec.total)
+        _cell(ws4, row, 1, cn, s)
+        _cell(ws4, row, 2, pn, s)
+        _cell(ws4, row, 3, qty, s, center=True)
+        _cell(ws4, row, 4, round(price, 2), s, fmt='#,##0.00')
+        _cell(ws4, row, 5, round(total, 2), s, fmt='#,##0.00')
+        cat_grand += total
+        row += 1
+
+    for col in range(1, 5):
+        _cell(ws4, row, col, "", s, fill=s["total_fill"])
+    _cell(ws4, row, 2, "ОБЩИЙ ИТОГО", s, font=s["total_font"], fill=s["total_fill"])
+    _cell(ws4, row, 5, round(cat_grand, 2), s, font=s["total_font"],
+          fill=s["total_fill"], fmt='#,##0.00 ₽')
+
+    for col, w in zip('ABCDE', [20, 25, 12, 14, 15]):
+        ws4.column_dimensions[col].width = w
 
 
 async def generate_worker_report(worker_id, worker_name, year=None, month=None):
@@ -336,10 +393,10 @@ async def generate_worker_report(worker_id, worker_name, year=None, month=None):
             JOIN price_list pl ON wl.work_code = pl.code
             JOIN categories c ON pl.category_code = c.code
             WHERE wl.worker_id = $1
-              AND EXTRACT(YEAR FROM wl.work_date) = $2
-              AND EXTRACT(MONTH FROM wl.work_date) = $3
+              AND wl.work_date >= $2
+              AND wl.work_date < $3
             ORDER BY wl.work_date, wl.created_at
-        """, worker_id, year, month)
+        """, worker_id, *month_bounds(year, month))
     finally:
         await conn.close()
 
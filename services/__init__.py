@@ -0,0 +1,5 @@
+from . import backup, fragments, identity, reminders, work_search, write_behind
+from .daily_summary import get_daily_summary
+
+__all__ = ['backup', 'fragments', 'identity', 'reminders', 'work_search', 'write_behind',
+           'get_daily_summary']
@@ -0,0 +1,96 @@
+"""JSON-бэкап БД: выгрузка, проверка пробным восстановлением, отправка.
+
+send_backup() вызывают автобэкап (bot.safe_backup) и кнопка «💾 Бэкап БД».
+Таблицы читаются в одном снимке REPEATABLE READ вместе с digests(),
+файл проверяется backup_check.verify_json() и уходит документом.
+"""
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+
+import database
+from config import ADMIN_ID
+from utils import lazy_import
+
+# Проверка бэкапа (и snapshots) нужна только при бэкапе
+backup_check = lazy_import('backup_check')
+json_backup = lazy_import('json_backup')
+
+
+async def send_backup(bot: Bot, chat_id=None):
+    """Бэкап PostgreSQL в JSON: файл и результат проверки — в chat_id"""
+    if chat_id is None:
+        chat_id = ADMIN_ID
+    
+    try:
+        async with database.pool.acquire() as pg:
+            backup_data = {}
+            
+            # Те же таблицы и порядок, что восстанавливает json_backup.load()
+            tables = json_backup.TABLES
+            
+            # Один снимок: бэкап согласован, а контрольные суммы для проверки
+            # считаются по тем же данным
+            async with pg.transaction(isolation='repeatable_read', readonly=True):
+                for table in tables:
+                    rows = await pg.fetch(f"SELECT * FROM {table}")
+                    backup_data[table] = [dict(row) for row in rows]
+                expected = await backup_check.digests(pg, tables)
+        
+        # Конвертируем даты в строки
+        def convert_dates(obj):
+            if isinstance(obj, dict):
+                return {k: convert_dates(v) for k, v in obj.items()}
+            elif isinstance(obj, list):
+                return [convert_dates(i) for i in obj]
+            elif hasattr(obj, 'isoformat'):
+                return obj.isoformat()
+            return obj
+        
+        backup_data = convert_dates(backup_data)
+        
+        now = datetime.now()
+        filename = f"backup_{now.strftime('%Y%m%d_%H%M')}.json"
+        
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json', encoding='utf-8') as f:
+            json.dump(backup_data, f, ensure_ascii=False, indent=2)
+            tmp_path = f.name
+        
+        # Пробное восстановление в отдельную схему
+        try:
+            diffs = await backup_check.verify_json(tmp_path, expected)
+        except Exception as e:
+            logging.exception(f"Backup check failed: {e}")
+            diffs = [f"проверка не выполнена: {str(e)[:200]}"]
+        if diffs:
+            logging.error(f"Backup check: {diffs}")
+            check = "⚠️ Проверка не прошла:\n" + "\n".join(diffs[:backup_check.MAX_DIFFS])
+        else:
+            check = "✅ Проверен пробным восстановлением"
+        
+        stats = (
+            f"💾 Бэкап PostgreSQL\n"
+            f"📅 {now.strftime('%d.%m.%Y %H:%M')}\n\n"
+            f"👥 Работников: {len(backup_data.get('workers', []))}\n"
+            f"📝 Записей: {len(backup_data.get('work_log', []))}\n"
+            f"💳 Авансов: {len(backup_data.get('advances', []))}\n"
+            f"⚠️ Штрафов: {len(backup_data.get('penalties', []))}\n\n"
+            f"{check}"
+        )
+        
+        await bot.send_document(
+            chat_id,
+            FSInputFile(tmp_path, filename=filename),
+            caption=stats
+        )
+        
+        os.unlink(tmp_path)
+        
+    except Exception as e:
+        logging.error(f"Backup error: {e}")
+        await bot.send_message(chat_id, f"❌ Ошибка бэкапа: {e}")
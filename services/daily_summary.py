@@ -0,0 +1,75 @@
+"""Кэш дневной сводки по работникам.
+
+Сводка за день загружается одним запросом и дальше поддерживается по
+событиям work_log: добавление, правка и удаление записи меняют сумму
+работника на дельту. Изменения работников и категорий сбрасывают кэш.
+"""
+from collections import OrderedDict
+from datetime import date
+from typing import List
+
+import events
+from database import get_daily_summary_with_categories, parse_date
+from models import DailySummaryRow
+
+# Сколько последних дней держим в памяти (нужны в основном сегодня/вчера)
+MAX_DAYS = 7
+
+
+class _Day:
+    __slots__ = ('order', 'rows')
+
+    def __init__(self, rows: List[DailySummaryRow]):
+        self.order = [r.telegram_id for r in rows]  # уже отсортированы по имени
+        self.rows = {r.telegram_id: [r.name, r.emojis, r.total] for r in rows}
+
+
+_days: "OrderedDict[date, _Day]" = OrderedDict()
+# Растёт на каждое событие — загрузка, во время которой оно пришло, не кэшируется
+_epoch = 0
+
+
+async def get_daily_summary(target_date=None) -> List[DailySummaryRow]:
+    """Сводка за день: (telegram_id, name, emojis, total) по всем работникам"""
+    day = parse_date(target_date)
+    cached = _days.get(day)
+    if cached is None:
+        epoch = _epoch
+        rows = await get_daily_summary_with_categories(day)
+        if epoch != _epoch:
+            return rows
+        cached = _days[day] = _Day(rows)
+        while len(_days) > MAX_DAYS:
+            _days.popitem(last=False)
+    else:
+        _days.move_to_end(day)
+    return [DailySummaryRow(tid, *cached.rows[tid]) for tid in cached.order]
+
+
+def invalidate(**_):
+    global _epoch
+    _epoch += 1
+    _days.clear()
+
+
+def _on_work_log(worker_id=None, work_date=None, delta=None, **_):
+    global _epoch
+    _epoch += 1
+    if work_date is None:
+        _days.clear()
+        return
+    cached = _days.get(work_date)
+    if cached is None:
+        return
+    row = cached.rows.get(worker_id)
+    if row is None:
+        del _days[work_date]
+    else:
+        row[2] += delta
+
+
+events.subscribe('work_log', _on_work_log)
+events.subscribe('workers', invalidate)
+events.subscribe('worker_categories', invalidate)
+events.subscribe('categories', invalidate)
+events.subscribe(events.RESYNC, invalidate)
@@ -0,0 +1,47 @@
+"""Кэш готовых строк сообщений.
+
+Строка о сущности (позиция прайса, категория со списком работников)
+форматируется один раз и хранится вместе с версиями тем, от которых она
+зависит. Событие по теме увеличивает её версию — устаревшие строки
+перерисуются при следующем обращении; resync сбрасывает кэш целиком.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import events
+
+_versions: Dict[str, int] = defaultdict(int)
+_cache: Dict[Hashable, Tuple[tuple, str]] = {}
+
+
+def version(topics: Sequence[str]) -> tuple:
+    return tuple(_versions[t] for t in topics)
+
+
+def fragment(key: Hashable, topics: Sequence[str], render: Callable[[], str],
+             seen: Optional[tuple] = None) -> str:
+    """Строка для key; render() вызывается, только если её нет или
+    какая-то из topics изменилась. seen — version(topics), снятая до
+    чтения данных: если они успели устареть, строка не закрепится в кэше"""
+    current = version(topics)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == current:
+        return hit[1]
+    text = render()
+    _cache[key] = (seen if seen is not None else current, text)
+    return text
+
+
+def _bump(topic: str):
+    def handler(**_):
+        _versions[topic] += 1
+    return handler
+
+
+def _reset(**_):
+    _cache.clear()
+
+
+for _topic in ('categories', 'price_list', 'workers', 'worker_categories'):
+    events.subscribe(_topic, _bump(_topic))
+events.subscribe(events.RESYNC, _reset)
@@ -0,0 +1,101 @@
+"""Кэш ролей и имён пользователей.
+
+Роли (staff_roles) и имена работников загружаются из БД целиком в словари;
+проверка роли и поиск имени по telegram_id — O(1) без запросов. События
+workers/staff_roles помечают изменившихся пользователей, и при следующем
+обращении перечитываются только они; resync сбрасывает кэш целиком.
+"""
+import asyncio
+from typing import Dict, List, Optional, Set
+
+import events
+from database import get_all_workers, get_identities, get_staff_roles
+from models import WorkerRef
+
+_names: Dict[int, str] = {}
+_roles: Dict[int, str] = {}
+_dirty: Set[int] = set()
+_loaded = False
+_epoch = 0
+_lock = asyncio.Lock()
+
+
+async def ensure_loaded():
+    """Загружает кэш, если он пуст или сброшен, и обновляет изменившиеся
+    записи. Дальше — бесплатная проверка флага"""
+    global _loaded, _names, _roles, _dirty
+    if _loaded and not _dirty:
+        return
+    async with _lock:
+        if not _loaded:
+            epoch = _epoch
+            workers = await get_all_workers()
+            roles = await get_staff_roles()
+            _names = {w.telegram_id: w.name for w in workers}
+            _roles = {r.telegram_id: r.role for r in roles}
+            # Если за время загрузки что-то поменялось — перечитаем в следующий раз
+            _loaded = epoch == _epoch
+            return
+        if not _dirty:
+            return
+        # Пришедшие во время запроса события попадут в новый _dirty
+        ids, _dirty = _dirty, set()
+        for row in await get_identities(list(ids)):
+            _set(_names, row.telegram_id, row.name)
+            _set(_roles, row.telegram_id, row.role)
+
+
+def _set(mapping: dict, key: int, value):
+    if value is None:
+        mapping.pop(key, None)
+    else:
+        mapping[key] = value
+
+
+def invalidate(worker_id: Optional[int] = None, **_):
+    """Событие об одном пользователе помечает его, без worker_id — сбрасывает всё"""
+    global _loaded, _epoch
+    if worker_id is not None and _loaded:
+        _dirty.add(worker_id)
+        return
+    _epoch += 1
+    _loaded = False
+    _dirty.clear()
+
+
+# ==================== РОЛИ ====================
+
+def get_role(user_id: Optional[int]) -> Optional[str]:
+    return _roles.get(user_id)
+
+
+def is_admin(user_id: Optional[int]) -> bool:
+    return _roles.get(user_id) == 'admin'
+
+
+def is_manager(user_id: Optional[int]) -> bool:
+    return _roles.get(user_id) == 'manager'
+
+
+def is_staff(user_id: Optional[int]) -> bool:
+    return user_id in _roles
+
+
+def manager_ids() -> List[int]:
+    return [uid for uid, role in _roles.items() if role == 'manager']
+
+
+# ==================== РАБОТНИКИ ====================
+
+def get_worker(user_id: Optional[int]) -> Optional[WorkerRef]:
+    name = _names.get(user_id)
+    return WorkerRef(user_id, name) if name is not None else None
+
+
+def worker_name(user_id: Optional[int], default: str = "?") -> str:
+    return _names.get(user_id, default)
+
+
+events.subscribe('workers', invalidate)
+events.subscribe('staff_roles', invalidate)
+events.subscribe(events.RESYNC, invalidate)
@@ -0,0 +1,272 @@
+"""Расписание напоминаний.
+
+Три задачи (вечернее и позднее напоминания работникам, отчёт админу) живут
+в APScheduler, их расписание — в reminder_settings. При изменении настроек
+(событие reminder_settings, в том числе из другого процесса) сверяется
+расписание и перепланируется только задача, которая изменилась.
+
+У работника может быть своё время напоминаний и часовой пояс (workers.
+reminder_tz / evening_time / late_time). Работники с одинаковым временем и
+поясом образуют слот — отдельную задачу вида evening_reminder@Asia/Omsk@19:00;
+общая задача обходит их стороной. Внутри слота рассылка растягивается на
+REMINDER_SPREAD: получатели раскладываются по REMINDER_BUCKETS корзинам
+(по telegram_id) со случайным сдвигом внутри корзины, так что нагрузка на
+Telegram и БД не зависит от числа работников.
+
+Время последнего выполненного запуска хранится в reminder_job_state:
+каждый запуск сначала «занимает» своё плановое время, поэтому одно и то же
+напоминание не уйдёт дважды — ни после рестарта, ни из двух процессов. При
+старте пропущенный запуск выполняется, если с планового времени прошло
+не больше MISFIRE_GRACE, иначе пропуск только пишется в лог.
+"""
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional
+from zoneinfo import ZoneInfo
+
+from apscheduler.triggers.cron import CronTrigger
+
+import events
+from config import ADMIN_ID, TIMEZONE
+from database import (
+    claim_reminder_run, get_reminder_jobs, get_reminder_job_states,
+    get_reminder_prefs, get_workers_without_records,
+)
+from models import ReminderJob, WorkerRef
+from services.daily_summary import get_daily_summary
+
+# Сколько после планового времени запуск ещё имеет смысл
+MISFIRE_GRACE = {
+    'evening_reminder': timedelta(hours=1),
+    'late_reminder': timedelta(hours=1),
+    'admin_report': timedelta(hours=6),
+}
+
+# Рассылка одного слота растягивается на это время
+REMINDER_SPREAD = timedelta(minutes=10)
+REMINDER_BUCKETS = 20
+
+# Задачи, время которых работник может задать сам: задача -> поле в prefs
+PERSONAL_JOBS = {'evening_reminder': 'evening_time', 'late_reminder': 'late_time'}
+
+_scheduler = None
+_bot = None
+# Расписание, которое сейчас стоит в планировщике
+_applied: Dict[str, ReminderJob] = {}
+# Получатели личных слотов и работники, которых общая задача пропускает
+_members: Dict[str, FrozenSet[int]] = {}
+_excluded: Dict[str, FrozenSet[int]] = {}
+_lock = asyncio.Lock()
+_tasks = set()
+
+
+def _zone(tz: Optional[str]):
+    name = tz or TIMEZONE
+    return ZoneInfo(name) if name else None
+
+
+def _base_id(job_id: str) -> str:
+    return job_id.split('@', 1)[0]
+
+
+# ==================== ОТПРАВКА ====================
+
+def _delay(telegram_id: int) -> float:
+    """Сдвиг отправки внутри слота: корзина по telegram_id + случайный джиттер"""
+    width = REMINDER_SPREAD.total_seconds() / REMINDER_BUCKETS
+    return (telegram_id % REMINDER_BUCKETS) * width + random.uniform(0, width)
+
+
+async def _broadcast(recipients: List[WorkerRef], text: str, label: str):
+    started = asyncio.get_running_loop().time()
+    for delay, tid, name in sorted((_delay(w.telegram_id), w.telegram_id, w.name)
+                                   for w in recipients):
+        wait = started + delay - asyncio.get_running_loop().time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            await _bot.send_message(tid, text)
+        except Exception as e:
+            logging.error(f"{label} {name}: {e}")
+
+
+async def _recipients(job: ReminderJob) -> List[WorkerRef]:
+    """Работники слота job без записей за их сегодняшний день"""
+    today = datetime.now(_zone(job.tz)).date()
+    workers = await get_workers_without_records(today)
+    members = _members.get(job.job_id)
+    if members is not None:
+        return [w for w in workers if w.telegram_id in members]
+    excluded = _excluded.get(job.job_id, frozenset())
+    return [w for w in workers if w.telegram_id not in excluded]
+
+
+async def send_evening_reminder(job: ReminderJob):
+    await _broadcast(await _recipients(job), "🔔 Запишите работу за сегодня!", "Reminder")
+
+
+async def send_late_reminder(job: ReminderJob):
+    await _broadcast(await _recipients(job), "⚠️ Вы не записали работу! Нужно для зарплаты.", "Late")
+
+
+async def send_admin_report(job: ReminderJob):
+    # «Сегодня» — в поясе задачи: сводка за тот же день, что в заголовке
+    today = datetime.now(_zone(job.tz)).date()
+    summary = await get_daily_summary(today)
+    text = f"📊 Итоги {today.strftime('%d.%m.%Y')}:\n\n"
+    total = 0
+    for tid, name, ce, dt in summary:
+        icon = '✅' if dt > 0 else '❌'
+        text += f"{icon} {name}: {int(dt)} руб\n"
+        total += dt
+    text += f"\n💰 Итого: {int(total)} руб"
+    try:
+        await _bot.send_message(ADMIN_ID, text)
+    except Exception as e:
+        logging.error(f"Admin report: {e}")
+
+
+JOBS = {
+    'evening_reminder': send_evening_reminder,
+    'late_reminder': send_late_reminder,
+    'admin_report': send_admin_report,
+}
+
+
+# ==================== ЗАПУСК ЗАДАЧ ====================
+
+def _last_slot(job: ReminderJob, now: datetime) -> datetime:
+    """Последнее плановое время задачи, не позже now (now — в поясе задачи)"""
+    slot = now.replace(hour=job.hour, minute=job.minute, second=0, microsecond=0)
+    return slot if slot <= now else slot - timedelta(days=1)
+
+
+def _server_time(moment: datetime) -> datetime:
+    """Время для reminder_job_state: локальное время сервера без пояса"""
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+async def _fire(job_id: str, slot: Optional[datetime] = None):
+    job = _applied.get(job_id)
+    if job is None or not job.enabled:
+        return
+    slot = slot or _last_slot(job, datetime.now(_zone(job.tz)))
+    if not await claim_reminder_run(job_id, _server_time(slot)):
+        logging.info(f"⏰ {job_id} за {slot:%d.%m %H:%M} уже выполнен")
+        return
+    try:
+        await JOBS[_base_id(job_id)](job)
+    except Exception as e:
+        logging.exception(f"{job_id} failed: {e}")
+
+
+def _apply(job: ReminderJob):
+    """Приводит задачу планировщика к расписанию job, если оно изменилось"""
+    old = _applied.get(job.job_id)
+    _applied[job.job_id] = job
+    if old is not None and old[:5] == job[:5]:
+        return
+    if not job.enabled:
+        if _scheduler.get_job(job.job_id):
+            _scheduler.remove_job(job.job_id)
+        logging.info(f"⏰ {job.job_id} выключен")
+        return
+    trigger = CronTrigger(hour=job.hour, minute=job.minute, timezone=_zone(job.tz))
+    if _scheduler.get_job(job.job_id):
+        _scheduler.reschedule_job(job.job_id, trigger=trigger)
+    else:
+        grace = MISFIRE_GRACE[_base_id(job.job_id)]
+        _scheduler.add_job(
+            _fire, trigger, args=[job.job_id], id=job.job_id,
+            coalesce=True, misfire_grace_time=int(grace.total_seconds()))
+    logging.info(f"⏰ {job.job_id} в {job.hour:02d}:{job.minute:02d}")
+
+
+def _personal_slots(base: List[ReminderJob], prefs) -> List[ReminderJob]:
+    """Раскладывает работников с личным расписанием по слотам"""
+    global _members, _excluded
+    members = defaultdict(set)
+    slots = {}
+    for job in base:
+        field = PERSONAL_JOBS.get(job.job_id)
+        if field is None:
+            continue
+        for p in prefs:
+            at = getattr(p, field)
+            hour, minute = (at.hour, at.minute) if at else (job.hour, job.minute)
+            if p.tz is None and (hour, minute) == (job.hour, job.minute):
+                continue
+            slot_id = f"{job.job_id}@{p.tz or ''}@{hour:02d}:{minute:02d}"
+            slots[slot_id] = ReminderJob(slot_id, hour, minute, job.enabled, p.tz, None)
+            members[slot_id].add(p.telegram_id)
+    _members = {k: frozenset(v) for k, v in members.items()}
+    excluded = defaultdict(set)
+    for slot_id, ids in _members.items():
+        excluded[_base_id(slot_id)] |= ids
+    _excluded = {k: frozenset(v) for k, v in excluded.items()}
+    return list(slots.values())
+
+
+async def sync():
+    """Сверяет планировщик с настройками и личными расписаниями из БД"""
+    async with _lock:
+        base = await get_reminder_jobs()
+        jobs = base + _personal_slots(base, await get_reminder_prefs())
+        wanted = {job.job_id for job in jobs}
+        for job_id in [j for j in _applied if j not in wanted]:
+            del _applied[job_id]
+            if _scheduler.get_job(job_id):
+                _scheduler.remove_job(job_id)
+        for job in jobs:
+            _apply(job)
+        return jobs
+
+
+async def _catch_up(job: ReminderJob, last_run_at: Optional[datetime]):
+    """Выполняет запуск, пропущенный, пока бот не работал"""
+    if not job.enabled or last_run_at is None:
+        return
+    now = datetime.now(_zone(job.tz))
+    slot = _last_slot(job, now)
+    if last_run_at >= _server_time(slot):
+        return
+    if now - slot > MISFIRE_GRACE[_base_id(job.job_id)]:
+        logging.warning(f"⏰ {job.job_id} за {slot:%d.%m %H:%M} пропущен: слишком поздно")
+        return
+    logging.info(f"⏰ {job.job_id} за {slot:%d.%m %H:%M} пропущен, выполняю сейчас")
+    await _fire(job.job_id, slot)
+
+
+async def start(scheduler, bot):
+    """Регистрирует задачи и догоняет пропущенные запуски"""
+    global _scheduler, _bot
+    _scheduler, _bot = scheduler, bot
+    jobs = await sync()
+    states = await get_reminder_job_states()
+    for job in jobs:
+        _spawn(_catch_up(job, states.get(job.job_id)))
+
+
+async def wait_idle():
+    """Ждёт фоновые задачи (догоняющие запуски, пересинхронизацию)"""
+    while _tasks:
+        await asyncio.wait(set(_tasks))
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _on_settings_changed(**_):
+    if _scheduler is not None:
+        _spawn(sync())
+
+
+events.subscribe('reminder_settings', _on_settings_changed)
+events.subscribe('reminder_prefs', _on_settings_changed)
+events.subscribe(events.RESYNC, _on_settings_changed)
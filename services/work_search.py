@@ -0,0 +1,138 @@
+"""Поиск работ по названию для быстрой записи (inline-режим).
+
+Индекс строится в памяти по активному прайсу: префиксы слов (до
+PREFIX_LEN символов) и триграммы -> коды позиций. Доступные работнику
+категории тоже держатся в памяти, поэтому запрос «шлиф 3» не ходит в БД.
+События price_list / categories / worker_categories помечают индекс
+устаревшим, он перестраивается при следующем поиске.
+
+Сначала ищутся позиции, у которых каждое слово запроса — начало какого-то
+слова названия или кода; если таких нет — по доле общих триграмм (опечатки).
+"""
+import asyncio
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import events
+from database import get_price_list, get_worker_category_codes
+from models import PriceItem
+
+PREFIX_LEN = 10
+# Минимальная доля совпавших триграмм запроса
+MIN_SIMILARITY = 0.4
+MAX_RESULTS = 20
+
+_WORD = re.compile(r"\w+")
+
+_items: Dict[str, PriceItem] = {}
+_prefixes: Dict[str, Set[str]] = defaultdict(set)
+_trigrams: Dict[str, Set[str]] = defaultdict(set)
+_allowed: Dict[int, Set[str]] = {}
+_loaded = False
+_epoch = 0
+_lock = asyncio.Lock()
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower().replace('ё', 'е'))
+
+
+def _grams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+async def ensure_loaded():
+    global _items, _prefixes, _trigrams, _allowed, _loaded
+    if _loaded:
+        return
+    async with _lock:
+        if _loaded:
+            return
+        epoch = _epoch
+        items = await get_price_list()
+        allowed = await get_worker_category_codes()
+        prefixes, trigrams = defaultdict(set), defaultdict(set)
+        for item in items:
+            for word in _words(f"{item.name} {item.code}"):
+                for n in range(1, min(len(word), PREFIX_LEN) + 1):
+                    prefixes[word[:n]].add(item.code)
+                for gram in _grams(word):
+                    trigrams[gram].add(item.code)
+        _items = {item.code: item for item in items}
+        _prefixes, _trigrams, _allowed = prefixes, trigrams, allowed
+        _loaded = epoch == _epoch
+
+
+def invalidate(**_):
+    global _loaded, _epoch
+    _epoch += 1
+    _loaded = False
+
+
+def _by_prefix(words: List[str]) -> Optional[Set[str]]:
+    found = None
+    for word in words:
+        codes = _prefixes.get(word[:PREFIX_LEN], set())
+        if len(word) > PREFIX_LEN:
+            codes = {c for c in codes
+                     if any(w.startswith(word) for w in _words(f"{_items[c].name} {c}"))}
+        found = codes if found is None else found & codes
+        if not found:
+            return found
+    return found
+
+
+def _by_trigrams(words: List[str]) -> List[Tuple[float, str]]:
+    grams = set().union(*(_grams(w) for w in words))
+    hits = Counter()
+    for gram in grams:
+        hits.update(_trigrams.get(gram, ()))
+    return [(n / len(grams), code) for code, n in hits.items() if n / len(grams) >= MIN_SIMILARITY]
+
+
+def search(worker_id: int, query: str, limit: int = MAX_RESULTS) -> List[PriceItem]:
+    """Позиции, доступные работнику, по тексту запроса. Индекс должен быть
+    загружен (ensure_loaded)"""
+    allowed = _allowed.get(worker_id, set())
+    words = _words(query)
+    if not words:
+        found = [i for i in _items.values() if i.category_code in allowed]
+        return found[:limit]
+    found = [_items[c] for c in _by_prefix(words) or ()]
+    found = [i for i in found if i.category_code in allowed]
+    if found:
+        found.sort(key=lambda i: (len(i.name), i.name))
+    else:
+        found = [_items[c] for _, c in sorted(_by_trigrams(words), key=lambda x: (-x[0], x[1]))]
+        found = [i for i in found if i.category_code in allowed]
+    return found[:limit]
+
+
+def get_item(worker_id: int, code: str) -> Optional[PriceItem]:
+    """Позиция по коду, если она активна и доступна работнику"""
+    item = _items.get(code)
+    if item is None or item.category_code not in _allowed.get(worker_id, ()):
+        return None
+    return item
+
+
+def parse_query(query: str) -> Tuple[str, Optional[float]]:
+    """«шлиф 3,5» -> ('шлиф', 3.5): число в конце — количество"""
+    text = query.strip()
+    head, _, last = text.rpartition(" ")
+    try:
+        qty = float(last.replace(",", "."))
+    except ValueError:
+        return text, None
+    if not math.isfinite(qty) or qty <= 0:
+        return text, None
+    return head, qty
+
+
+events.subscribe('price_list', invalidate)
+events.subscribe('categories', invalidate)
+events.subscribe('worker_categories', invalidate)
+events.subscribe(events.RESYNC, invalidate)
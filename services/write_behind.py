@@ -0,0 +1,298 @@
+"""Отложенная запись работ (write-behind).
+
+Включается переменной WRITE_BEHIND. Запись проверяется по кэшированному
+прайсу, дописывается в локальный журнал (append-only, fsync) и сразу
+подтверждается работнику; фоновая задача сбрасывает накопленное в work_log
+пачками до BATCH_SIZE одним INSERT (database.add_work_batch).
+
+Гарантии:
+- подтверждённая запись уже на диске в журнале. После падения start()
+  повторяет журнал, пропуская всё, что по write_behind_state уже в БД.
+  Строка состояния — по id журнала из его заголовка (новый журнал получает
+  uuid), а не по имени файла: у процессов со своими дисками свои журналы и
+  свой last_seq. Один файл журнала два процесса не делят — его держит
+  flock (<журнал>.lock); кто не взял блокировку, пишет в БД сразу;
+- после каждой пачки журнал переписывается без уже записанного в БД
+  (tmp + os.replace), поэтому под постоянной нагрузкой он не растёт;
+- в очереди не больше MAX_PENDING записей: при переполнении submit ждёт,
+  пока сброс освободит место. Всплеск упирается в скорость пакетной
+  вставки, а не в память;
+- пачка, которую БД отвергла окончательно (PERMANENT_ERRORS — например,
+  работник уже перенесён в архив), вставляется по одной записи; записи,
+  которые не проходят и так, уходят в WRITE_BEHIND_DEAD_LETTER и в лог,
+  а не блокируют очередь повторами. Остальные ошибки (сеть, БД
+  недоступна) повторяются через RETRY_DELAY.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import uuid
+from typing import List, NamedTuple, Optional, Tuple
+
+import asyncpg
+
+from config import WRITE_BEHIND, WRITE_BEHIND_DEAD_LETTER, WRITE_BEHIND_JOURNAL
+from database import (
+    add_work_batch, get_price_list, get_write_behind_seq, parse_date, set_write_behind_seq,
+)
+
+BATCH_SIZE = 200
+# Сколько запись ждёт, пока наберётся пачка, секунд
+FLUSH_INTERVAL = 0.5
+MAX_PENDING = 2000
+RETRY_DELAY = 5
+# Ошибки, которые повтор не исправит
+PERMANENT_ERRORS = (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError)
+
+
+class PendingEntry(NamedTuple):
+    seq: int
+    worker_id: int
+    work_code: str
+    quantity: float
+    price: float
+    work_date: str  # ISO
+
+
+_pending: List[PendingEntry] = []
+_seq = 0
+_journal = None
+# Ключ write_behind_state (заголовок журнала) и flock-файл журнала
+_journal_id: Optional[str] = None
+_lock_file = None
+_space: Optional[asyncio.Condition] = None
+_has_work: Optional[asyncio.Event] = None
+_flusher: Optional[asyncio.Task] = None
+# Вставка пачки прервалась, и неизвестно, закоммитилась ли она
+_uncertain = False
+
+
+def enabled() -> bool:
+    return _flusher is not None
+
+
+def pending_total(worker_id: int, work_date) -> float:
+    """Сумма ещё не сброшенных записей работника за день"""
+    day = parse_date(work_date).isoformat()
+    return sum(e.quantity * e.price for e in _pending
+               if e.worker_id == worker_id and e.work_date == day)
+
+
+# ==================== ЖУРНАЛ ====================
+
+def _line(entry: PendingEntry) -> str:
+    return json.dumps(entry._asdict(), ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+def _write(line: str):
+    _journal.write(line)
+    _journal.flush()
+    os.fsync(_journal.fileno())
+
+
+async def _append(entry: PendingEntry):
+    await asyncio.to_thread(_write, _line(entry))
+
+
+def _rewrite(entries: List[PendingEntry]):
+    """Журнал заново: заголовок и entries (ещё не в БД). Новый файл
+    подменяет старый целиком, так что сбой посередине ничего не теряет"""
+    global _journal
+    tmp = WRITE_BEHIND_JOURNAL + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'journal': _journal_id}) + "\n")
+        f.writelines(_line(e) for e in entries)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, WRITE_BEHIND_JOURNAL)
+    directory = os.open(os.path.dirname(os.path.abspath(WRITE_BEHIND_JOURNAL)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    if _journal is not None:
+        _journal.close()
+    _journal = open(WRITE_BEHIND_JOURNAL, 'a', encoding='utf-8')
+
+
+def _lock() -> bool:
+    """Берёт журнал себе; False — его держит другой процесс"""
+    global _lock_file
+    f = open(WRITE_BEHIND_JOURNAL + ".lock", 'w')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return False
+    _lock_file = f
+    return True
+
+
+def _write_dead(line: str):
+    with open(WRITE_BEHIND_DEAD_LETTER, 'a', encoding='utf-8') as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def _dead_letter(entry: PendingEntry, error: Exception):
+    logging.error(f"📒 Запись отвергнута БД, в {WRITE_BEHIND_DEAD_LETTER}: {entry} — {error}")
+    line = json.dumps({**entry._asdict(), 'error': str(error)}, ensure_ascii=False) + "\n"
+    await asyncio.to_thread(_write_dead, line)
+
+
+def _read_journal() -> Tuple[Optional[str], List[PendingEntry]]:
+    """(id журнала, записи). Журнал старого формата без заголовка —
+    id по имени файла, как его и вели раньше"""
+    if not os.path.exists(WRITE_BEHIND_JOURNAL):
+        return None, []
+    journal_id, entries = WRITE_BEHIND_JOURNAL, []
+    with open(WRITE_BEHIND_JOURNAL, encoding='utf-8') as f:
+        for n, line in enumerate(f, 1):
+            try:
+                data = json.loads(line)
+                if n == 1 and 'journal' in data:
+                    journal_id = data['journal']
+                    continue
+                entries.append(PendingEntry(**data))
+            except (ValueError, TypeError) as e:
+                # Недописанная строка — процесс упал посреди записи, её не подтверждали
+                logging.warning(f"📒 {WRITE_BEHIND_JOURNAL}:{n} пропущена: {e}")
+    return journal_id, entries
+
+
+# ==================== ОЧЕРЕДЬ ====================
+
+async def submit(worker_id: int, work_code: str, quantity: float, price: float, work_date) -> float:
+    """Проверяет запись, журналирует и ставит в очередь. Возвращает сумму"""
+    global _seq
+    if quantity <= 0:
+        raise ValueError("Количество должно быть больше нуля")
+    if not any(i.code == work_code for i in await get_price_list()):
+        raise ValueError(f"Работа {work_code} недоступна")
+    async with _space:
+        await _space.wait_for(lambda: len(_pending) < MAX_PENDING)
+        _seq += 1
+        entry = PendingEntry(_seq, worker_id, work_code, quantity, price,
+                             parse_date(work_date).isoformat())
+        await _append(entry)
+        _pending.append(entry)
+    _has_work.set()
+    return quantity * price
+
+
+async def _flush():
+    global _uncertain
+    while _pending:
+        if _uncertain:
+            # Прошлая пачка прервалась — могла и закоммититься; берём из БД, что дошло
+            done = await get_write_behind_seq(_journal_id)
+            async with _space:
+                _pending[:] = [e for e in _pending if e.seq > done]
+            _uncertain = False
+            continue
+        batch = _pending[:BATCH_SIZE]
+        _uncertain = True
+        try:
+            await _insert(batch)
+        except PERMANENT_ERRORS:
+            # Транзакция откатилась — ищем, какие записи не проходят
+            _uncertain = False
+            await _insert_each(batch)
+        else:
+            _uncertain = False
+            await _done(len(batch))
+
+
+async def _done(count: int):
+    """Первые count записей очереди в БД (или в dead-letter): из очереди и
+    из журнала"""
+    async with _space:
+        del _pending[:count]
+        await asyncio.to_thread(_rewrite, list(_pending))
+        _space.notify_all()
+
+
+async def _insert(batch: List[PendingEntry]):
+    await add_work_batch(
+        [(e.worker_id, e.work_code, e.quantity, e.price, e.work_date) for e in batch],
+        _journal_id, batch[-1].seq)
+
+
+async def _insert_each(batch: List[PendingEntry]):
+    """По одной записи; отвергнутые — в dead-letter, их seq отмечается
+    обработанным, чтобы повтор журнала их пропустил"""
+    global _uncertain
+    for entry in batch:
+        _uncertain = True
+        try:
+            await _insert([entry])
+        except PERMANENT_ERRORS as e:
+            _uncertain = False
+            await _dead_letter(entry, e)
+            await set_write_behind_seq(_journal_id, entry.seq)
+        _uncertain = False
+        # Сразу из очереди: повтор после сбоя на следующей записи не задвоит эту
+        await _done(1)
+
+
+async def _flush_loop():
+    while True:
+        await _has_work.wait()
+        _has_work.clear()
+        if len(_pending) < BATCH_SIZE:
+            await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await _flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"📒 Сброс {len(_pending)} записей не удался, повтор через {RETRY_DELAY} с: {e}")
+            await asyncio.sleep(RETRY_DELAY)
+            _has_work.set()
+
+
+async def start():
+    """Повторяет журнал и запускает фоновый сброс (если WRITE_BEHIND)"""
+    global _journal_id, _seq, _space, _has_work, _flusher
+    if not WRITE_BEHIND or _flusher is not None:
+        return
+    if not _lock():
+        logging.error(f"📒 {WRITE_BEHIND_JOURNAL} занят другим процессом — "
+                      f"записи пишутся в БД сразу (задайте свой WRITE_BEHIND_JOURNAL)")
+        return
+    _space, _has_work = asyncio.Condition(), asyncio.Event()
+    journal_id, entries = _read_journal()
+    _journal_id = journal_id or uuid.uuid4().hex
+    done = await get_write_behind_seq(_journal_id)
+    _pending[:] = [e for e in entries if e.seq > done]
+    _seq = max([done] + [e.seq for e in entries])
+    await asyncio.to_thread(_rewrite, _pending)
+    if _pending:
+        logging.info(f"📒 Повтор журнала: {len(_pending)} записей")
+        _has_work.set()
+    _flusher = asyncio.create_task(_flush_loop(), name='write-behind')
+
+
+async def stop():
+    """Останавливает фоновый сброс и пишет остаток очереди в БД.
+    Что не удалось записать, останется в журнале до следующего start()"""
+    global _flusher, _journal, _lock_file
+    if _flusher is None:
+        return
+    _flusher.cancel()
+    try:
+        await _flusher
+    except asyncio.CancelledError:
+        pass
+    _flusher = None
+    try:
+        await _flush()
+    except Exception as e:
+        logging.error(f"📒 {len(_pending)} записей остались в журнале: {e}")
+    _journal.close()
+    _journal = None
+    _lock_file.close()
+    _lock_file = None
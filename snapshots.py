@@ -0,0 +1,283 @@
+"""Снимки БД для восстановления после аварии.
+
+Снимок — tar.gz с manifest.json и файлом <таблица>.copy на каждую таблицу:
+поток COPY ... (FORMAT binary) без разбора и сериализации строк в Python.
+В манифесте — версия формата, колонки с типами, число строк и sha256
+каждого файла; восстановление сверяет их до того, как что-то трогать.
+
+Таблицы выгружаются параллельно на отдельных соединениях пула, но из одного
+снимка MVCC (pg_export_snapshot) — снимок согласован, как один запрос.
+Восстановление: TRUNCATE всех таблиц снимка одним оператором, затем
+copy_to_table параллельно внутри уровня TABLE_LEVELS (следующий уровень
+ссылается на предыдущий внешними ключами), затем сдвиг последовательностей.
+Рабочие таблицы при этом не в одной транзакции: если восстановление
+прервалось, его нужно повторить.
+
+В другую схему (schema=...) таблицы создаются как LIKE public.<таблица> —
+без ключей и триггеров, поэтому грузятся все сразу (проверка бэкапа).
+
+    python snapshots.py create [файл]
+    python snapshots.py restore файл --yes
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import database
+import events
+
+FORMAT = 'cabinet-snapshot'
+VERSION = 1
+
+# Уровни восстановления: таблицы уровня независимы друг от друга
+TABLE_LEVELS = [
+    ('categories', 'workers', 'staff_roles', 'reminder_settings',
+     'reminder_job_state', 'write_behind_state'),
+    ('price_list', 'worker_categories'),
+    ('work_log', 'advances', 'penalties'),
+    ('work_log_archive', 'advances_archive', 'penalties_archive', 'price_list_archive',
+     'audit_log'),
+]
+TABLES = [t for level in TABLE_LEVELS for t in level]
+
+# Одновременных COPY (соединений пула) на выгрузку/восстановление
+PARALLEL = 4
+
+
+class SnapshotError(Exception):
+    """Снимок повреждён или не подходит к схеме БД"""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def table_columns(conn, tables, schema: str = 'public') -> Dict[str, List[List[str]]]:
+    """таблица -> [[колонка, тип], ...] в порядке колонок"""
+    rows = await conn.fetch("""
+        SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = $1 AND c.relname = ANY($2::text[])
+          AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY c.relname, a.attnum
+    """, schema, list(tables))
+    columns = {}
+    for table, column, type_ in rows:
+        columns.setdefault(table, []).append([column, type_])
+    return columns
+
+
+async def create_scratch(conn, schema: str, tables):
+    """Схема schema с пустыми копиями tables: только колонки и NOT NULL"""
+    await conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+    await conn.execute(f'CREATE SCHEMA "{schema}"')
+    for table in tables:
+        await conn.execute(f'CREATE TABLE "{schema}".{table} (LIKE public.{table})')
+
+
+# ==================== СОЗДАНИЕ ====================
+
+async def create_snapshot(path: Optional[str] = None) -> str:
+    """Пишет снимок в path (по умолчанию snapshot_<дата>.tar.gz во временной
+    папке) и возвращает путь к нему"""
+    created = datetime.now()
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"snapshot_{created:%Y%m%d_%H%M%S}.tar.gz")
+    workdir = tempfile.mkdtemp(prefix='snapshot_')
+    try:
+        async with database.pool.acquire() as main:
+            async with main.transaction(isolation='repeatable_read', readonly=True):
+                snapshot_id = await main.fetchval("SELECT pg_export_snapshot()")
+                columns = await table_columns(main, TABLES)
+                missing = [t for t in TABLES if t not in columns]
+                if missing:
+                    raise SnapshotError(f"Нет таблиц: {', '.join(missing)}")
+                server = await main.fetchval("SHOW server_version")
+                limit = asyncio.Semaphore(PARALLEL)
+
+                async def dump(table):
+                    async with limit, database.pool.acquire() as conn:
+                        async with conn.transaction(isolation='repeatable_read', readonly=True):
+                            await conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'")
+                            status = await conn.copy_from_table(
+                                table, columns=[c for c, _ in columns[table]],
+                                output=os.path.join(workdir, f"{table}.copy"), format='binary')
+                    return int(status.split()[-1])
+
+                counts = await asyncio.gather(*(dump(t) for t in TABLES))
+
+        manifest = {
+            'format': FORMAT,
+            'version': VERSION,
+            'created_at': created.isoformat(timespec='seconds'),
+            'server_version': server,
+            'tables': [
+                {'name': table, 'file': f"{table}.copy", 'columns': columns[table], 'rows': rows,
+                 'sha256': await asyncio.to_thread(_sha256, os.path.join(workdir, f"{table}.copy"))}
+                for table, rows in zip(TABLES, counts)
+            ],
+        }
+        with open(os.path.join(workdir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        await asyncio.to_thread(_pack, workdir, path, ['manifest.json'] + [t['file'] for t in manifest['tables']])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return path
+
+
+def _pack(workdir: str, path: str, names: List[str]):
+    with tarfile.open(path, 'w:gz', compresslevel=6) as tar:
+        for name in names:
+            tar.add(os.path.join(workdir, name), arcname=name)
+
+
+# ==================== ВОССТАНОВЛЕНИЕ ====================
+
+def _unpack(path: str, workdir: str) -> dict:
+    """Распаковывает снимок и проверяет манифест и контрольные суммы"""
+    try:
+        with tarfile.open(path, 'r:gz') as tar:
+            tar.extractall(workdir, filter='data')
+    except (tarfile.TarError, OSError, EOFError) as e:
+        raise SnapshotError(f"Архив не читается: {e}")
+    try:
+        with open(os.path.join(workdir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Нет манифеста: {e}")
+    if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+        raise SnapshotError(f"Неизвестный формат: {manifest.get('format')} v{manifest.get('version')}")
+    for table in manifest['tables']:
+        file = os.path.join(workdir, os.path.basename(table['file']))
+        if not os.path.exists(file) or _sha256(file) != table['sha256']:
+            raise SnapshotError(f"{table['name']}: контрольная сумма не совпала")
+    return manifest
+
+
+def read_manifest(path: str) -> dict:
+    """Манифест снимка без распаковки данных"""
+    with tarfile.open(path, 'r:gz') as tar:
+        return json.load(tar.extractfile('manifest.json'))
+
+
+async def _check_columns(conn, manifest: dict):
+    """Бинарный COPY требует тех же типов — расхождения ловим заранее"""
+    live = await table_columns(conn, [t['name'] for t in manifest['tables']])
+    for table in manifest['tables']:
+        types = dict(live.get(table['name'], []))
+        for column, type_ in table['columns']:
+            if types.get(column) != type_:
+                raise SnapshotError(
+                    f"{table['name']}.{column}: в снимке {type_}, в БД {types.get(column) or 'нет колонки'}")
+
+
+async def restore_snapshot(path: str, schema: Optional[str] = None) -> Dict[str, int]:
+    """Восстанавливает снимок. schema=None — в рабочие таблицы (всё, что в
+    них было, удаляется); иначе — в таблицы схемы schema, созданные заново.
+    Возвращает {таблица: строк}"""
+    workdir = tempfile.mkdtemp(prefix='restore_')
+    try:
+        manifest = await asyncio.to_thread(_unpack, path, workdir)
+        tables = {t['name']: t for t in manifest['tables']}
+        async with database.pool.acquire() as conn:
+            await _check_columns(conn, manifest)
+            if schema is None:
+                # TRUNCATE work_log сбрасывает и work_daily (триггер), COPY её наполнит.
+                # audit_log иначе не даёт себя очистить (только для добавления)
+                async with conn.transaction():
+                    await conn.execute("SELECT set_config('cabinet.restoring', 'on', true)")
+                    await conn.execute(f"TRUNCATE {', '.join(tables)}")
+                levels = [[t for t in level if t in tables] for level in TABLE_LEVELS]
+            else:
+                await create_scratch(conn, schema, tables)
+                levels = [list(tables)]
+
+        limit = asyncio.Semaphore(PARALLEL)
+
+        async def load(table):
+            info = tables[table]
+            async with limit, database.pool.acquire() as conn:
+                status = await conn.copy_to_table(
+                    table, source=os.path.join(workdir, os.path.basename(info['file'])),
+                    columns=[c for c, _ in info['columns']], schema_name=schema or 'public',
+                    format='binary')
+            rows = int(status.split()[-1])
+            if rows != info['rows']:
+                raise SnapshotError(f"{table}: загружено {rows} строк, в снимке {info['rows']}")
+            return rows
+
+        counts = {}
+        for level in levels:
+            counts.update(zip(level, await asyncio.gather(*(load(t) for t in level))))
+
+        if schema is None:
+            async with database.pool.acquire() as conn:
+                await reset_sequences(conn, tables)
+                await conn.execute("SELECT pg_notify($1, $2)",
+                                   events.CHANNEL, events.encode(events.RESYNC, {}))
+            events.publish(events.RESYNC)
+        return counts
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def reset_sequences(conn, tables):
+    """Последовательности serial-колонок — за максимальный восстановленный id"""
+    rows = await conn.fetch("""
+        SELECT c.relname, a.attname, pg_get_serial_sequence(c.relname, a.attname) AS seq
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = ANY($1::text[]) AND a.attnum > 0
+          AND pg_get_serial_sequence(c.relname, a.attname) IS NOT NULL
+    """, list(tables))
+    for table, column, seq in rows:
+        await conn.execute(f"""
+            SELECT setval('{seq}', COALESCE(MAX({column}), 1), MAX({column}) IS NOT NULL)
+            FROM {table}
+        """)
+
+
+# ==================== CLI ====================
+
+async def _main(args):
+    await database.init_db()
+    try:
+        if args.command == 'create':
+            path = await create_snapshot(args.path)
+            manifest = read_manifest(path)
+            print(f"{path}: {sum(t['rows'] for t in manifest['tables'])} строк, "
+                  f"{os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+        else:
+            if not args.yes:
+                raise SystemExit("Восстановление удалит текущие данные; подтвердите флагом --yes")
+            started = datetime.now()
+            counts = await restore_snapshot(args.path)
+            print(f"Восстановлено {sum(counts.values())} строк за "
+                  f"{(datetime.now() - started).total_seconds():.1f} с")
+    finally:
+        await database.close_db()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Снимки БД (binary COPY в tar.gz)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    create = sub.add_parser('create', help="создать снимок")
+    create.add_argument('path', nargs='?')
+    restore = sub.add_parser('restore', help="восстановить снимок (текущие данные удаляются)")
+    restore.add_argument('path')
+    restore.add_argument('--yes', action='store_true')
+    asyncio.run(_main(parser.parse_args()))
@@ -6,7 +6,7 @@ from .states import (
     AdminEditCategory, AdminEditWork,
     AdminDeleteCategory, AdminDeleteWork, AdminDeleteWorker,
     AdminAdvance, AdminDeleteAdvance, AdminPenalty, AdminDeletePenalty,
-    ReportWorker, MonthlySummaryWorker,
+    ReportWorker, MonthlySummaryWorker, PeriodReport,
     AdminReminderSettings,
     MonthlyTotals  # ← ДОБАВЛЕНО
 )
@@ -19,7 +19,7 @@ __all__ = [
     'AdminEditCategory', 'AdminEditWork',
     'AdminDeleteCategory', 'AdminDeleteWork', 'AdminDeleteWorker',
     'AdminAdvance', 'AdminDeleteAdvance', 'AdminPenalty', 'AdminDeletePenalty',
-    'ReportWorker', 'MonthlySummaryWorker',
+    'ReportWorker', 'MonthlySummaryWorker', 'PeriodReport',
     'AdminReminderSettings',
     'MonthlyTotals'  # ← ДОБАВЛЕНО
 ]
\ No newline at end of file
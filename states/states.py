@@ -152,6 +152,11 @@ class MonthlySummaryWorker(StatesGroup):
     choosing_worker = State()
 
 
+class PeriodReport(StatesGroup):
+    choosing_period = State()
+    entering_dates = State()
+
+
 class MonthlyTotals(StatesGroup):
     select_month = State()
 
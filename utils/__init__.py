@@ -1,8 +1,14 @@
 from .formatters import format_date, format_date_short, parse_user_date, format_money, MONTHS_RU
 from .helpers import send_long_message, safe_edit_text
+from .text import TextBuilder, split_message
+from . import periods, screens
+from .screens import Screen
+from .periods import Period
+from .lazy import lazy_import
 from utils import format_date, send_long_message, MONTHS_RU
 
 __all__ = [
     'format_date', 'format_date_short', 'parse_user_date', 'format_money', 'MONTHS_RU',
-    'send_long_message', 'safe_edit_text'
+    'send_long_message', 'safe_edit_text', 'periods', 'Period',
+    'TextBuilder', 'split_message', 'screens', 'Screen', 'lazy_import'
 ]
\ No newline at end of file
@@ -1,33 +1,22 @@
 import logging
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
 
+from .text import TELEGRAM_LIMIT, split_message
 
-async def send_long_message(target, text: str, parse_mode=None, max_len=4000):
-    """Отправка длинного сообщения частями"""
-    if len(text) <= max_len:
-        try:
-            await target.answer(text, parse_mode=parse_mode)
-        except Exception:
-            await target.answer(text, parse_mode=None)
-        return
-
-    parts = []
-    current = ""
-    for line in text.split("\n"):
-        if len(current) + len(line) + 1 > max_len:
-            parts.append(current)
-            current = line + "\n"
-        else:
-            current += line + "\n"
-    if current:
-        parts.append(current)
 
-    for part in parts:
-        if part.strip():
-            try:
-                await target.answer(part, parse_mode=parse_mode)
-            except Exception:
-                await target.answer(part, parse_mode=None)
+async def send_long_message(target, text, parse_mode=None, max_len=TELEGRAM_LIMIT):
+    """Отправка длинного сообщения (str или TextBuilder) частями.
+    Части режутся заранее, каждая уходит один раз; без разметки
+    переотправляется только часть, которую Telegram не смог разобрать"""
+    for part in split_message(text, max_len, parse_mode):
+        try:
+            await target.answer(part, parse_mode=parse_mode)
+        except TelegramBadRequest as e:
+            if parse_mode is None or "can't parse entities" not in str(e):
+                raise
+            logging.warning(f"Markup error, sending as plain text: {e}")
+            await target.answer(part, parse_mode=None)
 
 
 async def safe_edit_text(message: types.Message, text: str, reply_markup=None):
@@ -0,0 +1,34 @@
+"""Отложенный импорт тяжёлых модулей.
+
+Отчёты (openpyxl), выгрузки (pyarrow), снимки и проверка бэкапа нужны
+только по команде, а не для старта: модуль, объявленный через
+lazy_import(), импортируется при первом обращении к его атрибуту.
+Что не должно грузиться при `import bot`, перечислено в DEFERRED —
+это проверяет benchmarks/startup.py.
+"""
+import importlib
+
+DEFERRED = ('reports', 'exports', 'snapshots', 'backup_check', 'json_backup', 'openpyxl', 'pyarrow')
+
+
+class LazyModule:
+    """Заместитель модуля: импорт при первом обращении к атрибуту"""
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'загружен' if self._module is not None else 'не загружен'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+from .formatters import MONTHS_RU
+
+
+class Period(NamedTuple):
+    """Отчётный период — полуинтервал [start, end), как у month_bounds"""
+    start: date
+    end: date
+    kind: str  # month | quarter | year | ytd | range
+
+    @property
+    def last_day(self) -> date:
+        return self.end - timedelta(days=1)
+
+    @property
+    def months(self) -> int:
+        """Сколько календарных месяцев затрагивает период"""
+        last = self.last_day
+        return (last.year - self.start.year) * 12 + last.month - self.start.month + 1
+
+    @property
+    def key(self) -> str:
+        """Компактная запись для callback_data и FSM: month.20250301.20250401"""
+        return f"{self.kind}.{self.start:%Y%m%d}.{self.end:%Y%m%d}"
+
+    @property
+    def label(self) -> str:
+        if self.kind == 'month':
+            return f"{MONTHS_RU[self.start.month]} {self.start.year}"
+        if self.kind == 'quarter':
+            return f"{(self.start.month - 1) // 3 + 1} квартал {self.start.year}"
+        if self.kind == 'year':
+            return f"{self.start.year} год"
+        if self.kind == 'ytd':
+            return f"С начала {self.start.year} (по {self.last_day:%d.%m})"
+        return f"{self.start:%d.%m.%Y} — {self.last_day:%d.%m.%Y}"
+
+    @property
+    def slug(self) -> str:
+        """Часть имени файла отчёта"""
+        if self.kind == 'month':
+            return f"{self.start.year}_{self.start.month:02d}"
+        return f"{self.start:%Y%m%d}_{self.last_day:%Y%m%d}"
+
+
+def month(year: int, month_: int) -> Period:
+    start = date(year, month_, 1)
+    end = date(year + 1, 1, 1) if month_ == 12 else date(year, month_ + 1, 1)
+    return Period(start, end, 'month')
+
+
+def quarter(year: int, q: int) -> Period:
+    first = month(year, 3 * q - 2)
+    last = month(year, 3 * q)
+    return Period(first.start, last.end, 'quarter')
+
+
+def year(year_: int) -> Period:
+    return Period(date(year_, 1, 1), date(year_ + 1, 1, 1), 'year')
+
+
+def year_to_date(today: Optional[date] = None) -> Period:
+    today = today or date.today()
+    return Period(date(today.year, 1, 1), today + timedelta(days=1), 'ytd')
+
+
+def date_range(first: date, last: date) -> Period:
+    """Даты включительно, как их вводит пользователь"""
+    if last < first:
+        first, last = last, first
+    return Period(first, last + timedelta(days=1), 'range')
+
+
+def current_month(today: Optional[date] = None) -> Period:
+    today = today or date.today()
+    return month(today.year, today.month)
+
+
+def previous_month(today: Optional[date] = None) -> Period:
+    first = current_month(today).start
+    return current_month(first - timedelta(days=1))
+
+
+def current_quarter(today: Optional[date] = None) -> Period:
+    today = today or date.today()
+    return quarter(today.year, (today.month - 1) // 3 + 1)
+
+
+def previous_quarter(today: Optional[date] = None) -> Period:
+    return current_quarter(current_quarter(today).start - timedelta(days=1))
+
+
+def from_key(key: str) -> Optional[Period]:
+    """Обратно из Period.key; None — строка испорчена"""
+    try:
+        kind, start, end = key.split(".")
+        return Period(datetime.strptime(start, "%Y%m%d").date(),
+                      datetime.strptime(end, "%Y%m%d").date(), kind)
+    except ValueError:
+        return None
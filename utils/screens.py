@@ -0,0 +1,125 @@
+"""Навигация правкой сообщения на месте.
+
+Экран (Screen) — текст, inline-клавиатура и parse_mode. Для каждого
+сообщения бота помнится последний показанный в нём экран и edit_date, с
+которым Telegram его вернул. show() сравнивает новый экран с показанным:
+тот же — ни одного запроса, изменилась только клавиатура — edit_reply_markup,
+иначе edit_text. Если сообщение правили в обход show() (edit_date другой),
+запомненному экрану не верим и правим целиком.
+
+memo() держит данные экрана на время сессии чата: «Назад» и повторные
+переходы не перечитывают БД. Запомненное сбрасывается по MEMO_TTL и по
+событиям тем, от которых данные зависят.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+
+import events
+
+# Сколько сообщений помнить (самые старые забываются первыми)
+MAX_SCREENS = 5000
+# Сколько живут данные экрана, секунд
+MEMO_TTL = 600
+MEMO_TOPICS = ('work_log', 'workers', 'worker_categories', 'categories', 'price_list')
+
+
+class Screen(NamedTuple):
+    text: str
+    markup: Optional[InlineKeyboardMarkup] = None
+    parse_mode: Optional[str] = None
+
+
+# (chat_id, message_id) -> (edit_date, экран)
+_shown: 'OrderedDict[Tuple[int, int], Tuple[Any, Screen]]' = OrderedDict()
+# (chat_id, ключ) -> (истекает, темы, данные)
+_memo: Dict[Tuple[int, Hashable], Tuple[float, Tuple[str, ...], Any]] = {}
+_generation = 0
+
+
+def _key(message: types.Message) -> Tuple[int, int]:
+    return message.chat.id, message.message_id
+
+
+def _remember(message, screen: Screen):
+    if not isinstance(message, types.Message):
+        return
+    key = _key(message)
+    _shown[key] = (message.edit_date, screen)
+    _shown.move_to_end(key)
+    while len(_shown) > MAX_SCREENS:
+        _shown.popitem(last=False)
+
+
+async def show(message: types.Message, screen: Screen) -> bool:
+    """Показывает screen в message; False — экран уже на месте, запросов не было"""
+    shown = _shown.get(_key(message))
+    old = shown[1] if shown is not None and shown[0] == message.edit_date else None
+    if old == screen:
+        return False
+    try:
+        if old is not None and (old.text, old.parse_mode) == (screen.text, screen.parse_mode):
+            edited = await message.edit_reply_markup(reply_markup=screen.markup)
+        else:
+            edited = await message.edit_text(screen.text, reply_markup=screen.markup,
+                                             parse_mode=screen.parse_mode)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        edited = message
+    _remember(edited, screen)
+    return True
+
+
+async def send(message: types.Message, screen: Screen) -> types.Message:
+    """Новое сообщение с экраном — начало навигации"""
+    sent = await message.answer(screen.text, reply_markup=screen.markup,
+                                parse_mode=screen.parse_mode)
+    _remember(sent, screen)
+    return sent
+
+
+# ==================== ДАННЫЕ ЭКРАНОВ ====================
+
+async def memo(chat_id: int, key: Hashable, load: Callable[[], Awaitable],
+               topics: Sequence[str] = ()):
+    """load() один раз за MEMO_TTL для чата; событие по любой из topics
+    (из MEMO_TOPICS) сбрасывает запомненное"""
+    now = time.monotonic()
+    hit = _memo.get((chat_id, key))
+    if hit is not None and hit[0] > now:
+        return hit[2]
+    generation = _generation
+    value = await load()
+    # Пока грузили, данные могли измениться — такое не запоминаем
+    if generation == _generation:
+        if len(_memo) > MAX_SCREENS:
+            _purge(now)
+        _memo[(chat_id, key)] = (now + MEMO_TTL, tuple(topics), value)
+    return value
+
+
+def _purge(now: float):
+    for k in [k for k, (expires, _, _) in _memo.items() if expires <= now]:
+        del _memo[k]
+
+
+def _drop(topic: Optional[str]):
+    def handler(**_):
+        global _generation
+        _generation += 1
+        if topic is None:
+            _memo.clear()
+            return
+        for k in [k for k, (_, topics, _) in _memo.items() if topic in topics]:
+            del _memo[k]
+    return handler
+
+
+for _topic in MEMO_TOPICS:
+    events.subscribe(_topic, _drop(_topic))
+events.subscribe(events.RESYNC, _drop(None))
@@ -0,0 +1,91 @@
+"""Сборка длинных сообщений и разбиение их на части.
+
+TextBuilder копит строки в списке и склеивает один раз — вместо text += ...
+в цикле, который копирует всю строку на каждой итерации. split_message
+заранее режет строки на части в пределах лимитов Telegram, чтобы ни одна
+отправка не упала из-за длины.
+"""
+import re
+from typing import Iterable, List, Union
+
+# Лимит длины сообщения; Telegram считает в UTF-16 (эмодзи — 2 единицы)
+TELEGRAM_LIMIT = 4096
+# Не больше стольких сущностей (тегов разметки) в одном сообщении
+ENTITY_LIMIT = 100
+
+_HTML_TAG = re.compile(r"<[a-zA-Z]")
+
+
+class TextBuilder:
+    """Строки будущего сообщения; render() склеивает их через '\\n'"""
+    __slots__ = ('lines',)
+
+    def __init__(self, *lines: str):
+        self.lines: List[str] = list(lines)
+
+    def add(self, *lines: str) -> 'TextBuilder':
+        self.lines.extend(lines)
+        return self
+
+    def extend(self, lines: Iterable[str]) -> 'TextBuilder':
+        self.lines.extend(lines)
+        return self
+
+    def render(self) -> str:
+        return "\n".join(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+
+def text_length(text: str) -> int:
+    """Длина так, как её считает Telegram"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _entities(line: str, parse_mode) -> int:
+    if parse_mode and parse_mode.upper() == 'HTML':
+        return len(_HTML_TAG.findall(line))
+    return 0
+
+
+def split_message(text: Union[str, TextBuilder, Iterable[str]], limit: int = TELEGRAM_LIMIT,
+                  parse_mode=None) -> List[str]:
+    """Части не длиннее limit и не больше ENTITY_LIMIT тегов. Режет по
+    границам строк (теги разметки не должны переходить через строку);
+    строка длиннее лимита режется посередине"""
+    if isinstance(text, str):
+        lines = text.split("\n")
+    elif isinstance(text, TextBuilder):
+        lines = "\n".join(text.lines).split("\n")
+    else:
+        lines = "\n".join(text).split("\n")
+
+    parts: List[str] = []
+    current: List[str] = []
+    size = entities = 0
+
+    def flush():
+        nonlocal current, size, entities
+        part = "\n".join(current)
+        if part.strip():
+            parts.append(part)
+        current, size, entities = [], 0, 0
+
+    for line in lines:
+        length = text_length(line)
+        if length > limit:
+            flush()
+            # limit // 2 символов — не больше limit единиц UTF-16
+            step = limit // 2
+            for i in range(0, len(line), step):
+                parts.append(line[i:i + step])
+            continue
+        tags = _entities(line, parse_mode)
+        if current and (size + 1 + length > limit or entities + tags > ENTITY_LIMIT):
+            flush()
+        size += length + (1 if current else 0)
+        entities += tags
+        current.append(line)
+    flush()
+    return parts